@@ -0,0 +1,213 @@
+import argparse
+import json
+import os
+import warnings
+
+import numpy as np
+from flightlog import load_flight
+
+# Имя файла индекса в каталоге архива
+INDEX_NAME = 'flights_index.json'
+INDEX_VERSION = 1
+
+# Файлы полетов, которые попадают в архив
+FLIGHT_PREFIXES = {'avangard1_full_flight_': 'full', 'avangard1_error_': 'error'}
+FLIGHT_EXTENSIONS = ('.avlog', '.json')
+
+# Операции сравнения в критериях отбора: поле__gte=значение и т.п.
+OPERATORS = {
+    'gte': lambda a, b: a >= b,
+    'gt': lambda a, b: a > b,
+    'lte': lambda a, b: a <= b,
+    'lt': lambda a, b: a < b,
+    'ne': lambda a, b: a != b,
+    'in': lambda a, b: a in b,
+}
+
+
+def _flight_kind(name):
+    for prefix, kind in FLIGHT_PREFIXES.items():
+        if name.startswith(prefix):
+            return kind
+    return None
+
+
+def _date_from_name(name):
+    """Дата из метки времени в имени файла (..._ГГГГММДД_ЧЧММСС)"""
+    stamp = os.path.splitext(name)[0].rsplit('_', 2)[-2:]
+    if len(stamp) == 2 and all(part.isdigit() for part in stamp) and len(stamp[0]) == 8:
+        d, t = stamp
+        return f'{d[:4]}-{d[4:6]}-{d[6:]} {t[:2]}:{t[2:4]}:{t[4:6]}'
+    return None
+
+
+def describe_flight(path):
+    """Запись индекса для одного полета: время, длительность, этапы и диапазоны каналов"""
+    flight = load_flight(path)
+    t = flight.mission_time
+    entry = {
+        'path': path,
+        'kind': _flight_kind(os.path.basename(path)),
+        'date': flight.mission_info.get('date') or _date_from_name(os.path.basename(path)),
+        'samples': len(flight),
+        'duration': flight.mission_info.get('total_duration', float(t[-1]) if len(t) else 0.0),
+        'first_stage_separated': flight.mission_info.get('first_stage_separated'),
+        'satellite_deployed': flight.mission_info.get('satellite_deployed'),
+        'error': flight.error,
+        'start_time': float(t[0]) if len(t) else None,
+        'end_time': float(t[-1]) if len(t) else None,
+    }
+
+    # Отделение первой ступени — первый отсчет второго этапа
+    a, b = flight.stages.get('second_stage', (len(t), len(t)))
+    entry['separation_time'] = float(t[a]) if a < b else None
+
+    for name in ('altitude', 'speed', 'pitch'):
+        values = flight.channel(name)
+        entry[f'{name}_min'] = float(values.min()) if len(values) else None
+        entry[f'{name}_max'] = float(values.max()) if len(values) else None
+    return entry
+
+
+class FlightArchive:
+    """Архив полетов каталога с индексом в flights_index.json
+
+    Индекс обновляется по времени изменения и размеру файлов, поэтому перечитываются
+    только новые и измененные полеты. Отбор и сводки по архиву работают по индексу,
+    не открывая файлы полетов. Файлы, которые не удалось прочитать при обновлении,
+    попадают в errors (путь, ошибка) и выдаются предупреждением warnings.
+    """
+
+    def __init__(self, directory='.', refresh=True):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_NAME)
+        self.entries = {}
+        self.errors = []
+        self._stats = {}
+        self._load_index()
+        if refresh:
+            self.refresh()
+
+    def _load_index(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get('version') == INDEX_VERSION:
+            self.entries = data['flights']
+            self._stats = data['files']
+
+    def _save_index(self):
+        tmp = f'{self.index_path}.{os.getpid()}.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': INDEX_VERSION, 'flights': self.entries, 'files': self._stats},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+
+    def refresh(self):
+        """Сверяет индекс с каталогом; возвращает число перечитанных полетов
+
+        Нечитаемые файлы пропускаются и записываются в errors.
+        """
+        self.errors = []
+        found = {}
+        with os.scandir(self.directory) as it:
+            for item in it:
+                stem, ext = os.path.splitext(item.name)
+                if ext not in FLIGHT_EXTENSIONS or _flight_kind(item.name) is None:
+                    continue
+                # Если есть и JSON, и .avlog, берем .avlog — он открывается быстрее
+                if stem in found and ext != FLIGHT_EXTENSIONS[0]:
+                    continue
+                st = item.stat()
+                found[stem] = (item.path, [st.st_mtime_ns, st.st_size])
+
+        changed = 0
+        for stem, (path, stat) in found.items():
+            if self._stats.get(stem) == [path, *stat]:
+                continue
+            try:
+                self.entries[stem] = {'flight_id': stem, **describe_flight(path)}
+            except (OSError, ValueError, KeyError, IndexError) as e:
+                self.errors.append((path, str(e)))
+                warnings.warn(f"Не удалось прочитать {path}: {e}")
+                continue
+            self._stats[stem] = [path, *stat]
+            changed += 1
+
+        removed = set(self.entries) - set(found)
+        for stem in removed:
+            del self.entries[stem]
+            self._stats.pop(stem, None)
+
+        if changed or removed or not os.path.exists(self.index_path):
+            self._save_index()
+        return changed
+
+    def select(self, kind='full', sort='date', **criteria):
+        """Полеты, удовлетворяющие критериям, например select(altitude_max__gte=90000)"""
+        result = []
+        for entry in self.entries.values():
+            if kind is not None and entry['kind'] != kind:
+                continue
+            if all(self._match(entry, key, value) for key, value in criteria.items()):
+                result.append(entry)
+        if sort:
+            result.sort(key=lambda e: (e.get(sort) is None, e.get(sort) or 0))
+        return result
+
+    @staticmethod
+    def _match(entry, key, value):
+        field, _, op = key.partition('__')
+        actual = entry.get(field)
+        if not op:
+            return actual == value
+        if actual is None:
+            return False
+        return OPERATORS[op](actual, value)
+
+    def latest(self, kind='full'):
+        """Последний по дате полет"""
+        flights = self.select(kind=kind)
+        return flights[-1] if flights else None
+
+    def load(self, entries):
+        """Загружает полеты из списка записей индекса"""
+        return [load_flight(entry['path']) for entry in entries]
+
+    def column(self, field, entries=None):
+        """Значения поля по всем (или выбранным) полетам как массив NumPy"""
+        entries = self.select() if entries is None else entries
+        return np.array([np.nan if e.get(field) is None else e[field] for e in entries], dtype=float)
+
+    def aggregate(self, field, entries=None):
+        """Сводка по полю индекса: число полетов, среднее, разброс, минимум и максимум"""
+        values = self.column(field, entries)
+        values = values[np.isfinite(values)]
+        if not values.size:
+            return {'count': 0}
+        return {
+            'count': int(values.size),
+            'mean': float(values.mean()),
+            'std': float(values.std()),
+            'min': float(values.min()),
+            'max': float(values.max()),
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Индекс и сводка по архиву полетов')
+    parser.add_argument('directory', nargs='?', default='.')
+    args = parser.parse_args()
+
+    archive = FlightArchive(args.directory)
+    flights = archive.select()
+    print(f"Полетов в архиве: {len(flights)} (аварийных записей: {len(archive.select(kind='error'))})")
+    for entry in flights:
+        print(f"{entry['flight_id']}: {entry['date']}, {entry['duration']} с, "
+              f"отделение ступени {entry['separation_time']} с, высота до {entry['altitude_max']} м")
+    for field in ('duration', 'separation_time', 'altitude_max', 'speed_max'):
+        print(f"{field}: {archive.aggregate(field, flights)}")
@@ -0,0 +1,125 @@
+import argparse
+import sys
+
+# Единая точка входа: python avangard.py <команда> [аргументы].
+# Модули команд импортируются только при запуске команды, поэтому справка
+# и быстрые команды не загружают NumPy, matplotlib и kRPC.
+
+COMMANDS_HELP = """команды:
+  simulate   расчет траектории по модели без графиков (итог в консоль, --out — в файл)
+  compare    ошибки модели относительно полетов в KSP (аргументы compare.py)
+  plot       графики: model — модель, flight — полет, compare — модель и KSP,
+             all — все полеты каталога в файлы (аргументы batchplot.py)
+  fly        полет автопилота main2.py через kRPC; fly --model — на модели без KSP
+             (аргументы fakekrpc.py)"""
+
+
+def simulate(argv):
+    parser = argparse.ArgumentParser(prog='avangard.py simulate', description='Расчет траектории по модели')
+    parser.add_argument('--method', default='euler', help='euler, rk4 или rk45')
+    parser.add_argument('--dt', type=float, default=0.1, help='шаг расчета (для rk45 — начальный), с')
+    parser.add_argument('--dt-out', type=float, default=None,
+                        help='шаг выдачи каналов, с (по умолчанию --dt; у rk45 шаги расчета неравномерные)')
+    parser.add_argument('--total-time', type=float, default=135)
+    parser.add_argument('--vehicle', help='ракета из vehicles.json')
+    parser.add_argument('--body', help='тело из vehicles.json')
+    parser.add_argument('--params', default=None, help='постоянные модели (по умолчанию model_params.json)')
+    parser.add_argument('--curved', action='store_true', help='модель вокруг центра тела (кривизна планеты)')
+    parser.add_argument('--out', help='записать каналы траектории: .npz или .json')
+    parser.add_argument('--no-cache', action='store_true', help='считать заново, без кэша траекторий')
+    args = parser.parse_args(argv)
+
+    import json
+    import time
+    import numpy as np
+    from batchsim import PARAMS_FILE, load_params
+    from integrators import integrate
+    from physics import model_params
+    from trajcache import cached_integrate, default_cache
+
+    params = {**model_params(args.vehicle, args.body), **load_params(args.params or PARAMS_FILE, args.vehicle, args.body)}
+    if args.curved:
+        params['curved'] = 1
+    started = time.perf_counter()
+    run = integrate if args.no_cache else cached_integrate
+    dt_out = args.dt_out or args.dt
+    trajectory = run(method=args.method, params=params, dt=args.dt, total_time=args.total_time, elements=True,
+                     dt_out=dt_out)
+    elapsed = time.perf_counter() - started
+
+    cached = not args.no_cache and default_cache().misses == 0
+    print(f"Метод {args.method}, шаг {args.dt} с: {len(trajectory['t'])} отсчетов через {dt_out} с, "
+          f"вычислений правых частей {trajectory['n_rhs']}, {elapsed:.3f} с"
+          f"{' (из кэша)' if cached else ''}")
+    print(f"  Конец расчета: t = {trajectory['t'][-1]:.1f} с, высота {trajectory['y'][-1, 0]:.0f} м, "
+          f"скорость {trajectory['speed'][-1, 0]:.1f} м/с")
+    print(f"  Апоцентр {trajectory['apoapsis'][-1, 0]:.0f} м, перицентр {trajectory['periapsis'][-1, 0]:.0f} м")
+
+    if args.out:
+        channels = {name: np.asarray(values) for name, values in trajectory.items()
+                    if isinstance(values, np.ndarray) and values.shape[:1] == trajectory['t'].shape}
+        if args.out.endswith('.json'):
+            with open(args.out, 'w', encoding='utf-8') as f:
+                json.dump({name: values.tolist() for name, values in channels.items()}, f)
+        else:
+            np.savez_compressed(args.out, **channels)
+        print(f"Траектория сохранена: {args.out}")
+
+
+def compare(argv):
+    from compare import main
+    return main(argv)
+
+
+def plot(argv):
+    parser = argparse.ArgumentParser(prog='avangard.py plot', description='Графики модели и полетов')
+    parser.add_argument('what', choices=('model', 'flight', 'compare', 'all'))
+    parser.add_argument('file', nargs='?', help='файл полета для plot flight (по умолчанию последний)')
+    parser.add_argument('--method', default='euler', help='метод интегрирования для plot compare')
+    parser.add_argument('--dt', type=float, default=0.1)
+    parser.add_argument('--total-time', type=float, default=135)
+    # Аргументы plot all целиком передаются batchplot.py
+    if argv[:1] == ['all']:
+        from batchplot import main
+        return main(argv[1:])
+    args = parser.parse_args(argv)
+
+    if args.what == 'model':
+        from polniymatgraph import main
+        return main(dt=args.dt, total_time=args.total_time)
+    if args.what == 'flight':
+        from polniypoletksp import main
+        return main(args.file)
+    from polsrav import main
+    return main(method=args.method, dt=args.dt, total_time=args.total_time)
+
+
+def fly(argv):
+    # fly --model ... — аргументы fakekrpc.py, иначе — аргументы main2.py
+    if '--model' in argv:
+        from fakekrpc import main
+        return main([a for a in argv if a != '--model'])
+    from main2 import main
+    return main(argv)
+
+
+COMMANDS = {
+    'simulate': simulate,
+    'compare': compare,
+    'plot': plot,
+    'fly': fly,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = argparse.ArgumentParser(prog='avangard.py', description='Авангард-1: модель, сравнение, графики и полет',
+                                     epilog=COMMANDS_HELP, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=COMMANDS)
+    parser.add_argument('args', nargs='*', help='аргументы команды (avangard.py <команда> -h)')
+    args = parser.parse_args(argv[:1])
+    return COMMANDS[args.command](argv[1:])
+
+
+if __name__ == '__main__':
+    main()
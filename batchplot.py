@@ -0,0 +1,221 @@
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+from flightlog import load_flight
+
+# Число точек на линию после прореживания: ~2 точки на столбец пикселей при ширине 10" и 150 dpi
+MAX_POINTS = 4000
+FORMATS = ('png',)
+DPI = 150
+
+
+def decimate_minmax(t, y, max_points=MAX_POINTS):
+    """Прореживание с сохранением пиков: в каждом интервале остаются минимум и максимум
+    (в порядке времени), поэтому выбросы и форма кривой на графике не теряются"""
+    t = np.asarray(t)
+    y = np.asarray(y)
+    n = len(y)
+    buckets = max_points // 2
+    if n <= max_points or buckets < 1:
+        return t, y
+
+    size = n // buckets
+    body = buckets * size
+    blocks = y[:body].reshape(buckets, size)
+    offsets = np.arange(buckets) * size
+    lo = blocks.argmin(axis=1) + offsets
+    hi = blocks.argmax(axis=1) + offsets
+    idx = np.sort(np.column_stack((lo, hi)), axis=1).ravel()
+
+    # Хвост, не попавший в целые интервалы, и последний отсчет
+    if body < n:
+        tail = y[body:]
+        idx = np.concatenate((idx, np.sort([body + tail.argmin(), body + tail.argmax()])))
+    if idx[-1] != n - 1:
+        idx = np.append(idx, n - 1)
+    if idx[0] != 0:
+        idx = np.insert(idx, 0, 0)
+    return t[idx], y[idx]
+
+
+def headless():
+    """Окна показать нельзя (бэкенд Agg: нет дисплея или MPLBACKEND=Agg) — графики сохраняются в файлы"""
+    import matplotlib.pyplot as plt
+    return plt.get_backend().lower() == 'agg'
+
+
+def _agg_figure(figsize):
+    """Фигура без pyplot и без дисплея (холст Agg)"""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=figsize, layout='tight')
+    FigureCanvasAgg(fig)
+    return fig
+
+
+class FlightFigures:
+    """Графики полета (высота, скорость, совмещенный), созданные один раз
+
+    Для каждого следующего полета у готовых линий меняются только данные,
+    фигуры и оси заново не строятся. interactive=True — фигуры pyplot (для plt.show()),
+    иначе — фигуры Agg без дисплея.
+    """
+
+    def __init__(self, interactive=False, max_points=MAX_POINTS, model=None):
+        if interactive:
+            import matplotlib.pyplot as plt
+            make = lambda figsize: plt.figure(figsize=figsize, layout='tight')
+        else:
+            make = _agg_figure
+        self.max_points = max_points
+        self.figures = {}
+        self.lines = {}
+
+        # ========== ГРАФИК 1: ВЫСОТА ОТ ВРЕМЕНИ ==========
+        fig = make((10, 6))
+        ax = fig.add_subplot()
+        self.lines['altitude'], = ax.plot([], [], 'b-', linewidth=2.5, label='Высота')
+        ax.set_xlabel('Время полета (сек)', fontsize=12)
+        ax.set_ylabel('Высота (м)', fontsize=12)
+        ax.set_title('АВАНГАРД-1: Изменение высоты во времени', fontsize=14, fontweight='bold')
+        ax.grid(True, alpha=0.3)
+        self.figures['height'] = fig
+
+        # ========== ГРАФИК 2: СКОРОСТЬ ОТ ВРЕМЕНИ ==========
+        fig = make((10, 6))
+        ax = fig.add_subplot()
+        self.lines['speed'], = ax.plot([], [], 'r-', linewidth=2.5, label='Скорость')
+        ax.set_xlabel('Время полета (сек)', fontsize=12)
+        ax.set_ylabel('Скорость (м/с)', fontsize=12)
+        ax.set_title('АВАНГАРД-1: Изменение скорости во времени', fontsize=14, fontweight='bold')
+        ax.grid(True, alpha=0.3)
+        self.figures['speed'] = fig
+
+        # Расчет по модели — одна и та же кривая для всех полетов
+        if model is not None:
+            t, altitude, speed = model
+            self.figures['height'].axes[0].plot(t, altitude, 'orange', linestyle='--', linewidth=2,
+                                                alpha=0.7, label='Модель')
+            self.figures['speed'].axes[0].plot(t, speed, 'k--', linewidth=2, alpha=0.7, label='Модель')
+        for name in ('height', 'speed'):
+            self.figures[name].axes[0].legend(loc='upper left', fontsize=11)
+
+        # ========== СОВМЕЩЕННЫЙ ГРАФИК ==========
+        fig = make((12, 7))
+        ax1 = fig.add_subplot()
+        self.lines['combined_altitude'], = ax1.plot([], [], 'b-', linewidth=2.5, label='Высота')
+        ax1.set_xlabel('Время полета (сек)', fontsize=12)
+        ax1.set_ylabel('Высота (м)', fontsize=12, color='b')
+        ax1.tick_params(axis='y', labelcolor='b')
+        ax1.grid(True, alpha=0.3)
+        ax2 = ax1.twinx()
+        self.lines['combined_speed'], = ax2.plot([], [], 'r-', linewidth=2.5, alpha=0.8, label='Скорость')
+        ax2.set_ylabel('Скорость (м/с)', fontsize=12, color='r')
+        ax2.tick_params(axis='y', labelcolor='r')
+        self.figures['combined'] = fig
+
+    def update(self, flight):
+        """Подставляет данные полета в готовые линии"""
+        t = flight.mission_time
+        curves = {
+            'altitude': flight.altitude,
+            'speed': flight.speed,
+            'combined_altitude': flight.altitude,
+            'combined_speed': flight.speed,
+        }
+        for name, values in curves.items():
+            line = self.lines[name]
+            line.set_data(*decimate_minmax(t, values, self.max_points))
+            line.axes.relim()
+            line.axes.autoscale_view()
+
+    def save(self, prefix, formats=FORMATS, dpi=DPI, names=None, suffix=''):
+        """Сохраняет графики в <prefix>_<имя><suffix>.png и т.д.; возвращает имена файлов"""
+        files = []
+        for name in names or self.figures:
+            fig = self.figures[name]
+            for fmt in formats:
+                filename = f'{prefix}_{name}{suffix}.{fmt}'
+                fig.savefig(filename, dpi=dpi)
+                files.append(filename)
+        return files
+
+
+# Графики процесса-исполнителя: создаются один раз на процесс
+_figures = None
+_options = None
+
+
+def _init_worker(options):
+    global _figures, _options
+    _options = options
+    _figures = FlightFigures(max_points=options['max_points'], model=options['model'])
+
+
+def render_flight(path):
+    """Рисует один полет в процессе-исполнителе; возвращает (путь, файлы, ошибка)"""
+    try:
+        flight = load_flight(path)
+        if len(flight) == 0:
+            return path, [], 'нет данных'
+        _figures.update(flight)
+        stem = os.path.splitext(os.path.basename(path))[0]
+        prefix = os.path.join(_options['out_dir'], stem)
+        return path, _figures.save(prefix, _options['formats'], _options['dpi']), None
+    except (OSError, ValueError, KeyError) as e:
+        return path, [], str(e)
+
+
+def render_directory(paths, out_dir='plots', formats=FORMATS, workers=None, dpi=DPI,
+                     max_points=MAX_POINTS, model=None):
+    """Рисует графики всех полетов в out_dir в пуле процессов (бэкенд Agg, без дисплея)
+
+    model — (t, высота, скорость) расчета по модели для наложения на все графики.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    options = {'out_dir': out_dir, 'formats': tuple(formats), 'dpi': dpi,
+               'max_points': max_points, 'model': model}
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+    if workers == 1:
+        _init_worker(options)
+        return [render_flight(path) for path in paths]
+    with Pool(workers, initializer=_init_worker, initargs=(options,)) as pool:
+        return list(pool.imap_unordered(render_flight, paths))
+
+
+def main(argv=None):
+    from archive import FlightArchive
+
+    parser = argparse.ArgumentParser(description='Графики полетов каталога в PNG/SVG без дисплея')
+    parser.add_argument('directory', nargs='?', default='.')
+    parser.add_argument('--out', default='plots', help='каталог для графиков')
+    parser.add_argument('--formats', default='png', help='форматы через запятую: png,svg')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--dpi', type=int, default=DPI)
+    parser.add_argument('--max-points', type=int, default=MAX_POINTS)
+    parser.add_argument('--kind', default='full', help='full, error или all')
+    parser.add_argument('--model', action='store_true', help='наложить расчет по модели')
+    args = parser.parse_args(argv)
+
+    archive = FlightArchive(args.directory)
+    paths = [e['path'] for e in archive.select(kind=None if args.kind == 'all' else args.kind)]
+    model = None
+    if args.model:
+        from batchsim import load_params
+        from trajcache import cached_simulate_batch
+        trajectory = cached_simulate_batch(load_params())
+        model = (trajectory['t'], trajectory['y'][:, 0], trajectory['speed'][:, 0])
+
+    started = time.time()
+    results = render_directory(paths, args.out, args.formats.split(','), args.workers,
+                               args.dpi, args.max_points, model)
+    for path, files, error in results:
+        print(f"{path}: {error}" if error else f"{path}: {len(files)} файла(ов)")
+    print(f"Полетов: {len(results)}, время {time.time() - started:.1f} с")
+
+
+if __name__ == '__main__':
+    main()
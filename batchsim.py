@@ -0,0 +1,309 @@
+import json
+import math
+import os
+import warnings
+
+import numpy as np
+from physics import atmosphere_factor, density, gravity, load_config, model_params, specific_impulse
+from scalarsim import run_kernel
+
+# Параметры ракеты и планеты по умолчанию — из vehicles.json (см. physics.py),
+# программа разворота — здесь
+DEFAULT_PARAMS = {
+    **model_params(),
+    'theta_start': 90.0,
+    'theta_end': 0.8,
+    't_start_turn': 50,
+    't_end_turn': 85,
+    # Программа разворота: 0 — линейно по времени, 1 — по высоте, как в main2.py
+    'pitch_mode': 0,
+    'turn_start_alt': 12000,
+    'turn_end_alt': 45000,
+    'turn_exponent': 1.5,
+    'throttle_2': 1.0,  # постоянная тяга второй ступени (доля от полной)
+    'apo_cutoff': math.inf,  # выключение двигателя по достижении апоцентра, м
+    # Модель движения: 0 — плоская Земля (x, y — оси), 1 — вокруг центра тела радиуса R_k
+    # (y — высота, vx — горизонтальная, vy — радиальная скорость; учитывается кривизна)
+    'curved': 0,
+}
+
+# Файл с подобранными по полетам постоянными модели (пишет calibrate.py)
+PARAMS_FILE = 'model_params.json'
+
+# Порядок компонент вектора состояния
+STATE_X, STATE_Y, STATE_VX, STATE_VY = range(4)
+
+
+def broadcast_params(params=None, n=None):
+    """Дополняет параметры значениями по умолчанию и приводит их к массивам длины N"""
+    merged = dict(DEFAULT_PARAMS)
+    if params:
+        unknown = set(params) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise KeyError(f"Неизвестные параметры: {', '.join(sorted(unknown))}")
+        merged.update(params)
+
+    sizes = {np.size(v) for v in merged.values() if np.ndim(v) > 0}
+    if n is not None:
+        sizes.add(n)
+    sizes.discard(1)
+    if len(sizes) > 1:
+        raise ValueError(f"Несовместимые длины массивов параметров: {sorted(sizes)}")
+    n = sizes.pop() if sizes else 1
+
+    return {k: np.broadcast_to(np.asarray(v, dtype=float).ravel() if np.ndim(v) else float(v), (n,))
+            for k, v in merged.items()}
+
+
+def load_params(path=PARAMS_FILE, vehicle=None, body=None):
+    """Постоянные модели из файла калибровки; если файла нет — пустой словарь (значения по умолчанию)
+
+    Файл, подобранный для другой ракеты или тела (поля 'vehicle' и 'body', по умолчанию —
+    default_vehicle и default_body из vehicles.json), не используется: выдается предупреждение
+    и пустой словарь.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    config = load_config()
+    expected = {'vehicle': vehicle or config['default_vehicle'], 'body': body or config['default_body']}
+    for key, name in expected.items():
+        if saved.get(key, name) != name:
+            warnings.warn(f"{path} подобран для {saved[key]}, а не для {name}: "
+                          "используются постоянные по умолчанию")
+            return {}
+    params = saved.get('params', saved)
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise KeyError(f"Неизвестные параметры в {path}: {', '.join(sorted(unknown))}")
+    return params
+
+
+def derived_params(p):
+    """Производные величины: расходы, площадь миделя, скорость разворота
+
+    't_cut' — момент выключения двигателя по апоцентру, его заполняет simulate_batch.
+    """
+    return {
+        'S': math.pi * p['r'] ** 2,
+        'mu_1': (p['m0_1'] - p['mk_1']) / p['t_work1'],
+        'mu_2': (p['m0_2'] - p['mk_2']) / p['t_work2'],
+        't_work2_eff': p['t_work2'] / p['throttle_2'],
+        't_end2': p['t_work1'] + p['t_work2'] / p['throttle_2'],
+        'k_theta': (p['theta_start'] - p['theta_end']) / (p['t_end_turn'] - p['t_start_turn']),
+        'alt_pitch': bool(np.any(p['pitch_mode'] == 1)),
+        'curved': bool(np.any(p['curved'] == 1)),
+        't_cut': np.full(p['g0'].shape, np.inf),
+    }
+
+
+def pitch_program(t, p, d, t_branch=None, h=None):
+    """Угол тангажа (град) для всех траекторий в момент t на высотах h
+
+    t_branch — момент, по которому выбирается участок программы (по умолчанию t);
+    нужен интеграторам, чтобы на границе участка брать предел справа.
+    Высота нужна только траекториям с разворотом по высоте (pitch_mode = 1).
+    """
+    tb = t if t_branch is None else t_branch
+    turning = np.maximum(p['theta_start'] - d['k_theta'] * (t - p['t_start_turn']), 0.0)
+    theta = np.where(tb <= p['t_start_turn'], p['theta_start'],
+                     np.where(tb <= p['t_end_turn'], turning, p['theta_end']))
+    if d['alt_pitch'] and h is not None:
+        # Разворот по высоте: theta_start -> theta_end по степенному закону, как в main2.py
+        progress = np.clip((h - p['turn_start_alt']) / (p['turn_end_alt'] - p['turn_start_alt']), 0.0, 1.0)
+        by_alt = p['theta_start'] - (p['theta_start'] - p['theta_end']) * progress ** p['turn_exponent']
+        theta = np.where(p['pitch_mode'] == 1, by_alt, theta)
+    return theta
+
+
+def mass_and_thrust(t, h, p, d, t_branch=None, factor=None):
+    """Масса и тяга всех траекторий в момент t на высотах h
+
+    factor — уже посчитанный множитель атмосферы exp(-h / H), если есть.
+    """
+    tb = t if t_branch is None else t_branch
+    stage1 = tb <= p['t_work1']
+    # После выключения по апоцентру топливо больше не расходуется
+    burning = tb < d['t_cut']
+    t = np.minimum(t, d['t_cut'])
+
+    m1 = np.where(t < 0, p['m0_1'], p['m0_1'] - d['mu_1'] * t)
+    t2 = t - p['t_work1']
+    m2 = np.where(tb - p['t_work1'] <= d['t_work2_eff'],
+                  p['m0_2'] - d['mu_2'] * p['throttle_2'] * t2, p['mk_2'])
+    m = np.where(stage1, m1, m2)
+
+    if factor is None:
+        factor = atmosphere_factor(h, p['H'])
+    isp_vac = np.where(stage1, p['Isp_1'], p['Isp_2'])
+    isp = specific_impulse(isp_vac, p['isp_sea_factor'], factor)
+
+    mu = np.where(stage1, d['mu_1'], np.where(tb <= d['t_end2'], d['mu_2'] * p['throttle_2'], 0.0))
+    return m, np.where(burning, isp * mu * p['g0'], 0.0)
+
+
+def acceleration(t, state, p, d, t_branch=None, factor=None):
+    """Ускорение (ax, ay) всех траекторий: тяга, гравитация и сопротивление"""
+    h = state[:, STATE_Y]
+    vx = state[:, STATE_VX]
+    vy = state[:, STATE_VY]
+
+    # Экспонента атмосферы нужна и плотности, и удельному импульсу — считаем ее один раз
+    if factor is None:
+        factor = atmosphere_factor(h, p['H'])
+    m, T = mass_and_thrust(t, h, p, d, t_branch, factor)
+    theta_rad = np.radians(pitch_program(t, p, d, t_branch, h))
+
+    g = gravity(h, p['g0'], p['R_k'])
+    rho = density(h, p['rho0'], p['H'], factor)
+    v = np.sqrt(vx ** 2 + vy ** 2)
+
+    # При v = 0 сила сопротивления равна нулю, деление на 1 ее не меняет
+    Fd = 0.5 * rho * v ** 2 * p['Cx'] * d['S']
+    v_safe = np.where(v > 0, v, 1.0)
+    Fdx = -Fd * (vx / v_safe)
+    Fdy = -Fd * (vy / v_safe)
+
+    m_safe = np.where(m > 0, m, np.inf)
+    ax = (T * np.cos(theta_rad) + Fdx) / m_safe
+    ay = (T * np.sin(theta_rad) - m * g + Fdy) / m_safe
+
+    if d['curved']:
+        # Движение вокруг центра тела в местных осях (горизонт, радиус):
+        # центробежное ускорение и поворот горизонтальной скорости вместе с радиусом
+        k = p['curved'] / (p['R_k'] + h)
+        ax = ax - k * vx * vy
+        ay = ay + k * vx ** 2
+    return ax, ay
+
+
+def orbital_elements(y, vx, vy, p):
+    """Элементы орбиты по состоянию: апоцентр и перицентр (высоты), эксцентриситет,
+    большая полуось и удельная энергия
+
+    Высота y отсчитывается от поверхности тела радиуса R_k, vx — горизонтальная
+    скорость, vy — радиальная. Для модели вокруг центра тела (curved = 1) это точные
+    элементы, для плоской модели — приближение местного горизонта.
+    Работает для массивов любой формы, последняя ось — траектории (как у параметров p).
+    Для незамкнутых орбит апоцентр и большая полуось = inf.
+    """
+    mu = p['g0'] * p['R_k'] ** 2
+    r = p['R_k'] + y
+    energy = (vx ** 2 + vy ** 2) / 2 - mu / r
+    h = r * vx
+    e = np.sqrt(np.maximum(1 + 2 * energy * h ** 2 / mu ** 2, 0.0))
+    bound = energy < 0
+    a = np.where(bound, -mu / (2 * np.where(bound, energy, -1.0)), np.inf)
+    return {
+        'apoapsis': np.where(bound, a * (1 + e) - p['R_k'], np.inf),
+        'periapsis': np.where(bound, a * (1 - e), h ** 2 / (mu * (1 + e))) - p['R_k'],
+        'eccentricity': e,
+        'semi_major_axis': a,
+        'energy': energy,
+    }
+
+
+def apsides(y, vx, vy, p):
+    """Высоты апоцентра и перицентра по состоянию (см. orbital_elements)"""
+    elements = orbital_elements(y, vx, vy, p)
+    return elements['apoapsis'], elements['periapsis']
+
+
+def trajectory_elements(trajectory, params=None):
+    """Апоцентр, перицентр и эксцентриситет на каждом шаге записанных траекторий
+    (каналы формы (шаги, N)) — одним расчетом по всем шагам и траекториям"""
+    p = broadcast_params(params, trajectory['y'].shape[1])
+    elements = orbital_elements(trajectory['y'], trajectory['vx'], trajectory['vy'], p)
+    return {name: elements[name] for name in ('apoapsis', 'periapsis', 'eccentricity')}
+
+
+def time_reached(trajectory, apoapsis=None, periapsis=None, fraction=0.98):
+    """Первый момент, когда апоцентр и перицентр дошли до fraction от целевых
+    (условие завершения полета в main2.py); nan, если так и не дошли.
+    Нужны каналы 'apoapsis' и 'periapsis' (см. trajectory_elements)."""
+    reached = np.ones(trajectory['y'].shape, dtype=bool)
+    if apoapsis is not None:
+        reached &= trajectory['apoapsis'] >= apoapsis * fraction
+    if periapsis is not None:
+        reached &= trajectory['periapsis'] >= periapsis * fraction
+    first = np.argmax(reached, axis=0)
+    return np.where(reached.any(axis=0), trajectory['t'][first], np.nan)
+
+
+def simulate_batch(params=None, n=None, dt=0.1, total_time=135, record=True,
+                   state0=None, start_step=0, elements=False, kernel=True):
+    """Интегрирует N траекторий одновременно (полунеявный метод Эйлера, как в polsrav.py)
+
+    params — словарь параметров, значения могут быть числами или массивами длины N.
+    state0 и start_step позволяют продолжить расчет с сохраненного состояния
+    (например, с общего для всех вариантов вертикального участка).
+    Возвращает словарь: 't' (шаги,), 'state' — конечное состояние (N, 4),
+    'max_q' — максимальный скоростной напор каждой траектории (Па) начиная со start_step,
+    't_cut' — момент выключения двигателя по апоцентру (inf, если не было),
+    а при record=True еще каналы 'x', 'y', 'vx', 'vy', 'speed', 'theta' формы (шаги, N)
+    и при elements=True — 'apoapsis', 'periapsis', 'eccentricity' (см. trajectory_elements).
+    При curved = 1 x — путь вдоль местного горизонта (∫vx dt).
+    Одна траектория (N = 1) считается скалярным ядром scalarsim (с Numba — скомпилированным),
+    результат тот же с точностью до округления; kernel=False — всегда векторный расчет.
+    """
+    p = broadcast_params(params, n)
+    d = derived_params(p)
+    n = p['g0'].shape[0]
+    n_steps = int(total_time / dt)
+
+    if kernel and n == 1:
+        result = run_kernel(p, d, dt, n_steps, state0, start_step, record)
+        if record and elements:
+            result.update(trajectory_elements(result, params))
+        return result
+    cutoff = bool(np.any(np.isfinite(p['apo_cutoff'])))
+
+    state = np.zeros((n, 4))
+    if state0 is not None:
+        state[:] = state0
+    x = state[:, STATE_X]
+    y = state[:, STATE_Y]
+    vx = state[:, STATE_VX]
+    vy = state[:, STATE_VY]
+
+    times = np.arange(start_step, n_steps + 1) * dt
+    result = {'t': times}
+    if record:
+        channels = ('x', 'y', 'vx', 'vy', 'speed', 'theta')
+        for name in channels:
+            result[name] = np.empty((len(times), n))
+
+    max_q = np.zeros(n)
+
+    for j, i in enumerate(range(start_step, n_steps + 1)):
+        t = i * dt
+        if record:
+            result['theta'][j] = pitch_program(t, p, d, h=y)
+        factor = atmosphere_factor(y, p['H'])
+        ax, ay = acceleration(t, state, p, d, factor=factor)
+        np.maximum(max_q, 0.5 * p['rho0'] * factor * (vx ** 2 + vy ** 2), out=max_q)
+
+        vx += ax * dt
+        vy += ay * dt
+        y += vy * dt
+        x += vx * dt
+
+        if cutoff:
+            apo, _ = apsides(y, vx, vy, p)
+            reached = (apo >= p['apo_cutoff']) & np.isinf(d['t_cut'])
+            d['t_cut'][reached] = t + dt
+
+        if record:
+            result['x'][j] = x
+            result['y'][j] = y
+            result['vx'][j] = vx
+            result['vy'][j] = vy
+            result['speed'][j] = np.sqrt(vx ** 2 + vy ** 2)
+
+    result['state'] = state
+    result['max_q'] = max_q
+    result['t_cut'] = d['t_cut']
+    if record and elements:
+        result.update(trajectory_elements(result, params))
+    return result
@@ -0,0 +1,346 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+# Каталог для синтетических полетов и сохраненных результатов
+BENCH_DIR = '.benchmarks'
+BASELINE_FILE = os.path.join(BENCH_DIR, 'baseline.json')
+
+# Размеры синтетических полетов (отсчетов) и шаги модели по умолчанию;
+# 10 000 000 отсчетов (~2 ГБ JSON) — только по явному --sizes
+SIZES = (10_000, 100_000, 1_000_000)
+QUICK_SIZES = (10_000, 100_000)
+DTS = (0.1, 0.01, 0.001)
+
+# Регрессия: во столько раз медленнее (или больше памяти), чем в сохраненной базе
+TIME_THRESHOLD = 1.25
+MEMORY_THRESHOLD = 1.5
+
+# Повторы: быстрые замеры повторяются, пока не наберется MIN_TOTAL секунд (не больше MAX_REPEATS раз)
+MIN_TOTAL = 1.0
+MAX_REPEATS = 20
+
+# Длительность синтетического полета, с
+FLIGHT_DURATION = 150.0
+
+
+class Benchmark:
+    """Один замер: setup() готовит данные (не замеряется), run(data) замеряется
+
+    work(data) — объем работы за один run в единицах unit (шаги, МБ, отсчеты),
+    по нему считается скорость: unit в секунду.
+    """
+
+    def __init__(self, name, run, setup=None, work=None, unit=None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.work = work
+        self.unit = unit
+
+
+# --- Синтетические полеты ------------------------------------------------
+
+def synthetic_channels(n, duration=FLIGHT_DURATION, seed=0):
+    """Каналы полета из n отсчетов: форма высоты и скорости по модели, тангаж — программа
+    разворота main2.py, плюс шум, чтобы значения не повторялись"""
+    from batchsim import simulate_batch
+
+    trajectory = simulate_batch(dt=0.1, total_time=duration)
+    t = np.linspace(0.0, duration, n)
+    rng = np.random.default_rng(seed)
+    altitude = np.interp(t, trajectory['t'], trajectory['y'][:, 0]) + rng.normal(0, 0.5, n)
+    speed = np.interp(t, trajectory['t'], trajectory['speed'][:, 0]) + rng.normal(0, 0.2, n)
+    progress = np.clip((altitude - 12000) / 33000, 0.0, 1.0)
+    pitch = 90 * (1 - progress ** 1.5) + rng.normal(0, 0.3, n)
+    return {
+        'mission_time': np.round(t, 3),
+        'altitude': np.round(np.maximum(altitude, 0.0), 1),
+        'speed': np.round(np.abs(speed), 1),
+        'pitch': np.round(pitch, 1),
+    }
+
+
+def _write_samples(f, channels, start, stop, chunk=100_000):
+    names = list(channels)
+    for a in range(start, stop, chunk):
+        b = min(a + chunk, stop)
+        columns = [channels[name][a:b].tolist() for name in names]
+        lines = []
+        for values in zip(*columns):
+            fields = ', '.join(f'"{name}": {value}' for name, value in zip(names, values))
+            lines.append(f'    {{{fields}}}')
+        if a > start:
+            f.write(',\n')
+        f.write(',\n'.join(lines))
+
+
+def write_synthetic_flight(path, n, separation_altitude=17000):
+    """Пишет полет из n отсчетов в формате main2.py (flight_data и копия в stages_data)
+    и рядом колоночную копию .avlog; файлы пишутся по частям, без списка словарей"""
+    from binlog import from_channels, write_log
+
+    channels = synthetic_channels(n)
+    split = int(np.argmax(channels['altitude'] > separation_altitude)) + 1
+    info = {'name': f'Синтетический полет ({n} отсчетов)', 'total_duration': FLIGHT_DURATION,
+            'first_stage_separated': True, 'satellite_deployed': True}
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{\n  "mission_info": ' + json.dumps(info, ensure_ascii=False) + ',\n')
+        f.write('  "flight_data": [\n')
+        _write_samples(f, channels, 0, n)
+        f.write('\n  ],\n  "stages_data": {\n    "first_stage": [\n')
+        _write_samples(f, channels, 0, split)
+        f.write('\n    ],\n    "second_stage": [\n')
+        _write_samples(f, channels, split, n)
+        f.write('\n    ]\n  },\n  "data_summary": ' + json.dumps({'total_points': n}) + '\n}\n')
+
+    channels, stages, meta = from_channels(channels, {'mission_info': info})
+    write_log(path[:-len('.json')] + '.avlog', channels, stages, meta)
+    return path
+
+
+def synthetic_flight(n, data_dir=None):
+    """Путь к синтетическому полету из n отсчетов (создается один раз и переиспользуется)"""
+    data_dir = data_dir or os.path.join(BENCH_DIR, 'data')
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f'synthetic_{n}.json')
+    if not (os.path.exists(path) and os.path.exists(path[:-len('.json')] + '.avlog')):
+        print(f"Создание синтетического полета: {n} отсчетов", file=sys.stderr)
+        write_synthetic_flight(path, n)
+    return path
+
+
+def _megabytes(path):
+    return os.path.getsize(path) / 1e6
+
+
+# --- Наборы замеров ------------------------------------------------------
+
+def model_benchmarks(dts=DTS, total_time=135, batch=1000):
+    """Модель: одна траектория на разных шагах (скалярное ядро и векторный simulate_batch, rk4)
+    и пачка траекторий
+
+    Постоянные модели — DEFAULT_PARAMS, а не model_params.json из рабочего каталога:
+    калибровка не должна менять замеры, которые сравниваются с сохраненной базой.
+    """
+    from batchsim import DEFAULT_PARAMS, simulate_batch
+    from integrators import integrate
+
+    params = DEFAULT_PARAMS
+    steps = lambda dt: round(total_time / dt)
+    cases = []
+    for dt in dts:
+        cases.append(Benchmark(
+            f'model.euler[dt={dt}]',
+            lambda _, dt=dt: simulate_batch(params, dt=dt, total_time=total_time),
+            work=lambda _, dt=dt: steps(dt), unit='шагов'))
+    for dt in dts[:2]:
+        cases.append(Benchmark(
+            f'model.euler_vector[dt={dt}]',
+            lambda _, dt=dt: simulate_batch(params, dt=dt, total_time=total_time, kernel=False),
+            work=lambda _, dt=dt: steps(dt), unit='шагов'))
+    for dt in dts[:2]:
+        cases.append(Benchmark(
+            f'model.rk4[dt={dt}]',
+            lambda _, dt=dt: integrate('rk4', params, dt=dt, total_time=total_time),
+            work=lambda _, dt=dt: steps(dt), unit='шагов'))
+    cases.append(Benchmark(
+        f'model.batch[n={batch}, dt={dts[0]}]',
+        lambda _: simulate_batch(params, n=batch, dt=dts[0], total_time=total_time, record=False),
+        work=lambda _: steps(dts[0]) * batch, unit='шагов'))
+    return cases
+
+
+def load_benchmarks(sizes=SIZES, data_dir=None):
+    """Загрузка полетов: разбор JSON (json.load или поток), поток jsonstream, кэш, .avlog"""
+    from flightlog import load_flight
+    from jsonstream import FlightStreamReader
+
+    def touch(flight):
+        # Каналы .avlog отображаются лениво — читаем их целиком
+        return sum(float(np.sum(flight.channel(name))) for name in flight.channel_names)
+
+    cache_dir = os.path.join(BENCH_DIR, 'cache')
+
+    def cached(path):
+        load_flight(path, cache_dir=cache_dir)
+        return path
+
+    cases = []
+    for n in sizes:
+        cases.append(Benchmark(
+            f'load.json[{n}]', lambda path: touch(load_flight(path, use_cache=False)),
+            setup=lambda n=n: synthetic_flight(n, data_dir), work=_megabytes, unit='МБ'))
+        cases.append(Benchmark(
+            f'load.stream[{n}]', lambda path: FlightStreamReader(path).channels(),
+            setup=lambda n=n: synthetic_flight(n, data_dir), work=_megabytes, unit='МБ'))
+        cases.append(Benchmark(
+            f'load.cache[{n}]', lambda path: touch(load_flight(path, cache_dir=cache_dir)),
+            setup=lambda n=n: cached(synthetic_flight(n, data_dir)), work=_megabytes, unit='МБ'))
+        cases.append(Benchmark(
+            f'load.avlog[{n}]', lambda path: touch(load_flight(path)),
+            setup=lambda n=n: synthetic_flight(n, data_dir)[:-len('.json')] + '.avlog',
+            work=_megabytes, unit='МБ'))
+    return cases
+
+
+def plot_benchmarks(sizes=SIZES, data_dir=None, full_limit=1_000_000):
+    """Графики полета (batchplot.FlightFigures, Agg): с прореживанием и все точки"""
+    from batchplot import FlightFigures
+    from flightlog import load_flight
+
+    out_dir = os.path.join(BENCH_DIR, 'plots')
+    os.makedirs(out_dir, exist_ok=True)
+
+    def setup(n, decimate):
+        flight = load_flight(synthetic_flight(n, data_dir)[:-len('.json')] + '.avlog')
+        figures = FlightFigures() if decimate else FlightFigures(max_points=n)
+        return figures, flight
+
+    def render(args):
+        figures, flight = args
+        figures.update(flight)
+        figures.save(os.path.join(out_dir, 'bench'))
+
+    cases = []
+    for n in sizes:
+        cases.append(Benchmark(f'plot.decimated[{n}]', render, setup=lambda n=n: setup(n, True),
+                               work=lambda args: len(args[1]), unit='отсчетов'))
+        if n <= full_limit:
+            cases.append(Benchmark(f'plot.full[{n}]', render, setup=lambda n=n: setup(n, False),
+                                   work=lambda args: len(args[1]), unit='отсчетов'))
+    return cases
+
+
+def collect(groups=('model', 'load', 'plot'), sizes=SIZES, dts=DTS, data_dir=None):
+    cases = []
+    if 'model' in groups:
+        cases += model_benchmarks(dts)
+    if 'load' in groups:
+        cases += load_benchmarks(sizes, data_dir)
+    if 'plot' in groups:
+        cases += plot_benchmarks(sizes, data_dir)
+    return cases
+
+
+# --- Запуск и сравнение с базой ------------------------------------------
+
+def measure(case, memory=True):
+    """Лучшее время из повторов, скорость и пиковая память (отдельным прогоном под tracemalloc)"""
+    data = case.setup() if case.setup is not None else None
+    times = []
+    while True:
+        started = time.perf_counter()
+        case.run(data)
+        times.append(time.perf_counter() - started)
+        if sum(times) >= MIN_TOTAL or len(times) >= MAX_REPEATS:
+            break
+
+    result = {'seconds': min(times), 'repeats': len(times)}
+    if case.work is not None:
+        amount = case.work(data)
+        result['rate'] = amount / result['seconds']
+        result['unit'] = f'{case.unit}/с'
+    if memory:
+        tracemalloc.start()
+        case.run(data)
+        result['peak_mb'] = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return result
+
+
+def machine_info():
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run(cases, memory=True, pattern=None, echo=True):
+    results = {}
+    for case in cases:
+        if pattern and pattern not in case.name:
+            continue
+        results[case.name] = r = measure(case, memory)
+        if echo:
+            rate = f"{r['rate']:,.0f} {r['unit']}" if 'rate' in r else ''
+            peak = f"{r['peak_mb']:.1f} МБ" if 'peak_mb' in r else ''
+            print(f"{case.name:34s} {r['seconds'] * 1000:10.2f} мс  {rate:>24s}  {peak:>10s}")
+    return results
+
+
+def save_results(path, results):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'machine': machine_info(), 'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+                   'results': results}, f, indent=2, ensure_ascii=False)
+
+
+def load_results(path=BASELINE_FILE):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['results']
+
+
+def regressions(results, baseline, time_threshold=TIME_THRESHOLD, memory_threshold=MEMORY_THRESHOLD):
+    """Замеры, которые медленнее базы в time_threshold раз или съели в memory_threshold раз
+    больше памяти: список (имя, метрика, было, стало, отношение)"""
+    found = []
+    for name, r in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        for metric, threshold in (('seconds', time_threshold), ('peak_mb', memory_threshold)):
+            if metric not in r or metric not in base or base[metric] <= 0:
+                continue
+            ratio = r[metric] / base[metric]
+            if ratio > threshold:
+                found.append((name, metric, base[metric], r[metric], ratio))
+    return found
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Замеры скорости модели, загрузки полетов и графиков')
+    parser.add_argument('--groups', default='model,load,plot', help='наборы через запятую: model,load,plot')
+    parser.add_argument('--filter', help='только замеры, в имени которых есть эта строка')
+    parser.add_argument('--sizes', help='размеры синтетических полетов через запятую, например 10000,10000000')
+    parser.add_argument('--dts', help='шаги модели через запятую')
+    parser.add_argument('--quick', action='store_true', help=f'только полеты {QUICK_SIZES}')
+    parser.add_argument('--no-memory', action='store_true', help='без замера пиковой памяти')
+    parser.add_argument('--data-dir', help='каталог синтетических полетов')
+    parser.add_argument('--save', action='store_true', help='сохранить результаты как базу')
+    parser.add_argument('--compare', action='store_true', help='сравнить с базой, код выхода 1 при регрессии')
+    parser.add_argument('--baseline', default=BASELINE_FILE)
+    parser.add_argument('--threshold', type=float, default=TIME_THRESHOLD)
+    parser.add_argument('--memory-threshold', type=float, default=MEMORY_THRESHOLD)
+    parser.add_argument('--json', help='записать результаты в файл')
+    args = parser.parse_args()
+
+    sizes = QUICK_SIZES if args.quick else SIZES
+    if args.sizes:
+        sizes = tuple(int(s) for s in args.sizes.split(','))
+    dts = tuple(float(s) for s in args.dts.split(',')) if args.dts else DTS
+
+    cases = collect(args.groups.split(','), sizes, dts, args.data_dir)
+    results = run(cases, memory=not args.no_memory, pattern=args.filter)
+
+    if args.json:
+        save_results(args.json, results)
+    if args.save:
+        save_results(args.baseline, results)
+        print(f"База сохранена: {args.baseline}")
+    if args.compare:
+        found = regressions(results, load_results(args.baseline), args.threshold, args.memory_threshold)
+        for name, metric, before, after, ratio in found:
+            print(f"РЕГРЕССИЯ {name}: {metric} {before:.4g} -> {after:.4g} (x{ratio:.2f})")
+        if found:
+            sys.exit(1)
+        print(f"Регрессий нет (порог x{args.threshold} по времени, x{args.memory_threshold} по памяти)")
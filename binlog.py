@@ -0,0 +1,178 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+# Формат файла .avlog:
+#   8 байт сигнатура, 4 байта длина заголовка (little-endian),
+#   заголовок JSON (каналы, этапы, сведения о полете), затем данные:
+#   каждый канал — непрерывный массив little-endian, выровненный по 64 байтам.
+MAGIC = b'AVLOG\x00\x01\x00'
+ALIGN = 64
+VERSION = 1
+
+# Типы каналов по умолчанию: время и высоте нужна двойная точность
+CHANNEL_DTYPES = {
+    'mission_time': '<f8',
+    'altitude': '<f8',
+    'speed': '<f4',
+    'pitch': '<f4',
+}
+
+# Высота отделения первой ступени, по которой main2.py делит полет на этапы
+SEPARATION_ALTITUDE = 17000
+
+
+def _aligned(offset):
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_log(path, channels, stages=None, meta=None, dtypes=None):
+    """Записывает каналы (имя -> массив одинаковой длины) в файл .avlog
+
+    stages — этапы полета в виде диапазонов индексов {имя: (начало, конец)}.
+    """
+    dtypes = {**CHANNEL_DTYPES, **(dtypes or {})}
+    arrays = {name: np.ascontiguousarray(values, dtype=dtypes.get(name, '<f8'))
+              for name, values in channels.items()}
+    lengths = {len(a) for a in arrays.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Каналы разной длины: {sorted(lengths)}")
+    n = lengths.pop() if lengths else 0
+
+    layout = []
+    header = {
+        'version': VERSION,
+        'samples': n,
+        'channels': layout,
+        'stages': {name: [int(a), int(b)] for name, (a, b) in (stages or {}).items()},
+        'meta': meta or {},
+    }
+
+    # Смещения зависят от длины заголовка, поэтому считаем их, пока длина не перестанет меняться
+    header_len = 0
+    while True:
+        offset = _aligned(len(MAGIC) + 4 + header_len)
+        layout.clear()
+        for name, a in arrays.items():
+            layout.append({'name': name, 'dtype': a.dtype.str, 'offset': offset})
+            offset = _aligned(offset + a.nbytes)
+        encoded = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        if len(encoded) == header_len:
+            break
+        header_len = len(encoded)
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', header_len))
+        f.write(encoded)
+        for entry, a in zip(layout, arrays.values()):
+            f.write(b'\x00' * (entry['offset'] - f.tell()))
+            f.write(a.tobytes())
+
+
+class BinaryFlightLog:
+    """Файл .avlog, открытый через mmap: каналы — массивы NumPy без копирования"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path}: не файл .avlog")
+        header_len, = struct.unpack_from('<I', self._mmap, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(self._mmap[start:start + header_len].decode('utf-8'))
+        self.samples = self.header['samples']
+        self.meta = self.header['meta']
+        self.stages = {name: tuple(r) for name, r in self.header['stages'].items()}
+        self.channels = {
+            c['name']: np.frombuffer(self._mmap, dtype=c['dtype'], count=self.samples, offset=c['offset'])
+            for c in self.header['channels']
+        }
+
+    def __getitem__(self, name):
+        return self.channels[name]
+
+    def __len__(self):
+        return self.samples
+
+    def stage(self, name):
+        """Каналы одного этапа полета (срезы без копирования)"""
+        a, b = self.stages[name]
+        return {k: v[a:b] for k, v in self.channels.items()}
+
+    def close(self):
+        # Массивы ссылаются на mmap, поэтому сначала отпускаем их; если кто-то
+        # еще держит каналы, отображение закроется сборщиком мусора
+        self.channels = {}
+        try:
+            self._mmap.close()
+        except BufferError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_log(path):
+    """Открывает файл .avlog"""
+    return BinaryFlightLog(path)
+
+
+def stage_ranges(times, altitudes, separation_altitude=SEPARATION_ALTITUDE):
+    """Диапазоны индексов этапов по правилу main2.py: первая ступень — до отсчета,
+    где высота впервые превысила 17000 м (включительно по времени)"""
+    times = np.asarray(times)
+    n = len(times)
+    above = np.flatnonzero(np.asarray(altitudes) > separation_altitude)
+    if not above.size:
+        return {'first_stage': (0, n), 'second_stage': (n, n)}
+    after = np.flatnonzero(times > times[above[0]])
+    split = int(after[0]) if after.size else n
+    return {'first_stage': (0, split), 'second_stage': (split, n)}
+
+
+def from_channels(channels, meta=None):
+    """Этапы для уже собранных каналов"""
+    channels = channels or {name: np.empty(0) for name in CHANNEL_DTYPES}
+    stages = stage_ranges(channels.get('mission_time', []), channels.get('altitude', []))
+    return channels, stages, meta or {}
+
+
+def from_flight_data(flight_data, meta=None):
+    """Каналы и этапы из списка отсчетов в формате main2.py"""
+    names = list(flight_data[0]) if flight_data else list(CHANNEL_DTYPES)
+    channels = {name: np.array([d[name] for d in flight_data], dtype=float) for name in names}
+    return from_channels(channels, meta)
+
+
+def convert_json(json_path, out_path=None):
+    """Переводит JSON полета (avangard1_*.json) в .avlog; stages_data не копируется,
+    а хранится как диапазоны индексов"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    meta = {k: v for k, v in data.items() if k not in ('flight_data', 'stages_data')}
+    meta['source'] = os.path.basename(json_path)
+    channels, stages, meta = from_flight_data(data['flight_data'], meta)
+
+    out_path = out_path or os.path.splitext(json_path)[0] + '.avlog'
+    write_log(out_path, channels, stages, meta)
+    return out_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Перевод JSON полетов в колоночный формат .avlog')
+    parser.add_argument('files', nargs='+', help='JSON файлы полетов')
+    args = parser.parse_args()
+
+    for json_path in args.files:
+        out_path = convert_json(json_path)
+        print(f"{json_path}: {os.path.getsize(json_path)} байт -> {out_path}: {os.path.getsize(out_path)} байт")
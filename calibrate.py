@@ -0,0 +1,240 @@
+import argparse
+import json
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+import numpy as np
+from batchsim import PARAMS_FILE, broadcast_params, simulate_batch
+from compare import monotonic, resample
+from physics import load_config
+
+# Подбираемые постоянные модели, их границы и шаг сетки (для кэша вычислений)
+CALIBRATION_BOUNDS = {
+    'Cx': (0.05, 1.5, 1e-4),
+    'isp_sea_factor': (0.5, 1.0, 1e-4),
+    'Isp_2': (150, 450, 1e-2),
+    'H': (3000, 9000, 1.0),
+    'rho0': (0.5, 2.0, 1e-4),
+}
+
+# Подбираемые по умолчанию: rho0 входит в сопротивление только в произведении с Cx,
+# поэтому вместе их не подобрать — плотность остается табличной
+DEFAULT_FIT = ('Cx', 'isp_sea_factor', 'Isp_2', 'H')
+
+# Масштаб невязок: 1 км по высоте весит столько же, сколько 10 м/с по скорости
+RESIDUAL_SCALES = {'altitude': 1000.0, 'speed': 10.0}
+MODEL_CHANNELS = {'altitude': 'y', 'speed': 'speed'}
+
+
+def prepare_flight(flight, total_time):
+    """Отсчеты полета, с которыми сравнивается модель: без повторов времени и не дальше total_time"""
+    t, altitude, speed = monotonic(flight.mission_time, flight.altitude, flight.speed)
+    keep = (t >= 0) & (t <= total_time)
+    return t[keep], {'altitude': altitude[keep], 'speed': speed[keep]}
+
+
+def simulate_residuals(task):
+    """Невязки модели по всем полетам для пачки наборов параметров, форма (N, M)"""
+    base, names, X, dt, total_time, flights = task
+    params = dict(base)
+    for j, name in enumerate(names):
+        params[name] = X[:, j]
+    trajectory = simulate_batch(params, n=X.shape[0], dt=dt, total_time=total_time)
+
+    parts = []
+    for t, channels in flights:
+        for name, key in MODEL_CHANNELS.items():
+            predicted = resample(trajectory['t'], trajectory[key], t)
+            parts.append((predicted - channels[name][:, None]) / RESIDUAL_SCALES[name])
+    residuals = np.concatenate(parts).T
+    return residuals / np.sqrt(residuals.shape[1])
+
+
+class ModelCalibrator:
+    """Подбор постоянных модели по записанным полетам методом наименьших квадратов
+
+    Невязка — отклонение высоты и скорости модели от записи KSP в моменты отсчетов.
+    Поиск — метод Левенберга–Марквардта: якобиан (конечные разности) и пробные шаги
+    с разным демпфированием считаются одной пачкой в batchsim. Расчеты кэшируются
+    по параметрам, округленным до шага сетки.
+    """
+
+    def __init__(self, flights, names=None, bounds=None, base_params=None,
+                 dt=0.1, total_time=135, workers=1):
+        bounds = bounds or CALIBRATION_BOUNDS
+        self.names = list(names or DEFAULT_FIT)
+        self.lo = np.array([bounds[n][0] for n in self.names], dtype=float)
+        self.hi = np.array([bounds[n][1] for n in self.names], dtype=float)
+        self.grid = np.array([bounds[n][2] for n in self.names], dtype=float)
+
+        self.base = dict(base_params or {})
+        self.dt = dt
+        self.total_time = total_time
+        self.workers = workers
+        self.flights = [prepare_flight(flight, total_time) for flight in flights]
+        if not any(len(t) for t, _ in self.flights):
+            raise ValueError("В полетах нет отсчетов для калибровки")
+
+        self.cache = {}
+        self.cache_hits = 0
+        self.n_simulated = 0
+
+    def normalize(self, X):
+        """Приводит наборы параметров к границам и к сетке"""
+        X = np.clip(np.atleast_2d(np.asarray(X, dtype=float)), self.lo, self.hi)
+        return np.round(X / self.grid) * self.grid
+
+    def residuals(self, X, pool=None):
+        """Невязки для каждого набора параметров; уже посчитанные берутся из кэша"""
+        X = self.normalize(X)
+        keys = [tuple(row) for row in X]
+        todo = []
+        for key in keys:
+            if key in self.cache:
+                self.cache_hits += 1
+            elif key not in todo:
+                todo.append(key)
+
+        if todo:
+            T = np.array(todo)
+            if pool is not None and len(todo) > 1:
+                chunks = np.array_split(T, min(self.workers, len(todo)))
+                tasks = [(self.base, self.names, c, self.dt, self.total_time, self.flights) for c in chunks]
+                R = np.concatenate(pool.map(simulate_residuals, tasks))
+            else:
+                R = simulate_residuals((self.base, self.names, T, self.dt, self.total_time, self.flights))
+            self.n_simulated += len(todo)
+            for key, r in zip(todo, R):
+                self.cache[key] = r
+        return X, np.array([self.cache[key] for key in keys])
+
+    def fit(self, x0=None, max_iter=40, tol=1e-8, step=1e-3, damping=1e-2, verbose=False):
+        """Метод Левенберга–Марквардта в координатах, нормированных на границы"""
+        started = time.time()
+        span = self.hi - self.lo
+        # Начальная точка — текущие постоянные модели
+        start = broadcast_params(self.base)
+        if isinstance(x0, dict):
+            x0 = [x0.get(n, start[n][0]) for n in self.names]
+        elif x0 is None:
+            x0 = [start[n][0] for n in self.names]
+        u = (self.normalize(x0)[0] - self.lo) / span
+
+        iterations = 0
+        pool = Pool(self.workers) if self.workers > 1 else None
+        try:
+            _, R = self.residuals(self.lo + u * span, pool)
+            r = R[0]
+            cost = float(r @ r)
+            for iteration in range(max_iter):
+                iterations = iteration + 1
+                # Якобиан по прямым разностям (шаг назад у верхней границы)
+                h = np.where(u + step <= 1.0, step, -step)
+                X, R = self.residuals(self.lo + (u + np.diag(h)) * span, pool)
+                # Фактический шаг после округления к сетке
+                h = np.diag((X - self.lo) / span) - u
+                J = (R - r).T / np.where(h == 0, 1.0, h)
+
+                # Пробные шаги с демпфированием lambda / 10, lambda, lambda * 10 — одной пачкой
+                A, g = J.T @ J, J.T @ r
+                lambdas = damping * np.array([0.1, 1.0, 10.0])
+                diag = np.diag(np.diag(A) + 1e-12)
+                trials = np.array([np.clip(u - np.linalg.solve(A + lam * diag, g), 0.0, 1.0)
+                                   for lam in lambdas])
+                X, R = self.residuals(self.lo + trials * span, pool)
+                costs = np.einsum('ij,ij->i', R, R)
+                best = int(np.argmin(costs))
+                if verbose:
+                    print(f"Итерация {iteration + 1}: невязка {cost:.6g} -> {costs[best]:.6g}, "
+                          f"демпфирование {lambdas[best]:.3g}")
+
+                if costs[best] < cost:
+                    improvement = cost - costs[best]
+                    u = (X[best] - self.lo) / span
+                    r, cost = R[best], float(costs[best])
+                    damping = lambdas[best]
+                    if improvement < tol * max(cost, 1e-12):
+                        break
+                else:
+                    damping *= 100
+                    if damping > 1e8:
+                        break
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        params = {n: round(v, 10) for n, v in zip(self.names, self.normalize(self.lo + u * span)[0].tolist())}
+        return {
+            'params': params,
+            'cost': cost,
+            'rmse': self.report(params),
+            'iterations': iterations,
+            'simulated': self.n_simulated,
+            'cache_hits': self.cache_hits,
+            'elapsed': time.time() - started,
+        }
+
+    def report(self, params):
+        """СКО высоты (м) и скорости (м/с) по каждому полету для набора параметров"""
+        trajectory = simulate_batch({**self.base, **params}, dt=self.dt, total_time=self.total_time)
+        result = []
+        for t, channels in self.flights:
+            result.append({
+                name: float(np.sqrt(np.mean((resample(trajectory['t'], trajectory[key][:, 0], t)
+                                             - channels[name]) ** 2)))
+                for name, key in MODEL_CHANNELS.items()
+            })
+        return result
+
+
+def save_params(path, result, sources=(), vehicle=None, body=None):
+    """Сохраняет подобранные постоянные модели в файл, который читает batchsim.load_params
+
+    Вместе с ними пишутся ракета и тело (по умолчанию — из vehicles.json): для других
+    load_params файл не использует.
+    """
+    config = load_config()
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'params': result['params'],
+            'vehicle': vehicle or config['default_vehicle'],
+            'body': body or config['default_body'],
+            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'flights': list(sources),
+            'rmse': result['rmse'],
+        }, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    from archive import FlightArchive
+    from flightlog import load_flight
+    from physics import model_params
+
+    parser = argparse.ArgumentParser(description='Подбор постоянных модели по полетам в KSP')
+    parser.add_argument('files', nargs='*', help='файлы полетов (по умолчанию — все полеты архива)')
+    parser.add_argument('--fit', default=','.join(DEFAULT_FIT),
+                        help='подбираемые параметры через запятую')
+    parser.add_argument('--iterations', type=int, default=40)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--total-time', type=float, default=135)
+    parser.add_argument('--vehicle', help='ракета из vehicles.json')
+    parser.add_argument('--body', help='тело из vehicles.json')
+    parser.add_argument('--output', default=PARAMS_FILE)
+    args = parser.parse_args()
+
+    archive = FlightArchive('.')
+    paths = args.files or [entry['path'] for entry in archive.select()]
+    flights = [load_flight(path) for path in paths]
+
+    calibrator = ModelCalibrator(flights, names=args.fit.split(','), total_time=args.total_time,
+                                 base_params=model_params(args.vehicle, args.body), workers=args.workers)
+    result = calibrator.fit(max_iter=args.iterations, verbose=True)
+    save_params(args.output, result, paths, args.vehicle, args.body)
+
+    print(f"\nПараметры модели: {result['params']}")
+    for path, rmse in zip(paths, result['rmse']):
+        print(f"{path}: СКО высоты {rmse['altitude']:.0f} м, скорости {rmse['speed']:.1f} м/с")
+    print(f"Расчетов {result['simulated']}, из кэша {result['cache_hits']}, время {result['elapsed']:.1f} с")
+    print(f"Сохранено в {args.output}")
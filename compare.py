@@ -0,0 +1,200 @@
+import argparse
+
+import numpy as np
+
+# Каналы сравнения: имя в записи KSP -> имя канала в результате модели
+MODEL_CHANNELS = {'speed': 'speed', 'altitude': 'y'}
+
+# Диапазон поиска запаздывания модели относительно KSP, с
+MAX_LAG = 10.0
+
+
+def window(times, t_start=-np.inf, t_end=np.inf):
+    """Срез отсчетов с t_start <= t <= t_end (times по возрастанию)"""
+    a = int(np.searchsorted(times, t_start, side='left'))
+    b = int(np.searchsorted(times, t_end, side='right'))
+    return slice(a, b)
+
+
+def monotonic(times, *channels):
+    """Убирает повторы и откаты времени (в записях KSP встречаются одинаковые метки)"""
+    times = np.asarray(times, dtype=float)
+    keep = np.ones(len(times), dtype=bool)
+    if len(times) > 1:
+        keep[1:] = times[1:] > np.maximum.accumulate(times)[:-1]
+    return (times[keep],) + tuple(np.asarray(c)[keep] for c in channels)
+
+
+def resample(times, values, grid):
+    """Линейная интерполяция на сетку grid; values формы (n,) или (n, N) —
+    все траектории интерполируются разом по одним индексам. Для пачки grid может
+    быть формы (G, N) — своя сетка у каждой траектории"""
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values, dtype=float)
+    i = np.clip(np.searchsorted(times, grid, side='right') - 1, 0, len(times) - 2)
+    w = np.clip((grid - times[i]) / (times[i + 1] - times[i]), 0.0, 1.0)
+    if np.ndim(grid) > 1:
+        return np.take_along_axis(values, i, 0) * (1 - w) + np.take_along_axis(values, i + 1, 0) * w
+    if values.ndim > 1:
+        w = w[:, None]
+    return values[i] * (1 - w) + values[i + 1] * w
+
+
+def common_time_base(t_ksp, t_model, dt=0.1, t_start=None, t_end=None):
+    """Общая равномерная сетка на пересечении интервалов записи и модели"""
+    start = max(t_ksp[0], t_model[0]) if t_start is None else t_start
+    end = min(t_ksp[-1], t_model[-1]) if t_end is None else t_end
+    if end <= start:
+        return np.empty(0)
+    return start + dt * np.arange(int(np.floor((end - start) / dt + 1e-9)) + 1)
+
+
+def error_metrics(reference, model, grid=None):
+    """СКО, максимальное отклонение (и его момент) и среднее смещение модели от записи"""
+    diff = model - (reference[:, None] if model.ndim > 1 else reference)
+    worst = np.argmax(np.abs(diff), axis=0)
+    result = {
+        'rmse': np.sqrt(np.mean(diff ** 2, axis=0)),
+        'max_dev': np.take_along_axis(diff, worst[None], axis=0)[0] if diff.ndim > 1 else diff[worst],
+        'bias': diff.mean(axis=0),
+    }
+    if grid is not None:
+        result['t_max_dev'] = grid[worst]
+    return result
+
+
+def _lag_cost(t_model, model, grid, reference, lag):
+    """СКО² между model(t + lag) и записью; lag — число или массив (N,) для пачки"""
+    shifted = grid[:, None] + lag if np.ndim(lag) else grid + lag
+    return np.mean((resample(t_model, model, shifted) - reference) ** 2, axis=0)
+
+
+def estimate_lag(grid, reference, t_model, model, max_lag=MAX_LAG, step=None, coarse=5):
+    """Запаздывание модели относительно записи, с: сдвиг lag, при котором
+    model(t + lag) ближе всего к записи по СКО
+
+    Сначала перебор с шагом coarse * step, затем уточнение с шагом step около
+    лучшего сдвига каждой траектории и параболическая интерполяция минимума.
+    """
+    step = step or (grid[1] - grid[0] if len(grid) > 1 else 0.1)
+    wide = coarse * step
+    n_wide = int(np.ceil(max_lag / wide))
+    lags = wide * np.arange(-n_wide, n_wide + 1)
+    # Сдвиг берется только на той части сетки, где сдвинутая модель определена
+    reach = lags[-1] + wide
+    valid = (grid - reach >= t_model[0]) & (grid + reach <= t_model[-1])
+    if valid.sum() < 3:
+        return np.full(model.shape[1:], np.nan) if model.ndim > 1 else np.nan
+    g, ref = grid[valid], reference[valid]
+    if model.ndim > 1:
+        ref = ref[:, None]
+
+    cost = np.array([_lag_cost(t_model, model, g, ref, lag) for lag in lags])
+    center = lags[np.argmin(cost, axis=0)]
+    offsets = step * np.arange(-coarse, coarse + 1)
+    cost = np.array([_lag_cost(t_model, model, g, ref, center + offset) for offset in offsets])
+
+    best = np.clip(np.argmin(cost, axis=0), 1, len(offsets) - 2)
+    pick = lambda k: np.take_along_axis(cost, (best + k)[None], axis=0)[0] if cost.ndim > 1 else cost[best + k]
+    c0, c1, c2 = pick(-1), pick(0), pick(1)
+    curvature = c0 - 2 * c1 + c2
+    shift = np.where(curvature > 0, 0.5 * (c0 - c2) / np.where(curvature > 0, curvature, 1.0), 0.0)
+    return center + offsets[best] + np.clip(shift, -1.0, 1.0) * step
+
+
+def compare(t_ksp, ksp, t_model, model, stages=None, dt=0.1, max_lag=MAX_LAG, t_end=None):
+    """Сравнение записи KSP с моделью на общей сетке
+
+    ksp и model — словари каналов с одинаковыми именами; каналы модели формы
+    (шаги,) или (шаги, N) для N вариантов модели. stages — этапы записи
+    {имя: (начало, конец)} в индексах ksp. Возвращает сетку и для каждого канала
+    rmse, max_dev, t_max_dev, bias, lag и ошибки по этапам (массивы формы (N,) для пачки).
+    """
+    # Этапы записи переводятся во временные окна (индексы — в исходной записи)
+    raw_t = np.asarray(t_ksp, dtype=float)
+    bounds = {stage: (raw_t[a], raw_t[b - 1]) for stage, (a, b) in (stages or {}).items() if b > a}
+
+    names = list(ksp)
+    t_ksp, *columns = monotonic(raw_t, *(ksp[name] for name in names))
+    grid = common_time_base(t_ksp, t_model, dt, t_end=t_end)
+    result = {'t': grid}
+    if len(grid) < 2:
+        return result
+    stage_windows = {stage: window(grid, t0, t1) for stage, (t0, t1) in bounds.items()}
+
+    for name, values in zip(names, columns):
+        reference = resample(t_ksp, values, grid)
+        predicted = resample(t_model, model[name], grid)
+        metrics = error_metrics(reference, predicted, grid)
+        metrics['lag'] = estimate_lag(grid, reference, t_model, np.asarray(model[name], dtype=float), max_lag)
+        metrics['stages'] = {stage: error_metrics(reference[w], predicted[w])
+                             for stage, w in stage_windows.items() if w.stop > w.start}
+        result[name] = metrics
+    return result
+
+
+def compare_flight(flight, trajectory, **kwargs):
+    """Сравнение полета (FlightLog) с результатом integrate/simulate_batch"""
+    ksp = {name: flight.channel(name) for name in MODEL_CHANNELS}
+    model = {name: trajectory[key] for name, key in MODEL_CHANNELS.items()}
+    return compare(flight.mission_time, ksp, trajectory['t'], model, flight.stages, **kwargs)
+
+
+def compare_flights(flights, trajectory, **kwargs):
+    """Сравнение одной модели (или пачки вариантов) с несколькими полетами"""
+    return [compare_flight(flight, trajectory, **kwargs) for flight in flights]
+
+
+def _fmt(value):
+    value = np.asarray(value)
+    return f'{value.mean():.2f}' if value.size == 1 else f'{value.mean():.2f} (ср. по {value.size})'
+
+
+def print_report(result, title=''):
+    """Таблица ошибок модели по каналам и этапам"""
+    if title:
+        print(title)
+    if len(result['t']) < 2:
+        print("  Нет общего интервала времени")
+        return
+    print(f"  Интервал сравнения: {result['t'][0]:.1f}–{result['t'][-1]:.1f} с")
+    for name in MODEL_CHANNELS:
+        if name not in result:
+            continue
+        m = result[name]
+        print(f"  {name}: СКО {_fmt(m['rmse'])}, макс. отклонение {_fmt(m['max_dev'])} "
+              f"(t = {_fmt(m['t_max_dev'])} с), смещение {_fmt(m['bias'])}, запаздывание {_fmt(m['lag'])} с")
+        for stage, s in m['stages'].items():
+            print(f"    {stage}: СКО {_fmt(s['rmse'])}, макс. отклонение {_fmt(s['max_dev'])}")
+
+
+def main(argv=None):
+    from archive import FlightArchive
+    from batchsim import load_params
+    from physics import model_params
+    from trajcache import cached_integrate
+
+    parser = argparse.ArgumentParser(description='Ошибки модели относительно полетов в KSP')
+    parser.add_argument('directory', nargs='?', default='.')
+    parser.add_argument('--all', action='store_true', help='все полеты архива, а не только последний')
+    parser.add_argument('--method', default='euler', help='euler, rk4 или rk45')
+    parser.add_argument('--dt', type=float, default=0.1)
+    parser.add_argument('--total-time', type=float, default=135)
+    parser.add_argument('--vehicle', help='ракета из vehicles.json')
+    parser.add_argument('--body', help='тело из vehicles.json')
+    parser.add_argument('--curved', action='store_true', help='модель вокруг центра тела (кривизна планеты)')
+    args = parser.parse_args(argv)
+
+    archive = FlightArchive(args.directory)
+    entries = archive.select() if args.all else [e for e in [archive.latest()] if e]
+    params = {**model_params(args.vehicle, args.body), **load_params(vehicle=args.vehicle, body=args.body)}
+    if args.curved:
+        params['curved'] = 1
+    trajectory = cached_integrate(method=args.method, params=params, dt=args.dt, total_time=args.total_time,
+                                  dt_out=args.dt)
+    for entry, flight in zip(entries, archive.load(entries)):
+        print_report(compare_flight(flight, trajectory, dt=args.dt), entry['flight_id'])
+
+
+if __name__ == '__main__':
+    main()
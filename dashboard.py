@@ -0,0 +1,161 @@
+import argparse
+import time
+from array import array
+
+import numpy as np
+from batchplot import decimate_minmax
+from telemetry import DASHBOARD_ADDRESS, TelemetrySubscriber
+
+# Частота перерисовки графиков, кадров в секунду
+FPS = 10
+
+# Графики: канал телеметрии, подпись оси, цвет
+PANELS = (
+    ('altitude', 'Высота (м)', 'b'),
+    ('speed', 'Скорость (м/с)', 'r'),
+    ('pitch', 'Тангаж (град)', 'g'),
+    ('apoapsis', 'Апоцентр (м)', 'm'),
+)
+
+# Запас по осям при расширении, чтобы полную перерисовку делать пореже
+HEADROOM = 1.3
+
+
+def model_curves(params=None, total_time=135, dt=0.1):
+    """Расчет по модели (как в polsrav.py) для наложения на живые графики"""
+    from batchsim import load_params
+    from trajcache import cached_simulate_batch
+
+    params = load_params() if params is None else params
+    trajectory = cached_simulate_batch(params, dt=dt, total_time=total_time, elements=True)
+    apo = trajectory['apoapsis'][:, 0]
+    return trajectory['t'], {
+        'altitude': trajectory['y'][:, 0],
+        'speed': trajectory['speed'][:, 0],
+        'pitch': trajectory['theta'][:, 0],
+        'apoapsis': np.where(np.isfinite(apo), apo, np.nan),
+    }
+
+
+class LiveDashboard:
+    """Живые графики высоты, скорости, тангажа и апоцентра во время полета
+
+    Отсчеты берутся у подписчика (TelemetrySubscriber или QueueSubscriber) не чаще
+    fps раз в секунду. Оси, сетка и кривая модели рисуются один раз в фон, каждый
+    кадр перерисовываются только линии телеметрии (blitting). Полная перерисовка —
+    только когда данные выходят за пределы осей.
+    """
+
+    def __init__(self, subscriber, model=None, fps=FPS, max_points=2000):
+        import matplotlib.pyplot as plt
+
+        self.plt = plt
+        self.subscriber = subscriber
+        self.fps = fps
+        self.max_points = max_points
+        self.frames = 0
+        self.full_redraws = 0
+        self.data = {name: array('d') for name, _, _ in PANELS}
+        self.times = array('d')
+
+        self.fig, axes = plt.subplots(2, 2, figsize=(14, 8))
+        self.fig.suptitle('АВАНГАРД-1: телеметрия в реальном времени', fontsize=14, fontweight='bold')
+        self.axes = {}
+        self.lines = {}
+        for ax, (name, label, color) in zip(axes.ravel(), PANELS):
+            if model is not None:
+                t_model, curves = model
+                ax.plot(t_model, curves[name], color='gray', linestyle='--', linewidth=1.5, label='Модель')
+            self.lines[name], = ax.plot([], [], color=color, linewidth=2, label='KSP', animated=True)
+            ax.set_xlabel('Время полета (сек)')
+            ax.set_ylabel(label)
+            ax.grid(True, alpha=0.3)
+            ax.legend(loc='upper left', fontsize=9)
+            if model is None:
+                ax.set_xlim(0, 60)
+            self.axes[name] = ax
+        self.fig.tight_layout()
+
+        self._background = None
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event):
+        # После полной перерисовки запоминаем фон и рисуем линии поверх
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_lines()
+
+    def _draw_lines(self):
+        for name, line in self.lines.items():
+            self.axes[name].draw_artist(line)
+
+    def _extend_limits(self, t, name, values):
+        """Расширяет оси с запасом; True, если пределы изменились"""
+        ax = self.axes[name]
+        changed = False
+        x0, x1 = ax.get_xlim()
+        if t[-1] > x1:
+            ax.set_xlim(x0, t[-1] * HEADROOM)
+            changed = True
+        finite = values[np.isfinite(values)]
+        if finite.size:
+            lo, hi = finite.min(), finite.max()
+            y0, y1 = ax.get_ylim()
+            if lo < y0 or hi > y1:
+                lo, hi = min(lo, y0), max(hi, y1)
+                span = max(hi - lo, 1.0)
+                ax.set_ylim(lo - 0.05 * span, hi + (HEADROOM - 1) * span)
+                changed = True
+        return changed
+
+    def update(self, *args):
+        """Один кадр: забирает новые отсчеты и перерисовывает линии"""
+        samples = self.subscriber.poll()
+        if not samples:
+            return False
+        for sample in samples:
+            self.times.append(sample['mission_time'])
+            for name in self.data:
+                value = sample.get(name)
+                self.data[name].append(np.nan if value is None else value)
+
+        t = np.frombuffer(self.times, dtype=float)
+        redraw = False
+        for name, line in self.lines.items():
+            values = np.frombuffer(self.data[name], dtype=float)
+            line.set_data(*decimate_minmax(t, values, self.max_points))
+            redraw |= self._extend_limits(t, name, values)
+        self.frames += 1
+
+        canvas = self.fig.canvas
+        if redraw or self._background is None:
+            self.full_redraws += 1
+            canvas.draw()
+        else:
+            canvas.restore_region(self._background)
+            self._draw_lines()
+            canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+        return True
+
+    def run(self):
+        """Показывает окно и обновляет его по таймеру до закрытия"""
+        timer = self.fig.canvas.new_timer(interval=int(1000 / self.fps))
+        timer.add_callback(self.update)
+        timer.start()
+        self.plt.show()
+        timer.stop()
+        self.subscriber.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Живые графики телеметрии автопилота main2.py')
+    parser.add_argument('--host', default=DASHBOARD_ADDRESS[0])
+    parser.add_argument('--port', type=int, default=DASHBOARD_ADDRESS[1])
+    parser.add_argument('--fps', type=float, default=FPS)
+    parser.add_argument('--no-model', action='store_true', help='без кривой модели')
+    args = parser.parse_args()
+
+    subscriber = TelemetrySubscriber((args.host, args.port))
+    model = None if args.no_model else model_curves()
+    print(f"Ожидание телеметрии на {args.host}:{args.port} ({time.strftime('%H:%M:%S')})")
+    LiveDashboard(subscriber, model, fps=args.fps).run()
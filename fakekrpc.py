@@ -0,0 +1,441 @@
+import argparse
+import contextlib
+import io
+import math
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+from batchsim import broadcast_params, apsides
+from flightlog import load_flight
+from missionclock import SimClock
+from physics import PhysicsModel, specific_impulse
+
+
+class FakeStream:
+    """Поток kRPC: при каждом вызове заново читает значение из объекта"""
+
+    def __init__(self, func, *args, **kwargs):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.rate = 0
+        self.removed = False
+
+    def __call__(self):
+        return self.func(*self.args, **self.kwargs)
+
+    def remove(self):
+        self.removed = True
+
+
+class FakeConnection:
+    """Подключение kRPC без сервера: add_stream и space_center над подставными объектами"""
+
+    def __init__(self, space_center):
+        self.space_center = space_center
+        self.streams = []
+        self.closed = False
+
+    def add_stream(self, func, *args, **kwargs):
+        stream = FakeStream(func, *args, **kwargs)
+        self.streams.append(stream)
+        return stream
+
+    def close(self):
+        self.closed = True
+
+
+class RecordedTelemetry:
+    """Телеметрия записанного полета на любой момент времени (линейная интерполяция)
+
+    Апоцентр и перицентр, которых нет в записи, считаются сразу для всех отсчетов
+    по высоте, скорости и тангажу. Повторные отсчеты с тем же временем отбрасываются.
+    """
+
+    def __init__(self, flight, params=None):
+        t = np.asarray(flight.mission_time, dtype=float)
+        keep = np.concatenate(([True], np.diff(t) > 0)) if len(t) else np.zeros(0, dtype=bool)
+        self.t = t[keep]
+        self.channels = {name: np.asarray(flight.channel(name), dtype=float)[keep]
+                         for name in ('altitude', 'speed', 'pitch')}
+
+        pitch = np.radians(self.channels['pitch'])
+        speed = self.channels['speed']
+        apo, peri = apsides(self.channels['altitude'], speed * np.cos(pitch), speed * np.sin(pitch),
+                            broadcast_params(params))
+        self.channels['apoapsis'] = apo
+        self.channels['periapsis'] = peri
+        self.duration = float(self.t[-1]) if len(self.t) else 0.0
+        self._time = None
+        self._sample = None
+
+    def __call__(self, t):
+        # Телеметрию за один такт читают несколько раз — считаем один раз на момент времени
+        if t != self._time:
+            self._time = t
+            self._sample = {name: float(np.interp(t, self.t, values)) for name, values in self.channels.items()}
+        return self._sample
+
+
+def recorded_profile(path, params=None):
+    """Телеметрия из записанного полета (файл любого формата load_flight), см. RecordedTelemetry"""
+    return RecordedTelemetry(load_flight(path), params)
+
+
+class FakeFlight:
+    def __init__(self, vessel):
+        self._vessel = vessel
+
+    @property
+    def mean_altitude(self):
+        return self._vessel.sample()['altitude']
+
+    @property
+    def pitch(self):
+        return self._vessel.sample()['pitch']
+
+    @property
+    def speed(self):
+        return self._vessel.sample()['speed']
+
+
+class FakeBody:
+    non_rotating_reference_frame = 'non_rotating'
+
+
+class FakeOrbit:
+    body = FakeBody()
+
+    def __init__(self, vessel):
+        self._vessel = vessel
+
+    @property
+    def speed(self):
+        return self._vessel.sample()['speed']
+
+    @property
+    def apoapsis_altitude(self):
+        return self._vessel.sample()['apoapsis']
+
+    @property
+    def periapsis_altitude(self):
+        return self._vessel.sample()['periapsis']
+
+
+class FakeControl:
+    def __init__(self, vessel):
+        self._vessel = vessel
+        self._throttle = 0.0
+        self.sas = False
+        self.sas_mode = None
+        self.rcs = False
+        self.brakes = False
+        self.gear = False
+
+    @property
+    def throttle(self):
+        return self._throttle
+
+    @throttle.setter
+    def throttle(self, value):
+        self._vessel.sync()
+        self._throttle = value
+        self._vessel.log('throttle', value)
+
+    def activate_next_stage(self):
+        self._vessel.sync()
+        self._vessel.stage += 1
+        self._vessel.on_stage(self._vessel.stage)
+        self._vessel.log('activate_next_stage', self._vessel.stage)
+        return []
+
+
+class FakeAutoPilot:
+    def __init__(self, vessel):
+        self._vessel = vessel
+        self.engaged = False
+        self.target_pitch = 90.0
+        self.target_heading = 90.0
+
+    def engage(self):
+        self._vessel.sync()
+        self.engaged = True
+
+    def disengage(self):
+        self._vessel.sync()
+        self.engaged = False
+
+    def target_pitch_and_heading(self, pitch, heading):
+        self._vessel.sync()
+        self.target_pitch = pitch
+        self.target_heading = heading
+        self._vessel.log('target_pitch_and_heading', (pitch, heading))
+
+
+class FakeParts:
+    all = []
+
+
+class FakeVessel:
+    """Подставная ракета: телеметрия берется из profile(t), команды записываются в журнал"""
+
+    def __init__(self, profile, clock=time.perf_counter, thrust=200000.0):
+        self.profile = profile
+        self.clock = clock
+        self.start = clock()
+        self.stage = 0
+        self.thrust = thrust
+        self.commands = []
+        self.parts = FakeParts()
+        self.orbit = FakeOrbit(self)
+        self.control = FakeControl(self)
+        self.auto_pilot = FakeAutoPilot(self)
+        self._flight = FakeFlight(self)
+
+    def elapsed(self):
+        return self.clock() - self.start
+
+    def sample(self):
+        return self.profile(self.elapsed())
+
+    def sync(self):
+        """Доводит состояние до текущего момента перед командой (у записи состояния нет)"""
+
+    def on_stage(self, stage):
+        """Реакция на activate_next_stage"""
+
+    def flight(self, reference_frame=None):
+        return self._flight
+
+    @property
+    def available_thrust(self):
+        return self.thrust if self.stage > 0 else 0.0
+
+    def log(self, command, value):
+        self.commands.append((round(self.elapsed(), 3), command, value))
+
+
+class ModelVessel(FakeVessel):
+    """Подставная ракета, движение которой считается по модели проекта (physics.py)
+
+    Состояние интегрируется шагами dt до текущего времени часов при чтении телеметрии
+    и перед каждой командой, поэтому тяга, тангаж и ступени меняются ровно в момент
+    команды. activate_next_stage идет в порядке main2.py: запуск первой ступени,
+    отделение первой ступени, запуск второй, отделение спутника. Автопилот
+    доворачивает ракету к заданному тангажу с ограниченной скоростью pitch_rate.
+    """
+
+    STAGE_ACTIONS = ('ignite_1', 'separate_1', 'ignite_2', 'deploy')
+
+    def __init__(self, vehicle=None, body=None, params=None, clock=time.perf_counter,
+                 dt=0.02, pitch_rate=5.0, satellite_mass=0.0):
+        super().__init__(None, clock=clock)
+        # Шаг dt — тысячи вызовов физики на полет: плотность и гравитация из таблиц
+        self.physics = PhysicsModel(vehicle, body, params=params, tables=True)
+        self.p = self.physics.params
+        self.S = math.pi * self.p['r'] ** 2
+        self.dt = dt
+        self.pitch_rate = pitch_rate
+        self.satellite_mass = satellite_mass
+
+        self.t = 0.0
+        self.x = self.y = self.vx = self.vy = 0.0
+        self.pitch = 90.0
+        self.mass = self.p['m0_1']
+        self.fuel = 0.0
+        self.flow = 0.0
+        self.isp_vac = self.p['Isp_1']
+        self.engine = False
+        self.events = []
+        self._sample_time = None
+        self._sample = None
+
+    def on_stage(self, stage):
+        if stage > len(self.STAGE_ACTIONS):
+            return
+        action = self.STAGE_ACTIONS[stage - 1]
+        p = self.p
+        if action == 'ignite_1':
+            self.engine = True
+            self.fuel = p['m0_1'] - p['mk_1']
+            self.flow = self.fuel / p['t_work1']
+            self.isp_vac = p['Isp_1']
+        elif action == 'separate_1':
+            self.engine = False
+            self.mass = min(self.mass, p['m0_2'])
+            self.fuel = 0.0
+        elif action == 'ignite_2':
+            self.engine = True
+            self.fuel = max(self.mass - p['mk_2'], 0.0)
+            self.flow = (p['m0_2'] - p['mk_2']) / p['t_work2']
+            self.isp_vac = p['Isp_2']
+        elif action == 'deploy':
+            self.mass -= self.satellite_mass
+        self.events.append((round(self.t, 3), action))
+
+    def max_thrust(self, factor=None):
+        """Тяга при полностью открытой заслонке, Н"""
+        if not self.engine or self.fuel <= 0:
+            return 0.0
+        p = self.p
+        factor = self.physics.atmosphere_factor(self.y) if factor is None else factor
+        return specific_impulse(self.isp_vac, p['isp_sea_factor'], factor) * self.flow * p['g0']
+
+    def _step(self, dt):
+        p = self.p
+        factor = self.physics.atmosphere_factor(self.y)
+
+        thrust = 0.0
+        throttle = min(max(self.control.throttle, 0.0), 1.0)
+        if throttle > 0 and self.engine and self.fuel > 0:
+            thrust = self.max_thrust(factor) * throttle
+            burned = min(self.flow * throttle * dt, self.fuel)
+            self.fuel -= burned
+            self.mass -= burned
+
+        if self.auto_pilot.engaged:
+            turn = self.auto_pilot.target_pitch - self.pitch
+            limit = self.pitch_rate * dt
+            self.pitch += min(max(turn, -limit), limit)
+
+        v = math.hypot(self.vx, self.vy)
+        drag = 0.5 * self.physics.density(self.y, factor) * v * v * p['Cx'] * self.S
+        v = v if v > 0 else 1.0
+        theta = math.radians(self.pitch)
+        ax = (thrust * math.cos(theta) - drag * self.vx / v) / self.mass
+        ay = (thrust * math.sin(theta) - drag * self.vy / v) / self.mass - self.physics.gravity(self.y)
+
+        # Полунеявный метод Эйлера, как в batchsim
+        self.vx += ax * dt
+        self.vy += ay * dt
+        self.y += self.vy * dt
+        self.x += self.vx * dt
+        if self.y <= 0:
+            # Стоим на стартовом столе, пока тяга не больше веса
+            self.y = 0.0
+            self.vx = 0.0
+            self.vy = max(self.vy, 0.0)
+        self.t += dt
+
+    def sync(self, now=None):
+        now = self.elapsed() if now is None else now
+        while self.t + self.dt <= now:
+            self._step(self.dt)
+        if now - self.t > 1e-9:
+            self._step(now - self.t)
+
+    def sample(self):
+        now = self.elapsed()
+        if now != self._sample_time:
+            self.sync(now)
+            apo, peri = apsides(self.y, self.vx, self.vy, self.p)
+            self._sample = {
+                'altitude': self.y,
+                'speed': math.hypot(self.vx, self.vy),
+                'pitch': self.pitch,
+                'apoapsis': float(apo),
+                'periapsis': float(peri),
+            }
+            self._sample_time = now
+        return self._sample
+
+    @property
+    def available_thrust(self):
+        self.sync()
+        return self.max_thrust()
+
+
+class FakeSpaceCenter:
+    class SASMode:
+        stability_assist = 'stability_assist'
+
+    def __init__(self, vessel):
+        self.active_vessel = vessel
+
+    @property
+    def ut(self):
+        return self.active_vessel.elapsed()
+
+
+def connect(profile, **kwargs):
+    """Подключение к подставной ракете с заданной телеметрией"""
+    return FakeConnection(FakeSpaceCenter(FakeVessel(profile, **kwargs)))
+
+
+def connect_model(clock=None, **kwargs):
+    """Подключение к ракете, которая летит по модели проекта (см. ModelVessel)"""
+    clock = clock or SimClock()
+    vessel = ModelVessel(clock=clock.perf_counter, **kwargs)
+    return FakeConnection(FakeSpaceCenter(vessel))
+
+
+def simulate_missions(runs=1, params=None, rate=20, timeout=150, workdir=None, quiet=True, **kwargs):
+    """Прогоняет автопилот main2.py на модельной ракете в модельном времени
+
+    Каждый полет идет в своем временном каталоге (файлы полета удаляются, если не
+    задан workdir). Возвращает сводку по полетам: итоговые апсиды, пройденные этапы,
+    команды, время расчета.
+    """
+    import main2
+
+    results = []
+    for run in range(runs):
+        clock = SimClock()
+        conn = connect_model(clock, params=params[run] if isinstance(params, list) else params, **kwargs)
+        vessel = conn.space_center.active_vessel
+        directory = tempfile.mkdtemp(prefix='avangard_sim_', dir=workdir)
+        cwd = os.getcwd()
+        started = time.perf_counter()
+        try:
+            os.chdir(directory)
+            output = io.StringIO() if quiet else None
+            with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+                mission = main2.fly(conn, rate=rate, timeout=timeout, clock=clock, echo=not quiet)
+        finally:
+            os.chdir(cwd)
+            if workdir is None:
+                shutil.rmtree(directory, ignore_errors=True)
+        sample = vessel.sample()
+        results.append({
+            'run': run,
+            'sim_time': round(clock.now, 3),
+            'wall_time': round(time.perf_counter() - started, 3),
+            'altitude': round(sample['altitude'], 1),
+            'speed': round(sample['speed'], 1),
+            'apoapsis': round(sample['apoapsis'], 1),
+            'periapsis': round(sample['periapsis'], 1),
+            'stage_events': vessel.events,
+            'phases': [p['phase'] for p in mission['phases']] if mission else [],
+            'samples': len(mission['flight_data']) if mission else 0,
+            'directory': None if workdir is None else directory,
+        })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Полет автопилота main2.py на модели без KSP в ускоренном времени')
+    parser.add_argument('--runs', type=int, default=1)
+    parser.add_argument('--rate', type=float, default=20)
+    parser.add_argument('--timeout', type=float, default=150)
+    parser.add_argument('--vehicle', help='ракета из vehicles.json')
+    parser.add_argument('--body', help='тело из vehicles.json')
+    parser.add_argument('--keep', help='каталог, где оставить файлы полетов')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    results = simulate_missions(args.runs, rate=args.rate, timeout=args.timeout, workdir=args.keep,
+                                vehicle=args.vehicle, body=args.body)
+    for r in results:
+        print(f"Полет {r['run']}: {r['sim_time']} с модельного времени за {r['wall_time']} с, "
+              f"высота {r['altitude']} м, апоцентр {r['apoapsis']} м, перицентр {r['periapsis']} м, "
+              f"ступени {r['stage_events']}, последний этап {(r['phases'] or ['-'])[-1]}")
+    elapsed = time.perf_counter() - started
+    sim = sum(r['sim_time'] for r in results)
+    print(f"Полетов: {len(results)}, {elapsed:.1f} с, ускорение {sim / max(elapsed, 1e-9):.0f}x")
+
+
+if __name__ == '__main__':
+    main()
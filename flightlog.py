@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+from functools import cached_property
+
+from binlog import BinaryFlightLog, MAGIC, from_channels, from_flight_data, write_log
+from jsonstream import FlightStreamReader
+
+# Каталог кэша разобранных полетов (рядом с файлом полета)
+CACHE_DIR_NAME = '.flightcache'
+
+# В кэше все каналы хранятся в двойной точности, чтобы значения совпадали с JSON
+CACHE_DTYPES = {'speed': '<f8', 'pitch': '<f8'}
+
+# Файлы больше этого размера разбираются потоково, без json.load всего файла
+STREAM_THRESHOLD = 32 * 1024 * 1024
+
+
+class FlightLog:
+    """Записанный полет: сведения о миссии, этапы и каналы телеметрии
+
+    Каналы берутся из отображенного в память файла .avlog и превращаются
+    в массивы NumPy только при первом обращении.
+    """
+
+    def __init__(self, path, channels, stages, meta):
+        self.path = path
+        self._channels = channels
+        self.stages = dict(stages)
+        self.mission_info = meta.get('mission_info', {})
+        self.data_summary = meta.get('data_summary', {})
+        self.error = meta.get('error')
+        self.truncated = meta.get('truncated', False)
+
+    def __len__(self):
+        return len(next(iter(self._channels.values()), ()))
+
+    @property
+    def channel_names(self):
+        return list(self._channels)
+
+    def channel(self, name):
+        """Канал телеметрии как массив NumPy"""
+        return self._channels[name]
+
+    @cached_property
+    def mission_time(self):
+        return self.channel('mission_time')
+
+    @cached_property
+    def altitude(self):
+        return self.channel('altitude')
+
+    @cached_property
+    def speed(self):
+        return self.channel('speed')
+
+    @cached_property
+    def pitch(self):
+        return self.channel('pitch')
+
+    def stage(self, name):
+        """Каналы одного этапа полета (first_stage / second_stage)"""
+        a, b = self.stages[name]
+        return {k: v[a:b] for k, v in self._channels.items()}
+
+
+def _open_binary(path, binary_path=None):
+    binary = BinaryFlightLog(binary_path or path)
+    return FlightLog(path, binary.channels, binary.stages, binary.meta)
+
+
+def _parse_json(path):
+    """Разбирает JSON полета в каналы, этапы и сведения о миссии
+
+    Большие и оборванные файлы (аварийные записи) читаются потоково,
+    у оборванных в сведениях ставится признак truncated.
+    """
+    if os.path.getsize(path) <= STREAM_THRESHOLD:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except json.JSONDecodeError:
+            pass
+        else:
+            meta = {k: v for k, v in data.items() if k not in ('flight_data', 'stages_data')}
+            return from_flight_data(data.get('flight_data', []), meta)
+
+    reader = FlightStreamReader(path)
+    channels = reader.channels()
+    meta = dict(reader.meta)
+    if reader.truncated:
+        meta['truncated'] = True
+    return from_channels(channels, meta)
+
+
+def _cache_path(path, cache_dir=None):
+    st = os.stat(path)
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), CACHE_DIR_NAME)
+    prefix = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16]
+    return cache_dir, prefix, os.path.join(cache_dir, f'{prefix}-{st.st_mtime_ns}-{st.st_size}.avlog')
+
+
+def _build_cache(path, cache_dir, prefix, cached):
+    """Разбирает JSON полета и сохраняет его в кэш в формате .avlog"""
+    channels, stages, meta = _parse_json(path)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Старые записи кэша для этого файла больше не нужны
+    for name in os.listdir(cache_dir):
+        if name.startswith(prefix + '-'):
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+    tmp = f'{cached}.{os.getpid()}.tmp'
+    write_log(tmp, channels, stages, meta, CACHE_DTYPES)
+    os.replace(tmp, cached)
+
+
+def load_flight(path, cache_dir=None, use_cache=True):
+    """Загружает полет из JSON или .avlog
+
+    Разобранный JSON кэшируется на диске по пути, времени изменения и размеру файла,
+    повторные загрузки того же файла обходятся без разбора JSON.
+    """
+    with open(path, 'rb') as f:
+        is_binary = f.read(len(MAGIC)) == MAGIC
+    if is_binary:
+        return _open_binary(path)
+    if not use_cache:
+        channels, stages, meta = _parse_json(path)
+        return FlightLog(path, channels, stages, meta)
+
+    cache_dir, prefix, cached = _cache_path(path, cache_dir)
+    if not os.path.exists(cached):
+        _build_cache(path, cache_dir, prefix, cached)
+    return _open_binary(path, cached)
+
+
+def clear_cache(directory='.'):
+    """Удаляет кэш разобранных полетов в каталоге"""
+    cache_dir = os.path.join(directory, CACHE_DIR_NAME)
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            os.remove(os.path.join(cache_dir, name))
+        os.rmdir(cache_dir)
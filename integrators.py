@@ -0,0 +1,294 @@
+import numpy as np
+from batchsim import (broadcast_params, derived_params, acceleration, apsides, pitch_program, trajectory_elements,
+                      STATE_X, STATE_Y, STATE_VX, STATE_VY)
+
+METHODS = ('euler', 'rk4', 'rk45')
+
+# Высоты, пересечение которых фиксируется как событие (пороги из main2.py)
+DEFAULT_ALTITUDE_EVENTS = {
+    'altitude_17000': 17000.0,
+    'altitude_100000': 100000.0,
+}
+
+# Событие выключения двигателя по апоцентру (параметр apo_cutoff)
+APO_CUTOFF = 'apo_cutoff'
+
+# Коэффициенты Дорманда–Принса 5(4)
+DP_C = (0.0, 1 / 5, 3 / 10, 4 / 5, 8 / 9, 1.0, 1.0)
+DP_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+    (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+)
+DP_B = (35 / 384, 0.0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84, 0.0)
+DP_E = (71 / 57600, 0.0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40)
+
+
+def derivatives(t, state, p, d, t_branch):
+    """Производная вектора состояния (x, y, vx, vy) для всех траекторий"""
+    ax, ay = acceleration(t, state, p, d, t_branch)
+    return np.column_stack((state[:, STATE_VX], state[:, STATE_VY], ax, ay))
+
+
+def time_events(p, d, total_time):
+    """Разрывы модели по времени: выгорание ступеней, начало и конец разворота"""
+    sources = {
+        'stage1_burnout': p['t_work1'],
+        'stage2_burnout': d['t_end2'],
+        'turn_start': p['t_start_turn'],
+        'turn_end': p['t_end_turn'],
+    }
+    events = []
+    for name, values in sources.items():
+        for i, t_event in enumerate(values):
+            if 0 < t_event < total_time:
+                events.append((float(t_event), name, i))
+    events.sort()
+    return events
+
+
+def step_euler(rhs, t, state, h, f0=None):
+    """Шаг полунеявного метода Эйлера (как в исходной модели)"""
+    f = rhs(t, state) if f0 is None else f0
+    new = state.copy()
+    new[:, 2:] += f[:, 2:] * h
+    new[:, :2] += new[:, 2:] * h
+    return new, (None, None, f), 1 if f0 is None else 0
+
+
+def step_rk4(rhs, t, state, h, f0=None):
+    """Шаг классического метода Рунге–Кутты 4-го порядка"""
+    k1 = rhs(t, state) if f0 is None else f0
+    k2 = rhs(t + h / 2, state + k1 * (h / 2))
+    k3 = rhs(t + h / 2, state + k2 * (h / 2))
+    k4 = rhs(t + h, state + k3 * h)
+    new = state + (k1 + 2 * k2 + 2 * k3 + k4) * (h / 6)
+    return new, (None, None, k1), 4 if f0 is None else 3
+
+
+def step_dopri(rhs, t, state, h, f0=None):
+    """Шаг Дорманда–Принса: решение 5-го порядка и оценка ошибки"""
+    k = [rhs(t, state) if f0 is None else f0]
+    for c, a in zip(DP_C[1:], DP_A[1:]):
+        k.append(rhs(t + c * h, state + h * sum(a_j * k_j for a_j, k_j in zip(a, k) if a_j)))
+    new = state + h * sum(b * k_i for b, k_i in zip(DP_B, k) if b)
+    error = h * sum(e * k_i for e, k_i in zip(DP_E, k) if e)
+    return new, (error, k[-1], k[0]), 7 if f0 is None else 6
+
+
+STEPPERS = {'euler': step_euler, 'rk4': step_rk4, 'rk45': step_dopri}
+
+
+def error_norm(error, state, new, rtol, atol):
+    """Взвешенная среднеквадратичная ошибка шага (максимум по траекториям)"""
+    scale = atol + rtol * np.maximum(np.abs(state), np.abs(new))
+    return float(np.max(np.sqrt(np.mean((error / scale) ** 2, axis=1))))
+
+
+def hermite_crossing(t0, h, y0, y1, v0, v1, level):
+    """Момент пересечения уровня по кубическому эрмитову сплайну высоты на шаге"""
+    def height(s):
+        return ((2 * s ** 3 - 3 * s ** 2 + 1) * y0 + (s ** 3 - 2 * s ** 2 + s) * h * v0
+                + (-2 * s ** 3 + 3 * s ** 2) * y1 + (s ** 3 - s ** 2) * h * v1)
+
+    lo, hi = 0.0, 1.0
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        if height(mid) < level:
+            lo = mid
+        else:
+            hi = mid
+    return t0 + hi * h
+
+
+def hermite_output(grid, steps):
+    """Состояния на сетке grid по кубическому эрмитову сплайну внутри принятых шагов
+
+    steps — (t0, h, y0, y1, f0, f1) каждого шага: начало и длина шага, состояния и
+    производные на его концах. Возвращает массив формы (len(grid), N, 4).
+    """
+    t0 = np.array([s[0] for s in steps])
+    h = np.array([s[1] for s in steps])
+    y0, y1, f0, f1 = (np.array([s[k] for s in steps]) for k in range(2, 6))
+
+    j = np.clip(np.searchsorted(t0, grid, side='right') - 1, 0, len(steps) - 1)
+    s = np.clip((grid - t0[j]) / h[j], 0.0, 1.0)[:, None, None]
+    hj = h[j][:, None, None]
+    return ((2 * s ** 3 - 3 * s ** 2 + 1) * y0[j] + (s ** 3 - 2 * s ** 2 + s) * hj * f0[j]
+            + (-2 * s ** 3 + 3 * s ** 2) * y1[j] + (s ** 3 - s ** 2) * hj * f1[j])
+
+
+def integrate(method='rk45', params=None, n=None, dt=0.1, total_time=135,
+              rtol=1e-6, atol=1e-3, max_step=None, altitude_events=None, event_tol=1e-3,
+              elements=False, dt_out=None):
+    """Интегрирует модель выбранным методом с точным попаданием на события
+
+    method — 'euler', 'rk4' (шаг dt) или 'rk45' (адаптивный шаг, начальный dt).
+    Шаги укорачиваются так, чтобы попадать ровно на разрывы модели по времени
+    (выгорание ступеней, границы разворота) и на пересечения высот altitude_events
+    (с точностью event_tol, м). Выключение двигателя по апоцентру apo_cutoff — такое же
+    событие: шаг заканчивается там, где апоцентр достиг apo_cutoff, дальше тяги нет.
+    Метод 'euler' — тот же полунеявный Эйлер, что в simulate_batch, но с точным
+    попаданием на события, поэтому кривые немного отличаются: simulate_batch
+    разрывы модели учитывает на целом шаге, а в строку t кладет состояние после
+    шага из t (в t + dt).
+    Возвращает словарь с каналами формы (шаги, N), как simulate_batch, а также
+    'events' — список событий, 'n_rhs' — число вычислений правых частей и 't_cut' —
+    момент выключения по апоцентру (inf, если не было);
+    при elements=True еще 'apoapsis', 'periapsis', 'eccentricity' на каждом шаге.
+    Без dt_out каналы даются в моменты принятых шагов; с dt_out — на равномерной
+    сетке 0, dt_out, ..., total_time по эрмитову сплайну внутри шагов (адаптивный
+    метод делает немного длинных шагов, и линейная интерполяция между ними дает
+    ошибку больше ошибки самого метода). События и 'state' от сетки не зависят.
+    """
+    if method not in STEPPERS:
+        raise ValueError(f"Неизвестный метод интегрирования: {method}. Доступны: {', '.join(METHODS)}")
+    if altitude_events is None:
+        altitude_events = DEFAULT_ALTITUDE_EVENTS
+
+    p = broadcast_params(params, n)
+    d = derived_params(p)
+    n = p['g0'].shape[0]
+    step = STEPPERS[method]
+    adaptive = method == 'rk45'
+    max_step = max_step or total_time
+
+    branch = [0.0]
+
+    def rhs(t, state):
+        return derivatives(t, state, p, d, branch[0])
+
+    t_events = time_events(p, d, total_time)
+    boundaries = sorted({t_event for t_event, _, _ in t_events} | {float(total_time)})
+    fired = {name: np.zeros(n, dtype=bool) for name in altitude_events}
+    cutoff = bool(np.any(np.isfinite(p['apo_cutoff'])))
+
+    def event_value(name, s):
+        """Величина, которая на событии проходит через ноль (для всех траекторий)"""
+        if name == APO_CUTOFF:
+            return apsides(s[:, STATE_Y], s[:, STATE_VX], s[:, STATE_VY], p)[0] - p['apo_cutoff']
+        return s[:, STATE_Y] - altitude_events[name]
+
+    t = 0.0
+    state = np.zeros((n, 4))
+    times = [t]
+    states = [state]
+    events = []
+    n_rhs = 0
+    h = dt
+    f_last = None
+    steps = []
+
+    for seg_end in boundaries:
+        while seg_end - t > 1e-9:
+            h_try = min(h if adaptive else dt, max_step, seg_end - t)
+            # Все кусочные функции берутся по середине шага, который не пересекает разрывов
+            branch[0] = t + h_try / 2
+            new, extra, evals = step(rhs, t, state, h_try, f_last)
+            n_rhs += evals
+
+            if adaptive:
+                error = extra[0]
+                err = error_norm(error, state, new, rtol, atol)
+                factor = 0.9 * err ** -0.2 if err > 0 else 5.0
+                if err > 1.0:
+                    h = h_try * max(0.2, factor)
+                    continue
+                h = h_try * min(5.0, max(0.2, factor))
+
+            # Поиск пересечений высот на принятом шаге
+            crossing = None
+            for name, level in altitude_events.items():
+                crossed = np.flatnonzero(~fired[name] & (state[:, STATE_Y] < level) & (new[:, STATE_Y] >= level))
+                for i in crossed:
+                    t_cross = hermite_crossing(t, h_try, state[i, STATE_Y], new[i, STATE_Y],
+                                               state[i, STATE_VY], new[i, STATE_VY], level)
+                    if crossing is None or t_cross < crossing[0]:
+                        crossing = (t_cross, name, i)
+            if cutoff:
+                before, after = event_value(APO_CUTOFF, state), event_value(APO_CUTOFF, new)
+                for i in np.flatnonzero(np.isinf(d['t_cut']) & (before < 0) & (after >= 0)):
+                    # Первое приближение — линейно по апоцентру (у незамкнутой орбиты он бесконечен)
+                    share = -before[i] / (after[i] - before[i]) if np.isfinite(after[i]) else 0.5
+                    t_cross = t + h_try * share
+                    if crossing is None or t_cross < crossing[0]:
+                        crossing = (t_cross, APO_CUTOFF, i)
+
+            if crossing is not None and crossing[0] < t + h_try - 1e-9:
+                # Повторяем шаг так, чтобы закончить его ровно на событии:
+                # первое приближение по сплайну, затем уточнение методом хорд
+                _, name, i = crossing
+                h_lo, f_lo = 0.0, event_value(name, state)[i]
+                h_hi, f_hi = h_try, event_value(name, new)[i]
+                h_try = crossing[0] - t
+                for _ in range(8):
+                    branch[0] = t + h_try / 2
+                    new, extra, evals = step(rhs, t, state, h_try, f_last)
+                    n_rhs += evals
+                    f_mid = event_value(name, new)[i]
+                    if abs(f_mid) <= event_tol:
+                        break
+                    if f_mid < 0:
+                        h_lo, f_lo = h_try, f_mid
+                    else:
+                        h_hi, f_hi = h_try, f_mid
+                    if np.isfinite(f_hi):
+                        h_try = h_lo - f_lo * (h_hi - h_lo) / (f_hi - f_lo)
+                    else:
+                        h_try = (h_lo + h_hi) / 2
+
+            f_last = extra[1] if adaptive else None
+            if dt_out is not None:
+                # Производные на концах шага (ветвь модели — по середине шага); производная
+                # в конце шага годится и для начала следующего, пока нет разрыва
+                if not adaptive:
+                    f_last = rhs(t + h_try, new)
+                    n_rhs += 1
+                steps.append((t, h_try, state, new, extra[2], f_last))
+            t = t + h_try
+            state = new
+            times.append(t)
+            states.append(state)
+
+            if crossing is not None:
+                t_cross, name, i = crossing
+                if name == APO_CUTOFF:
+                    # Тяга пропадает: производная меняется, как на разрыве по времени
+                    d['t_cut'][i] = t
+                    f_last = None
+                else:
+                    fired[name][i] = True
+                events.append({'name': name, 't': t, 'index': int(i), 'state': state[i].copy()})
+
+        # На разрыве производная меняется, результат последнего вычисления не годится
+        t = seg_end
+        f_last = None
+        for t_event, name, i in t_events:
+            if t_event == seg_end:
+                events.append({'name': name, 't': t, 'index': i, 'state': state[i].copy()})
+
+    if dt_out is not None:
+        times = dt_out * np.arange(int(np.floor(total_time / dt_out + 1e-9)) + 1)
+        states = hermite_output(times, steps)
+    else:
+        states = np.array(states)
+    result = {
+        't': np.array(times),
+        'x': states[:, :, STATE_X],
+        'y': states[:, :, STATE_Y],
+        'vx': states[:, :, STATE_VX],
+        'vy': states[:, :, STATE_VY],
+        'speed': np.hypot(states[:, :, STATE_VX], states[:, :, STATE_VY]),
+        'theta': np.array([pitch_program(t_i, p, d, h=s_i[:, STATE_Y]) for t_i, s_i in zip(times, states)]),
+        'state': state,
+        'events': events,
+        'n_rhs': n_rhs,
+        't_cut': d['t_cut'],
+    }
+    if elements:
+        result.update(trajectory_elements(result, params))
+    return result
@@ -0,0 +1,195 @@
+import json
+import re
+from array import array
+
+import numpy as np
+
+# Ключ со списком отсчетов в файлах main2.py
+SAMPLES_KEY = 'flight_data'
+
+# Ключи верхнего уровня, которые пропускаются без разбора в память (копии отсчетов)
+SKIP_KEYS = ('stages_data',)
+
+WHITESPACE = re.compile(r'[ \t\n\r]*')
+SEPARATOR = re.compile(r'[ \t\n\r]*,?[ \t\n\r]*')
+
+
+class FlightStreamReader:
+    """Потоковое чтение отсчетов полета из JSON (или JSON Lines) при постоянной памяти
+
+    Файл читается кусками, отсчеты flight_data выдаются по одному по мере чтения,
+    остальные ключи верхнего уровня собираются в meta. Оборванный конец файла
+    (например, после аварии) не считается ошибкой: чтение останавливается,
+    а truncated становится True.
+    """
+
+    def __init__(self, path, chunk_size=1 << 16, skip_keys=SKIP_KEYS):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.skip_keys = set(skip_keys)
+        self.meta = {}
+        self.truncated = False
+        self.count = 0
+        self._decoder = json.JSONDecoder()
+
+    def __iter__(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self._file = f
+            self._buf = ''
+            self._pos = 0
+            self._eof = False
+            try:
+                if self.path.endswith('.jsonl'):
+                    yield from self._iter_lines()
+                else:
+                    yield from self._iter_document()
+            except _Truncated:
+                self.truncated = True
+
+    # --- буфер -----------------------------------------------------------
+
+    def _fill(self):
+        data = self._file.read(self.chunk_size)
+        if not data:
+            self._eof = True
+            return False
+        self._buf = self._buf[self._pos:] + data
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """Следующий значащий символ (пробелы пропускаются)"""
+        while True:
+            self._pos = WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                raise _Truncated()
+
+    def _expect(self, char):
+        if self._peek() != char:
+            raise ValueError(f"{self.path}: ожидался символ {char!r} в позиции {self._pos}")
+        self._pos += 1
+
+    def _decode(self):
+        """Одно значение JSON; при нехватке данных дочитывает файл"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                if self._eof or not self._fill():
+                    raise _Truncated()
+                continue
+            # Число на границе куска могло быть обрезано — дочитываем и разбираем заново
+            if end == len(self._buf) and not self._eof and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    # --- разбор ----------------------------------------------------------
+
+    def _iter_lines(self):
+        for line in self._file:
+            if not line.strip():
+                continue
+            try:
+                sample = json.loads(line)
+            except json.JSONDecodeError:
+                raise _Truncated()
+            self.count += 1
+            yield sample
+
+    def _iter_array(self):
+        self._expect('[')
+        raw_decode = self._decoder.raw_decode
+        while True:
+            # Быстрый путь: элемент целиком лежит в буфере
+            buf = self._buf
+            pos = SEPARATOR.match(buf, self._pos).end()
+            if pos < len(buf):
+                if buf[pos] == ']':
+                    self._pos = pos + 1
+                    return
+                try:
+                    value, end = raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    pass
+                else:
+                    if end < len(buf):
+                        self._pos = end
+                        yield value
+                        continue
+
+            # Элемент на границе куска — дочитываем файл
+            self._pos = pos
+            char = self._peek()
+            if char == ']':
+                self._pos += 1
+                return
+            if char == ',':
+                self._pos += 1
+                continue
+            yield self._decode()
+
+    def _skip_value(self):
+        """Пропускает значение, не держа его целиком в памяти"""
+        char = self._peek()
+        if char == '[':
+            for _ in self._iter_array():
+                pass
+        elif char == '{':
+            self._pos += 1
+            while True:
+                char = self._peek()
+                if char == '}':
+                    self._pos += 1
+                    return
+                if char == ',':
+                    self._pos += 1
+                    continue
+                self._decode()
+                self._expect(':')
+                self._skip_value()
+        else:
+            self._decode()
+
+    def _iter_document(self):
+        self._expect('{')
+        while True:
+            char = self._peek()
+            if char == '}':
+                self._pos += 1
+                return
+            if char == ',':
+                self._pos += 1
+                continue
+            key = self._decode()
+            self._expect(':')
+            if key == SAMPLES_KEY:
+                for sample in self._iter_array():
+                    self.count += 1
+                    yield sample
+            elif key in self.skip_keys:
+                self._skip_value()
+            else:
+                self.meta[key] = self._decode()
+
+    def channels(self):
+        """Читает весь файл в каналы NumPy (без списка словарей в памяти)"""
+        columns = {}
+        for sample in self:
+            if not columns:
+                columns = {name: array('d') for name in sample}
+            for name, column in columns.items():
+                column.append(sample.get(name, np.nan))
+        return {name: np.frombuffer(column, dtype=float) for name, column in columns.items()}
+
+
+class _Truncated(Exception):
+    """Файл оборвался посреди значения"""
+
+
+def iter_samples(path, chunk_size=1 << 16):
+    """Отсчеты полета по одному по мере чтения файла"""
+    yield from FlightStreamReader(path, chunk_size)
@@ -0,0 +1,162 @@
+import math
+import time
+
+# Гистограммы задержек: логарифмические корзины от 1 мкс до 10 с, 4 на декаду
+HISTOGRAM_MIN = 1e-6
+BUCKETS_PER_DECADE = 4
+HISTOGRAM_BUCKETS = 7 * BUCKETS_PER_DECADE
+
+
+class LatencyHistogram:
+    """Гистограмма длительностей в логарифмических корзинах
+
+    Добавление — одно сравнение и логарифм, памяти — фиксированный массив корзин,
+    поэтому ее можно держать на каждый вызов kRPC и на каждый такт цикла.
+    Перцентили оцениваются по верхней границе корзины.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (HISTOGRAM_BUCKETS + 2)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        if seconds < self.min:
+            self.min = seconds
+        if seconds > self.max:
+            self.max = seconds
+        if seconds < HISTOGRAM_MIN:
+            self.counts[0] += 1
+        else:
+            index = int(math.log10(seconds / HISTOGRAM_MIN) * BUCKETS_PER_DECADE) + 1
+            self.counts[min(index, HISTOGRAM_BUCKETS + 1)] += 1
+
+    @staticmethod
+    def upper_edge(index):
+        """Верхняя граница корзины, с (последняя корзина — все, что больше 10 с)"""
+        if index > HISTOGRAM_BUCKETS:
+            return math.inf
+        return HISTOGRAM_MIN * 10 ** (index / BUCKETS_PER_DECADE)
+
+    def percentile(self, q):
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.upper_edge(index), self.max)
+        return self.max
+
+    def summary(self):
+        """Число, сумма (с), среднее, минимум, максимум и перцентили (мс), непустые корзины [граница мс, число]"""
+        ms = lambda seconds: round(seconds * 1000, 4)
+        return {
+            'count': self.count,
+            'total_s': round(self.total, 6),
+            'mean_ms': ms(self.total / self.count) if self.count else 0.0,
+            'min_ms': ms(self.min) if self.count else 0.0,
+            'max_ms': ms(self.max),
+            'p50_ms': ms(self.percentile(50)),
+            'p90_ms': ms(self.percentile(90)),
+            'p99_ms': ms(self.percentile(99)),
+            'histogram': [[ms(self.upper_edge(i)) if i <= HISTOGRAM_BUCKETS else None, n]
+                          for i, n in enumerate(self.counts) if n],
+        }
+
+
+class CallTimings:
+    """Задержки вызовов kRPC и участков цикла управления по именам
+
+    wrap(obj, name) дает объект kRPC, у которого каждое чтение свойства, запись
+    и вызов метода замеряются отдельно ('vessel.control.throttle=' — запись,
+    'vessel.auto_pilot.engage()' — вызов). Участки цикла замеряются через lap:
+    t = timings.lap('telemetry', t) — время от t до сейчас идет в 'telemetry'.
+    """
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.histograms = {}
+
+    def add(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.add(seconds)
+
+    def lap(self, name, started):
+        now = self.clock()
+        self.add(name, now - started)
+        return now
+
+    def wrap(self, obj, name, children=()):
+        """Замеряющая обертка объекта; children — свойства-объекты, которые тоже оборачиваются"""
+        return TimedProxy(obj, self, name, children)
+
+    def summary(self):
+        """Статистика по именам, по убыванию суммарного времени"""
+        ordered = sorted(self.histograms.items(), key=lambda item: item[1].total, reverse=True)
+        return {name: histogram.summary() for name, histogram in ordered}
+
+    def report(self, top=10):
+        """Строки для консоли: самые затратные вызовы и участки"""
+        lines = []
+        for name, s in list(self.summary().items())[:top]:
+            lines.append(f"  {name}: {s['count']} раз, всего {s['total_s'] * 1000:.1f} мс, "
+                         f"ср. {s['mean_ms']} мс, p99 {s['p99_ms']} мс, макс. {s['max_ms']} мс")
+        return lines
+
+
+class TimedProxy:
+    """Обертка объекта kRPC, замеряющая чтение, запись свойств и вызовы методов
+
+    В подписки и события kRPC нужно передавать сам объект, а не обертку.
+    """
+
+    def __init__(self, obj, timings, name, children=()):
+        object.__setattr__(self, '_obj', obj)
+        object.__setattr__(self, '_timings', timings)
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_children', {child: None for child in children})
+
+    def __getattr__(self, attr):
+        timings = self._timings
+        name = f'{self._name}.{attr}'
+        children = self._children
+        if attr in children:
+            if children[attr] is None:
+                started = timings.clock()
+                value = getattr(self._obj, attr)
+                timings.lap(name, started)
+                children[attr] = TimedProxy(value, timings, name)
+            return children[attr]
+
+        started = timings.clock()
+        value = getattr(self._obj, attr)
+        if not callable(value) or isinstance(value, type):
+            # Чтение свойства — запрос к серверу; поиск метода — нет, его не замеряем
+            timings.lap(name, started)
+            return value
+
+        call_name = f'{name}()'
+
+        def timed_call(*args, **kwargs):
+            started = timings.clock()
+            try:
+                return value(*args, **kwargs)
+            finally:
+                timings.lap(call_name, started)
+        return timed_call
+
+    def __setattr__(self, attr, value):
+        timings = self._timings
+        started = timings.clock()
+        try:
+            setattr(self._obj, attr, value)
+        finally:
+            timings.lap(f'{self._name}.{attr}=', started)
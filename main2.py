@@ -1,297 +1,457 @@
-import krpc
-import time
-import math
-import json
-from datetime import datetime
-# Сбор телеметрии для всего полета до отделения спутника
-flight_data = []
-mission_start_time = time.time()
-
-
-def get_correct_speed(vessel):
-    try:
-        # ПЕРВЫЙ ПРИОРИТЕТ: истинная орбитальная скорость
-        return vessel.orbit.speed
-    except:
-        try:
-            # ВТОРОЙ ПРИОРИТЕТ: скорость в невращающейся системе отсчета
-            return vessel.flight(vessel.orbit.body.non_rotating_reference_frame).speed
-        except:
-            try:
-                # ТРЕТИЙ ПРИОРИТЕТ: обычная скорость (относительно поверхности)
-                return vessel.flight().speed
-            except:
-                return 0.0
-
-
-def calibrate_satellite(vessel, sc):
-    """Калибрует спутник перед отделением"""
-    # Выключаем двигатель
-    vessel.control.throttle = 0.0
-    time.sleep(1)
-
-    # Стабилизируем
-    vessel.control.sas = True
-    try:
-        vessel.control.sas_mode = sc.SASMode.stability_assist
-    except:
-        pass
-    time.sleep(2)
-
-    # Калибровка
-    vessel.control.rcs = True
-    time.sleep(0.5)
-    vessel.control.rcs = False
-    time.sleep(1)
-
-    return True
-
-
-try:
-    # Подключение
-    conn = krpc.connect(name='AvangardFullFlight')
-    sc = conn.space_center
-    vessel = sc.active_vessel
-
-    # Удаление пусковых мачт
-    launch_clamps = []
-    for part in vessel.parts.all:
-        if 'launch' in part.title.lower() and 'clamp' in part.title.lower():
-            launch_clamps.append(part)
-
-    if launch_clamps:
-        for clamp in launch_clamps:
-            clamp.remove()
-        time.sleep(0.5)
-
-    # Предстартовая подготовка
-    vessel.control.sas = False
-    vessel.control.rcs = False
-    vessel.control.throttle = 1.0
-    vessel.control.brakes = False
-    vessel.control.gear = False
-
-    # Ориентация вертикально вверх
-    vessel.auto_pilot.engage()
-    vessel.auto_pilot.target_pitch_and_heading(90, 90)
-    time.sleep(1)
-
-    # Запуск двигателя
-    vessel.control.activate_next_stage()
-    time.sleep(0.5)
-
-    # Проверяем тягу
-    thrust_detected = False
-    for attempt in range(30):
-        if vessel.available_thrust > 100:
-            thrust_detected = True
-            break
-        time.sleep(0.1)
-
-    if not thrust_detected:
-        for _ in range(3):
-            vessel.control.activate_next_stage()
-            time.sleep(0.3)
-            if vessel.available_thrust > 100:
-                thrust_detected = True
-                break
-
-    if not thrust_detected:
-        print("Нет тяги")
-        exit()
-
-    # Основной цикл полета
-    first_stage_separated = False
-    second_stage_ignited = False
-    satellite_deployed = False
-    mission_complete = False
-    collecting_data = True  # Изменили название переменной
-
-    while not mission_complete:
-        mission_time = time.time() - mission_start_time
-
-        # Получаем данные
-        flight = vessel.flight()
-        orbit = vessel.orbit
-
-        altitude = flight.mean_altitude
-        speed = get_correct_speed(vessel)
-        apoapsis = orbit.apoapsis_altitude
-        current_pitch = flight.pitch
-
-        # Сбор данных для ВСЕГО полета до отделения спутника
-        if collecting_data and not satellite_deployed:  # Собираем пока спутник не отделен
-            flight_data.append({
-                'mission_time': round(mission_time, 3),
-                'altitude': round(altitude, 1),
-                'speed': round(speed, 1),
-                'pitch': round(current_pitch, 1)
-            })
-
-            # Вывод собранных данных
-            print(f"{round(mission_time, 3)} {round(altitude, 1)} {round(speed, 1)}")
-
-        # Гравитационный поворот
-        if altitude > 12000 and altitude < 45000:
-            progress = (altitude - 12000) / 33000
-            progress = min(1.0, progress)
-            turn_progress = progress ** 1.5
-            target_pitch = 90 * (1 - turn_progress)
-
-            if abs(target_pitch - current_pitch) > 2:
-                vessel.auto_pilot.target_pitch_and_heading(target_pitch, 90)
-
-        # Отделение первой ступени
-        if not first_stage_separated and altitude > 17000:
-            # Отделяем первую ступень
-            vessel.control.activate_next_stage()
-            first_stage_separated = True
-            time.sleep(0.5)
-
-            # Запускаем вторую ступень
-            vessel.control.activate_next_stage()
-
-            # Ждем запуска второй ступени
-            for wait in range(30):
-                time.sleep(0.1)
-                if vessel.available_thrust > 100:
-                    second_stage_ignited = True
-                    break
-
-        # Отделение спутника
-        if not satellite_deployed and altitude > 100000:
-            # Калибруем спутник перед отделением
-            calibrate_satellite(vessel, sc)
-
-            # Отделяем спутник
-            vessel.control.activate_next_stage()
-            satellite_deployed = True
-
-            # Добавляем последнюю запись данных
-            flight_data.append({
-                'mission_time': round(mission_time, 3),
-                'altitude': round(altitude, 1),
-                'speed': round(speed, 1),
-                'pitch': round(current_pitch, 1)
-            })
-
-            print(f"{round(mission_time, 3)} {round(altitude, 1)} {round(speed, 1)}")
-            print("Спутник отделен, сбор данных завершен")
-
-            # Продолжаем разгон если нужно
-            if apoapsis < 3000000:
-                vessel.control.throttle = 0.7
-                vessel.auto_pilot.target_pitch_and_heading(0, 90)
-
-        # Управление тягой
-        if not satellite_deployed:
-            if apoapsis > 2000000:
-                reduction = (apoapsis - 2000000) / 1800000
-                new_throttle = max(0.2, 1.0 - reduction * 0.8)
-                vessel.control.throttle = new_throttle
-
-        # Проверка завершения
-        target_apoapsis = 3840000
-        target_periapsis = 655000
-        periapsis = orbit.periapsis_altitude
-
-        if apoapsis >= target_apoapsis * 0.98 and periapsis >= target_periapsis * 0.98:
-            vessel.control.throttle = 0.0
-            mission_complete = True
-
-        # Таймаут
-        if mission_time > 150:
-            mission_complete = True
-
-        time.sleep(0.05)
-
-    # Завершение полета
-    vessel.control.throttle = 0.0
-    vessel.auto_pilot.disengage()
-    time.sleep(2)
-
-    # Сохранение данных
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f'avangard1_full_flight_{timestamp}.json'
-
-    # Разделяем данные по стадиям
-    first_stage_data = []
-    second_stage_data = []
-
-    if flight_data:
-        # Находим время отделения первой ступени (приблизительно по высоте 17000м)
-        separation_time = None
-        for i, data in enumerate(flight_data):
-            if data['altitude'] > 17000 and separation_time is None:
-                separation_time = data['mission_time']
-                break
-
-        if separation_time:
-            for data in flight_data:
-                if data['mission_time'] <= separation_time:
-                    first_stage_data.append(data)
-                else:
-                    second_stage_data.append(data)
-        else:
-            # Если не нашли точку разделения, считаем все данные первой ступенью
-            first_stage_data = flight_data
-
-    mission_data = {
-        'mission_info': {
-            'name': 'Авангард-1 - данные всего полета',
-            'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'total_duration': round(mission_time, 1),
-            'data_collection_stopped': satellite_deployed,
-            'first_stage_separated': first_stage_separated,
-            'second_stage_ignited': second_stage_ignited,
-            'satellite_deployed': satellite_deployed
-        },
-        'flight_data': flight_data,  # Все данные
-        'stages_data': {
-            'first_stage': first_stage_data,
-            'second_stage': second_stage_data
-        },
-        'data_summary': {
-            'total_points': len(flight_data),
-            'first_stage_points': len(first_stage_data),
-            'second_stage_points': len(second_stage_data),
-            'first_stage_duration': first_stage_data[-1]['mission_time'] if first_stage_data else 0,
-            'second_stage_duration': (second_stage_data[-1]['mission_time'] - first_stage_data[-1][
-                'mission_time']) if first_stage_data and second_stage_data else 0,
-            'altitude_range': {
-                'min': min(d['altitude'] for d in flight_data) if flight_data else 0,
-                'max': max(d['altitude'] for d in flight_data) if flight_data else 0
-            },
-            'speed_range': {
-                'min': min(d['speed'] for d in flight_data) if flight_data else 0,
-                'max': max(d['speed'] for d in flight_data) if flight_data else 0
-            },
-            'pitch_range': {
-                'min': min(d['pitch'] for d in flight_data) if flight_data else 0,
-                'max': max(d['pitch'] for d in flight_data) if flight_data else 0
-            }
-        }
-    }
-
-    with open(filename, 'w', encoding='utf-8') as f:
-        json.dump(mission_data, f, indent=2, ensure_ascii=False)
-
-    print(f"\nДанные сохранены в файл: {filename}")
-    print(f"Всего собрано записей: {len(flight_data)}")
-    print(f"Первая ступень: {len(first_stage_data)} записей")
-    print(f"Вторая ступень: {len(second_stage_data)} записей")
-
-    conn.close()
-
-except Exception as e:
-    print(f"Ошибка: {e}")
-
-    if 'flight_data' in locals() and flight_data:
-        try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            error_file = f'avangard1_error_{timestamp}.json'
-
-            with open(error_file, 'w', encoding='utf-8') as f:
-                json.dump({'error': str(e), 'flight_data': flight_data}, f, indent=2, ensure_ascii=False)
-        except:
-            pass
\ No newline at end of file
+import argparse
+import time
+import math
+import json
+import os
+from datetime import datetime
+from mission import MissionMachine, Phase, Transition, Trigger
+from missionclock import CLOCKS, Sequence, make_clock
+from looptiming import CallTimings
+from telemetry import TelemetryStreams, RateScheduler, TelemetryPublisher
+from recorder import FlightRecorder
+
+# Частота цикла управления и сбора телеметрии, Гц
+CONTROL_RATE = 20
+
+# Таймаут полета, с
+MISSION_TIMEOUT = 150
+
+# Пороги этапов полета
+THRUST_DETECTED = 100
+TURN_START_ALTITUDE = 12000
+TURN_END_ALTITUDE = 45000
+SEPARATION_ALTITUDE = 17000
+DEPLOY_ALTITUDE = 100000
+TARGET_APOAPSIS = 3840000
+TARGET_PERIAPSIS = 655000
+
+
+def calibrate_satellite(vessel, sc, sequence=None):
+    """Калибровка спутника перед отделением: шаги добавляются в последовательность
+    (выполняется циклом управления, телеметрия при этом не прерывается)"""
+    def stabilize():
+        vessel.control.sas = True
+        try:
+            vessel.control.sas_mode = sc.SASMode.stability_assist
+        except:
+            pass
+
+    def set_rcs(value):
+        vessel.control.rcs = value
+
+    sequence = sequence or Sequence('калибровка спутника')
+    # Выключаем двигатель
+    sequence.then(lambda: setattr(vessel.control, 'throttle', 0.0)).wait(1)
+    # Стабилизируем
+    sequence.then(stabilize).wait(2)
+    # Калибровка
+    sequence.then(lambda: set_rcs(True)).wait(0.5)
+    sequence.then(lambda: set_rcs(False)).wait(1)
+    return sequence
+
+
+def avangard_mission(vessel, sc, telemetry, state, on_deploy=None):
+    """Этапы полета Авангард-1 для MissionMachine: (этапы, общие переходы)
+
+    Переходы заданы условиями на каналы телеметрии (см. mission.Trigger) и временем.
+    state заполняется флагами second_stage_ignited и satellite_deployed,
+    on_deploy() вызывается сразу после отделения спутника.
+    """
+    control = vessel.control
+    state.update(second_stage_ignited=False, satellite_deployed=False, ignition_retries=0)
+    thrust_detected = Trigger(('available_thrust', '>', THRUST_DETECTED))
+
+    def activate_stage():
+        control.activate_next_stage()
+
+    def pitch_program():
+        # Гравитационный поворот
+        altitude = telemetry.altitude()
+        if altitude > TURN_START_ALTITUDE and altitude < TURN_END_ALTITUDE:
+            progress = (altitude - TURN_START_ALTITUDE) / (TURN_END_ALTITUDE - TURN_START_ALTITUDE)
+            progress = min(1.0, progress)
+            turn_progress = progress ** 1.5
+            target_pitch = 90 * (1 - turn_progress)
+
+            if abs(target_pitch - telemetry.pitch()) > 2:
+                vessel.auto_pilot.target_pitch_and_heading(target_pitch, 90)
+
+    def powered_flight():
+        pitch_program()
+
+        # Управление тягой
+        apoapsis = telemetry.apoapsis()
+        if apoapsis > 2000000:
+            reduction = (apoapsis - 2000000) / 1800000
+            control.throttle = max(0.2, 1.0 - reduction * 0.8)
+
+    def prelaunch():
+        sequence = Sequence('предстартовая подготовка')
+
+        # Удаление пусковых мачт
+        launch_clamps = []
+        for part in vessel.parts.all:
+            if 'launch' in part.title.lower() and 'clamp' in part.title.lower():
+                launch_clamps.append(part)
+        if launch_clamps:
+            sequence.then(lambda: [clamp.remove() for clamp in launch_clamps]).wait(0.5)
+
+        def prepare():
+            control.sas = False
+            control.rcs = False
+            control.throttle = 1.0
+            control.brakes = False
+            control.gear = False
+
+            # Ориентация вертикально вверх
+            vessel.auto_pilot.engage()
+            vessel.auto_pilot.target_pitch_and_heading(90, 90)
+
+        # Запуск двигателя
+        return sequence.then(prepare).wait(1).then(activate_stage).wait(0.5)
+
+    def retry_ignition():
+        state['ignition_retries'] += 1
+        activate_stage()
+
+    def separate_first_stage():
+        # Отделяем первую ступень, через 0.5 с запускаем вторую
+        activate_stage()
+        return Sequence('отделение первой ступени').wait(0.5).then(activate_stage)
+
+    def second_stage_started():
+        state['second_stage_ignited'] = True
+
+    def deploy():
+        # Отделяем спутник
+        activate_stage()
+        state['satellite_deployed'] = True
+        if on_deploy is not None:
+            on_deploy()
+
+        # Продолжаем разгон если нужно
+        if telemetry.apoapsis() < 3000000:
+            control.throttle = 0.7
+            vessel.auto_pilot.target_pitch_and_heading(0, 90)
+
+    def satellite_deployment():
+        # Калибруем спутник перед отделением, затем отделяем
+        return calibrate_satellite(vessel, sc, Sequence('отделение спутника')).then(deploy)
+
+    def stop_engine():
+        control.throttle = 0.0
+
+    phases = [
+        Phase('prelaunch', enter=prelaunch, record=False, transitions=[
+            Transition('ascent', when=thrust_detected),
+            Transition('ignition_retry', after=3.0),
+        ]),
+        # Повторные попытки запуска двигателя
+        Phase('ignition_retry', enter=retry_ignition, record=False, transitions=[
+            Transition('ascent', when=thrust_detected),
+            Transition(lambda: 'ignition_retry' if state['ignition_retries'] < 3 else 'aborted', after=0.3),
+        ]),
+        Phase('aborted', record=False, terminal=True),
+        Phase('ascent', tick=powered_flight, transitions=[
+            Transition('gravity_turn', when=Trigger(('altitude', '>', TURN_START_ALTITUDE))),
+        ]),
+        Phase('gravity_turn', tick=powered_flight, transitions=[
+            Transition('stage_separation', when=Trigger(('altitude', '>', SEPARATION_ALTITUDE))),
+        ]),
+        # Переходы взводятся после запуска второй ступени; тягу ждем не дольше 3 с
+        Phase('stage_separation', enter=separate_first_stage, tick=powered_flight, transitions=[
+            Transition('second_stage_burn', when=thrust_detected, action=second_stage_started),
+            Transition('second_stage_burn', after=3.0),
+        ]),
+        Phase('second_stage_burn', tick=powered_flight, transitions=[
+            Transition('satellite_deploy', when=Trigger(('altitude', '>', DEPLOY_ALTITUDE))),
+        ]),
+        # Во время калибровки двигатель выключен, тягой не управляем; запись телеметрии
+        # заканчивается здесь (data_collection_stopped), последний отсчет дописывает on_deploy
+        Phase('satellite_deploy', enter=satellite_deployment, record=False, transitions=[
+            Transition('circularization'),
+        ]),
+        Phase('circularization', record=False),
+        Phase('complete', enter=stop_engine, record=False, terminal=True),
+    ]
+
+    # Проверка завершения: целевая орбита достигнута на любом этапе
+    global_transitions = [
+        Transition('complete', when=Trigger(('apoapsis', '>=', TARGET_APOAPSIS * 0.98),
+                                            ('periapsis', '>=', TARGET_PERIAPSIS * 0.98))),
+    ]
+    return phases, global_transitions
+
+
+def fly(conn=None, rate=CONTROL_RATE, timeout=MISSION_TIMEOUT, clock=time, echo=True):
+    """Полет Авангард-1 до отделения спутника; conn — подключение kRPC (или подставное)
+
+    clock — часы полета с time(), perf_counter() и sleep(): модуль time,
+    модельные часы (missionclock.SimClock) для полета быстрее реального времени
+    или имя часов из missionclock.CLOCKS ('ut' — игровое время KSP).
+    Полет идет по этапам avangard_mission (конечный автомат mission.MissionMachine);
+    отделение ступени и калибровка спутника — последовательности с паузами внутри
+    цикла управления. Телеметрия записывается до начала отделения спутника,
+    затем дописывается один отсчет сразу после отделения (как в исходном цикле).
+    """
+    # Сбор телеметрии для всего полета до отделения спутника: запись идет в фоне
+    # в файл avangard1_live_*.jsonl, чтобы при аварии не терять данные
+    flight_data = []
+    recorder = None
+    publisher = None
+
+    # Задержки команд kRPC и участков цикла (настенное время, как бы ни шли часы полета)
+    timings = CallTimings()
+
+    try:
+        recorder = FlightRecorder(f'avangard1_live_{datetime.now().strftime("%Y%m%d_%H%M%S")}.jsonl', echo=echo)
+
+        # Подключение
+        if conn is None:
+            import krpc
+            conn = krpc.connect(name='AvangardFullFlight')
+        sc = conn.space_center
+        vessel = sc.active_vessel
+
+        if isinstance(clock, str):
+            clock = make_clock(clock, conn)
+        mission_start_time = clock.time()
+
+        # Подписки на телеметрию вместо запросов в каждом цикле
+        telemetry = TelemetryStreams(conn, vessel, rate=rate)
+
+        # Команды ракете идут через замеряющую обертку; подпискам нужен сам объект kRPC
+        commands = timings.wrap(vessel, 'vessel', children=('control', 'auto_pilot', 'parts'))
+
+        # Живые графики (python dashboard.py) получают отсчеты по UDP без ожидания
+        publisher = TelemetryPublisher()
+
+        # Этапы полета; последний отсчет перед отделением спутника дописывается сразу после него
+        state = {}
+
+        def on_deploy():
+            recorder.record({
+                'mission_time': clock.time() - mission_start_time,
+                'altitude': telemetry.altitude(),
+                'speed': telemetry.speed(),
+                'pitch': telemetry.pitch()
+            })
+            print("Спутник отделен, сбор данных завершен")
+
+        phases, global_transitions = avangard_mission(commands, sc, telemetry, state, on_deploy)
+        machine = MissionMachine(phases, 'prelaunch', telemetry, clock, global_transitions)
+
+        # Такты цикла идут с фиксированной частотой; с событиями kRPC ожидание такта
+        # прерывается, как только на сервере выполнилось условие перехода
+        scheduler = RateScheduler(rate, clock=clock.perf_counter, sleep=machine.sleep)
+        machine.start(clock.time())
+
+        # Основной цикл полета
+        while not machine.phase.terminal:
+            scheduler.wait()
+            now = clock.time()
+            mission_time = now - mission_start_time
+            lap = timings.clock()
+
+            # Получаем данные из подписок
+            altitude = telemetry.altitude()
+            speed = telemetry.speed()
+            apoapsis = telemetry.apoapsis()
+            current_pitch = telemetry.pitch()
+            lap = timings.lap('loop.telemetry', lap)
+
+            publisher.publish({
+                'mission_time': mission_time,
+                'altitude': altitude,
+                'speed': speed,
+                'pitch': current_pitch,
+                'apoapsis': apoapsis
+            })
+            lap = timings.lap('loop.publish', lap)
+
+            # Сбор данных от старта до отделения спутника
+            # (округление, вывод в консоль и запись на диск — в потоке записи)
+            if machine.phase.record:
+                recorder.record({
+                    'mission_time': mission_time,
+                    'altitude': altitude,
+                    'speed': speed,
+                    'pitch': current_pitch
+                })
+            lap = timings.lap('loop.record', lap)
+
+            # Работа текущего этапа и переходы между этапами
+            machine.step(now)
+            timings.lap('loop.phase', lap)
+
+            # Таймаут
+            if mission_time > timeout:
+                break
+
+        machine.close()
+        visited = {name for _, name in machine.history}
+        first_stage_separated = 'stage_separation' in visited
+        second_stage_ignited = state['second_stage_ignited']
+        satellite_deployed = state['satellite_deployed']
+
+        if machine.phase.name == 'aborted':
+            print("Нет тяги")
+            telemetry.close()
+            publisher.close()
+            recorder.close()
+            os.remove(recorder.path)
+            return None
+
+        # Завершение полета
+        commands.control.throttle = 0.0
+        commands.auto_pilot.disengage()
+        telemetry.close()
+        publisher.close()
+        clock.sleep(2)
+        if hasattr(clock, 'close'):
+            clock.close()
+
+        recorder.close()
+        flight_data = recorder.samples()
+
+        loop_stats = scheduler.summary()
+        print(f"\nЦикл управления: {loop_stats['rate']} Гц, тактов {loop_stats['ticks']}, "
+              f"перегрузок {loop_stats['overruns']} (пропущено тактов {loop_stats['missed_ticks']}), "
+              f"джиттер ср. {loop_stats['jitter_mean_ms']} мс, макс. {loop_stats['jitter_max_ms']} мс")
+        print(f"Работа {loop_stats['work_s']} с, ожидание {loop_stats['sleep_s']} с "
+              f"(доля работы {loop_stats['work_fraction']:.1%}), такт ср. {loop_stats['iteration']['mean_ms']} мс, "
+              f"p99 {loop_stats['iteration']['p99_ms']} мс, макс. {loop_stats['iteration']['max_ms']} мс")
+        print("Самые затратные вызовы kRPC и участки цикла:")
+        for line in timings.report():
+            print(line)
+
+        # Сохранение данных
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f'avangard1_full_flight_{timestamp}.json'
+
+        # Разделяем данные по стадиям
+        first_stage_data = []
+        second_stage_data = []
+
+        if flight_data:
+            # Находим время отделения первой ступени (приблизительно по высоте 17000м)
+            separation_time = None
+            for i, data in enumerate(flight_data):
+                if data['altitude'] > 17000 and separation_time is None:
+                    separation_time = data['mission_time']
+                    break
+
+            if separation_time:
+                for data in flight_data:
+                    if data['mission_time'] <= separation_time:
+                        first_stage_data.append(data)
+                    else:
+                        second_stage_data.append(data)
+            else:
+                # Если не нашли точку разделения, считаем все данные первой ступенью
+                first_stage_data = flight_data
+
+        mission_data = {
+            'mission_info': {
+                'name': 'Авангард-1 - данные всего полета',
+                'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'total_duration': round(mission_time, 1),
+                'data_collection_stopped': satellite_deployed,
+                'first_stage_separated': first_stage_separated,
+                'second_stage_ignited': second_stage_ignited,
+                'satellite_deployed': satellite_deployed
+            },
+            'flight_data': flight_data,  # Все данные
+            'stages_data': {
+                'first_stage': first_stage_data,
+                'second_stage': second_stage_data
+            },
+            'data_summary': {
+                'total_points': len(flight_data),
+                'first_stage_points': len(first_stage_data),
+                'second_stage_points': len(second_stage_data),
+                'first_stage_duration': first_stage_data[-1]['mission_time'] if first_stage_data else 0,
+                'second_stage_duration': (second_stage_data[-1]['mission_time'] - first_stage_data[-1][
+                    'mission_time']) if first_stage_data and second_stage_data else 0,
+                'altitude_range': {
+                    'min': min(d['altitude'] for d in flight_data) if flight_data else 0,
+                    'max': max(d['altitude'] for d in flight_data) if flight_data else 0
+                },
+                'speed_range': {
+                    'min': min(d['speed'] for d in flight_data) if flight_data else 0,
+                    'max': max(d['speed'] for d in flight_data) if flight_data else 0
+                },
+                'pitch_range': {
+                    'min': min(d['pitch'] for d in flight_data) if flight_data else 0,
+                    'max': max(d['pitch'] for d in flight_data) if flight_data else 0
+                }
+            },
+            'phases': [{'phase': name, 'mission_time': round(t - mission_start_time, 3)}
+                       for t, name in machine.history],
+            'control_loop': loop_stats,
+            'timings': timings.summary(),
+            'recorder': recorder.stats()
+        }
+
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(mission_data, f, indent=2, ensure_ascii=False)
+
+        # Колоночная копия полета для быстрой загрузки (этапы хранятся диапазонами индексов)
+        if flight_data:
+            # Колоночная копия полета; NumPy нужен только здесь, в конце полета
+            from binlog import from_flight_data, write_log
+            log_filename = filename[:-len('.json')] + '.avlog'
+            meta = {k: v for k, v in mission_data.items() if k not in ('flight_data', 'stages_data')}
+            channels, stages, meta = from_flight_data(flight_data, meta)
+            write_log(log_filename, channels, stages, meta)
+
+        print(f"\nДанные сохранены в файл: {filename}")
+        print(f"Всего собрано записей: {len(flight_data)}")
+        print(f"Первая ступень: {len(first_stage_data)} записей")
+        print(f"Вторая ступень: {len(second_stage_data)} записей")
+        if recorder.dropped:
+            print(f"Отброшено отсчетов при переполнении очереди: {recorder.dropped}")
+
+        # Полный файл сохранен, промежуточная запись больше не нужна
+        os.remove(recorder.path)
+
+        conn.close()
+        return mission_data
+
+    except Exception as e:
+        print(f"Ошибка: {e}")
+
+        if publisher is not None:
+            publisher.close()
+        if recorder is not None:
+            try:
+                recorder.close()
+            except Exception as error:
+                print(f"Ошибка записи телеметрии: {error}")
+            flight_data = recorder.samples()
+
+        if flight_data:
+            try:
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                error_file = f'avangard1_error_{timestamp}.json'
+
+                with open(error_file, 'w', encoding='utf-8') as f:
+                    json.dump({'error': str(e), 'flight_data': flight_data, 'timings': timings.summary()},
+                              f, indent=2, ensure_ascii=False)
+            except:
+                pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Автопилот Авангард-1 (kRPC)')
+    parser.add_argument('--clock', choices=CLOCKS[:2], default='wall',
+                        help='часы полета: wall — настенные, ut — игровое время KSP')
+    parser.add_argument('--rate', type=float, default=CONTROL_RATE)
+    parser.add_argument('--timeout', type=float, default=MISSION_TIMEOUT)
+    args = parser.parse_args(argv)
+
+    fly(rate=args.rate, timeout=args.timeout, clock=args.clock)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+import operator
+import threading
+import time
+
+# Сравнения в условиях переходов: функция для проверки на клиенте и выражение kRPC для сервера
+COMPARISONS = {
+    '>': (operator.gt, 'greater_than'),
+    '>=': (operator.ge, 'greater_than_or_equal'),
+    '<': (operator.lt, 'less_than'),
+    '<=': (operator.le, 'less_than_or_equal'),
+}
+
+
+class Trigger:
+    """Условие перехода по телеметрии: выполнены все сравнения (канал, знак, порог)
+
+    Условие проверяется на каждом такте по значениям подписок (они уже на клиенте,
+    запросов по сети нет). Если сервер kRPC поддерживает события, то же условие
+    ставится событием на сервере: оно проверяется с частотой физики игры и будит
+    цикл управления сразу, не дожидаясь следующего такта.
+    """
+
+    def __init__(self, *conditions):
+        for channel, op, value in conditions:
+            if op not in COMPARISONS:
+                raise ValueError(f"Неизвестное сравнение: {op}")
+        self.conditions = conditions
+        self.fired = False
+        self._event = None
+
+    def check(self, telemetry):
+        if self.fired:
+            return True
+        return all(COMPARISONS[op][0](getattr(telemetry, channel)(), value)
+                   for channel, op, value in self.conditions)
+
+    def arm(self, telemetry, wake=None):
+        """Сбрасывает условие; с wake ставит событие на сервере (если не вышло — только проверка на такте)"""
+        self.fired = False
+        if wake is None:
+            return
+        try:
+            self._event = self._server_event(telemetry, wake)
+        except Exception:
+            self._event = None
+
+    def _server_event(self, telemetry, wake):
+        conn = telemetry.conn
+        expr = conn.krpc.Expression
+        condition = None
+        for channel, op, value in self.conditions:
+            obj, attr, kind = telemetry.sources[channel]
+            constant = expr.constant_float if kind == 'float' else expr.constant_double
+            term = getattr(expr, COMPARISONS[op][1])(expr.call(conn.get_call(getattr, obj, attr)),
+                                                     constant(float(value)))
+            condition = term if condition is None else expr.and_(condition, term)
+
+        def on_event(*args):
+            self.fired = True
+            wake.set()
+
+        event = conn.krpc.add_event(condition)
+        event.add_callback(on_event)
+        event.start()
+        return event
+
+    def disarm(self):
+        if self._event is not None:
+            try:
+                self._event.remove()
+            except Exception:
+                pass
+            self._event = None
+
+
+class Transition:
+    """Переход в этап target (имя или функция, возвращающая имя)
+
+    Срабатывает по условию when (Trigger), по времени after — секунд после того,
+    как закончилась последовательность входа в этап, — или сразу, если не задано
+    ни то, ни другое. action выполняется перед переходом.
+    """
+
+    def __init__(self, target, when=None, after=None, action=None):
+        self.target = target
+        self.when = when
+        self.after = after
+        self.action = action
+
+    def ready(self, telemetry, elapsed):
+        if self.when is not None and self.when.check(telemetry):
+            return True
+        if self.after is not None:
+            return elapsed >= self.after
+        return self.when is None
+
+
+class Phase:
+    """Этап полета
+
+    enter() выполняется при входе и может вернуть missionclock.Sequence — шаги с паузами,
+    которые цикл выполняет на своих тактах; переходы этапа проверяются после нее.
+    tick() выполняется на каждом такте. record — писать ли телеметрию на этом этапе,
+    terminal — полет на этом этапе закончен.
+    """
+
+    def __init__(self, name, enter=None, tick=None, transitions=(), record=True, terminal=False):
+        self.name = name
+        self.enter = enter
+        self.tick = tick
+        self.transitions = list(transitions)
+        self.record = record
+        self.terminal = terminal
+
+
+class MissionMachine:
+    """Конечный автомат этапов полета
+
+    step(now) вызывается на каждом такте цикла управления: выполняет работу этапа,
+    шаги его последовательности и все сработавшие переходы (несколько подряд, если
+    условия следующих этапов уже выполнены). global_transitions (только по условию
+    when) проверяются на любом этапе, кроме конечных. history — (время, этап)
+    каждого входа в этап.
+
+    events=True — условия переходов ставятся событиями на сервере kRPC (по умолчанию,
+    если подключение их поддерживает); sleep() тогда просыпается по событию.
+    """
+
+    def __init__(self, phases, initial, telemetry, clock=time, global_transitions=(),
+                 events=None, max_chain=10):
+        self.phases = {phase.name: phase for phase in phases}
+        self.initial = initial
+        self.telemetry = telemetry
+        self.clock = clock
+        self.global_transitions = list(global_transitions)
+        if events is None:
+            events = hasattr(telemetry.conn, 'krpc')
+        self.wake = threading.Event() if events else None
+        self.max_chain = max_chain
+        self.phase = None
+        self.sequence = None
+        self.armed_at = None
+        self.history = []
+
+    def start(self, now):
+        for transition in self.global_transitions:
+            if transition.when is not None:
+                transition.when.arm(self.telemetry, self.wake)
+        self._enter(self.initial, now)
+        self._advance(now)
+
+    def step(self, now):
+        if self.phase.terminal:
+            return self.phase
+        if self.phase.tick is not None:
+            self.phase.tick()
+        self._advance(now)
+        return self.phase
+
+    def sleep(self, seconds):
+        """Пауза до следующего такта; с событиями сервера прерывается при срабатывании условия"""
+        if self.wake is None or self.clock is not time:
+            self.clock.sleep(seconds)
+            return
+        self.wake.wait(seconds)
+        self.wake.clear()
+
+    def close(self):
+        self._disarm(self.phase.transitions if self.phase else ())
+        self._disarm(self.global_transitions)
+
+    def _advance(self, now):
+        for _ in range(self.max_chain):
+            if self.phase.terminal or not self._ready(now):
+                return
+            transition = self._fired(now)
+            if transition is None:
+                return
+            self._go(transition, now)
+
+    def _ready(self, now):
+        """Закончена ли последовательность входа (тогда переходы этапа взведены)"""
+        if self.sequence is not None:
+            if not self.sequence.poll(now):
+                return False
+            self.sequence = None
+            self._arm(now)
+        return True
+
+    def _fired(self, now):
+        elapsed = now - self.armed_at
+        for transition in self.phase.transitions:
+            if transition.ready(self.telemetry, elapsed):
+                return transition
+        for transition in self.global_transitions:
+            if transition.when is not None and transition.when.check(self.telemetry):
+                return transition
+        return None
+
+    def _go(self, transition, now):
+        if transition.action is not None:
+            transition.action()
+        target = transition.target() if callable(transition.target) else transition.target
+        self._disarm(self.phase.transitions)
+        if target in self.phases and self.phases[target].terminal:
+            self._disarm(self.global_transitions)
+        self._enter(target, now)
+
+    def _enter(self, name, now):
+        if name not in self.phases:
+            raise KeyError(f"Неизвестный этап полета: {name}")
+        self.phase = self.phases[name]
+        self.history.append((now, name))
+        self.sequence = self.phase.enter() if self.phase.enter is not None else None
+        if self.sequence is None:
+            self._arm(now)
+
+    def _arm(self, now):
+        self.armed_at = now
+        for transition in self.phase.transitions:
+            if transition.when is not None:
+                transition.when.arm(self.telemetry, self.wake)
+
+    def _disarm(self, transitions):
+        for transition in transitions:
+            if transition.when is not None:
+                transition.when.disarm()
@@ -0,0 +1,142 @@
+import time
+
+# Часы полета: объект с методами time(), perf_counter() и sleep(seconds), как у модуля time.
+# Настенные часы — сам модуль time, игровое время KSP — UniversalTimeClock,
+# модельное время — SimClock.
+CLOCKS = ('wall', 'ut', 'sim')
+
+
+class SimClock:
+    """Модельное время вместо настенного: sleep не ждет, а сдвигает часы,
+    поэтому полет идет так быстро, как позволяет процессор
+
+    Повторяет нужную main2.py часть модуля time: time(), perf_counter(), sleep().
+    """
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+
+
+class UniversalTimeClock:
+    """Игровое время KSP (space_center.ut) через подписку kRPC
+
+    Время полета идет вместе с игрой: при паузе, замедлении физики или ускорении
+    времени паузы автопилота растягиваются и сжимаются так же, как полет.
+    sleep ждет, пока игровое время не дойдет до нужного момента, проверяя его
+    каждые poll секунд настоящего времени.
+    """
+
+    def __init__(self, conn, poll=0.01):
+        self.poll = poll
+        self._stream = conn.add_stream(getattr, conn.space_center, 'ut')
+
+    def time(self):
+        return self._stream()
+
+    def perf_counter(self):
+        return self._stream()
+
+    def sleep(self, seconds):
+        target = self._stream() + seconds
+        while True:
+            remaining = target - self._stream()
+            if remaining <= 0:
+                return
+            time.sleep(min(self.poll, remaining))
+
+    def close(self):
+        try:
+            self._stream.remove()
+        except Exception:
+            pass
+
+
+def make_clock(kind, conn=None):
+    """Часы по имени: 'wall' — настенные, 'ut' — игровое время KSP (нужно conn), 'sim' — модельные"""
+    if kind == 'wall':
+        return time
+    if kind == 'ut':
+        if conn is None:
+            raise ValueError("Для игрового времени нужно подключение kRPC")
+        return UniversalTimeClock(conn)
+    if kind == 'sim':
+        return SimClock()
+    raise ValueError(f"Неизвестные часы: {kind} (есть {', '.join(CLOCKS)})")
+
+
+class Sequence:
+    """Последовательность действий с паузами, которая не останавливает цикл управления
+
+    Шаги добавляются цепочкой: then(action) — выполнить действие, wait(seconds) —
+    пауза, until(condition, timeout) — ждать условия не дольше timeout.
+    poll(now) вызывается на каждом такте цикла и выполняет все шаги, срок которых
+    наступил; между тактами цикл продолжает собирать телеметрию и управлять ракетой.
+    """
+
+    def __init__(self, name=''):
+        self.name = name
+        self.steps = []
+        self.index = 0
+        self.done = False
+        self.timed_out = False
+        self._resume_at = None
+        self._deadline = None
+
+    def then(self, action):
+        self.steps.append(('do', action, None))
+        return self
+
+    def wait(self, seconds):
+        self.steps.append(('wait', seconds, None))
+        return self
+
+    def until(self, condition, timeout, on_timeout=None):
+        self.steps.append(('until', condition, (timeout, on_timeout)))
+        return self
+
+    def poll(self, now):
+        """Выполняет готовые шаги; True, когда последовательность завершена"""
+        while self.index < len(self.steps):
+            kind, arg, extra = self.steps[self.index]
+            if kind == 'do':
+                arg()
+            elif kind == 'wait':
+                if self._resume_at is None:
+                    self._resume_at = now + arg
+                if now < self._resume_at:
+                    return False
+                self._resume_at = None
+            else:
+                timeout, on_timeout = extra
+                if self._deadline is None:
+                    self._deadline = now + timeout
+                if not arg():
+                    if now < self._deadline:
+                        return False
+                    self.timed_out = True
+                    if on_timeout is not None:
+                        on_timeout()
+                self._deadline = None
+            self.index += 1
+        self.done = True
+        return True
+
+    def run(self, clock, interval=0.1):
+        """Выполняет последовательность целиком, ожидая по часам clock
+        (там, где параллельно делать нечего — например, до старта)"""
+        while not self.poll(clock.time()):
+            if self._resume_at is not None:
+                clock.sleep(max(self._resume_at - clock.time(), 1e-6))
+            else:
+                clock.sleep(interval)
+        return self
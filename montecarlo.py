@@ -0,0 +1,232 @@
+import argparse
+import json
+import os
+from multiprocessing import Pool
+
+import numpy as np
+from batchsim import DEFAULT_PARAMS, broadcast_params, simulate_batch, apsides
+
+# Итоговые величины каждого прогона
+METRICS = ('final_altitude', 'final_speed', 'apoapsis', 'periapsis', 'max_q')
+
+# Перцентили, которые выводятся в отчете
+DEFAULT_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+# Пример разброса параметров: стандартные отклонения и границы заданы «на глаз»
+DEFAULT_DISPERSIONS = {
+    'm0_1': {'dist': 'normal', 'std': 300},
+    'Isp_1': {'dist': 'normal', 'std': 3},
+    'Isp_2': {'dist': 'normal', 'std': 5},
+    'Cx': {'dist': 'uniform', 'low': 0.25, 'high': 0.35},
+    'rho0': {'dist': 'normal', 'std': 0.02},
+    'H': {'dist': 'normal', 'std': 150},
+    'theta_end': {'dist': 'triangular', 'low': 0.0, 'mode': 0.8, 'high': 3.0},
+    't_start_turn': {'dist': 'normal', 'std': 1.0},
+}
+
+
+def load_dispersions(path):
+    """Читает описание распределений параметров из JSON файла"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def sample_params(dispersions, n, rng):
+    """Генерирует N наборов параметров по описанию распределений
+
+    Для нормального распределения среднее по умолчанию берется из DEFAULT_PARAMS.
+    """
+    params = {}
+    for name, spec in dispersions.items():
+        if name not in DEFAULT_PARAMS:
+            raise KeyError(f"Неизвестный параметр: {name}")
+        dist = spec.get('dist', 'normal')
+        if dist == 'normal':
+            params[name] = rng.normal(spec.get('mean', DEFAULT_PARAMS[name]), spec['std'], n)
+        elif dist == 'uniform':
+            params[name] = rng.uniform(spec['low'], spec['high'], n)
+        elif dist == 'triangular':
+            params[name] = rng.triangular(spec['low'], spec['mode'], spec['high'], n)
+        elif dist == 'constant':
+            params[name] = spec['value']
+        else:
+            raise ValueError(f"Неизвестное распределение {dist} у параметра {name}")
+    return params
+
+
+def run_chunk(task):
+    """Считает одну пачку траекторий и возвращает только итоговые величины"""
+    dispersions, n, seed, dt, total_time = task
+    rng = np.random.default_rng(seed)
+    params = sample_params(dispersions, n, rng)
+    result = simulate_batch(params, n=n, dt=dt, total_time=total_time, record=False)
+
+    state = result['state']
+    p = broadcast_params(params, n)
+    apo, peri = apsides(state[:, 1], state[:, 2], state[:, 3], p)
+    return {
+        'final_altitude': state[:, 1],
+        'final_speed': np.hypot(state[:, 2], state[:, 3]),
+        'apoapsis': apo,
+        'periapsis': peri,
+        'max_q': result['max_q'],
+    }
+
+
+class StreamingHistogram:
+    """Гистограмма с расширяемым диапазоном для перцентилей в потоке
+
+    Память постоянна: при выходе значения за диапазон он удваивается,
+    а соседние корзины попарно сливаются. Точность перцентиля — ширина корзины.
+    """
+
+    def __init__(self, bins=4096):
+        self.bins = bins
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.lo = None
+        self.width = None
+        self.count = 0
+        self.skipped = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        finite = np.isfinite(values)
+        self.skipped += int(np.count_nonzero(~finite))
+        values = values[finite]
+        if values.size == 0:
+            return
+
+        v_min, v_max = float(values.min()), float(values.max())
+        if self.lo is None:
+            span = v_max - v_min or max(abs(v_min), 1.0) * 1e-6
+            self.lo = v_min
+            self.width = span * 1.01 / self.bins
+        while v_min < self.lo:
+            self._grow(downward=True)
+        while v_max >= self.lo + self.width * self.bins:
+            self._grow(downward=False)
+
+        idx = np.minimum(((values - self.lo) / self.width).astype(np.int64), self.bins - 1)
+        self.counts += np.bincount(idx, minlength=self.bins)
+        self.count += values.size
+        self.total += float(values.sum())
+        self.total_sq += float((values ** 2).sum())
+        self.min = min(self.min, v_min)
+        self.max = max(self.max, v_max)
+
+    def _grow(self, downward):
+        """Удваивает диапазон, сливая пары соседних корзин"""
+        merged = self.counts.reshape(-1, 2).sum(axis=1)
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        if downward:
+            self.counts[self.bins // 2:] = merged
+            self.lo -= self.width * self.bins
+        else:
+            self.counts[:self.bins // 2] = merged
+        self.width *= 2
+
+    def percentiles(self, qs):
+        """Оценка перцентилей с линейной интерполяцией внутри корзины"""
+        if self.count == 0:
+            return [np.nan for _ in qs]
+        cumulative = np.cumsum(self.counts)
+        result = []
+        for q in qs:
+            target = q / 100 * self.count
+            i = int(np.searchsorted(cumulative, target))
+            i = min(i, self.bins - 1)
+            before = cumulative[i - 1] if i > 0 else 0
+            inside = (target - before) / self.counts[i] if self.counts[i] else 0.0
+            value = self.lo + (i + inside) * self.width
+            result.append(float(min(max(value, self.min), self.max)))
+        return result
+
+    def mean(self):
+        return self.total / self.count if self.count else np.nan
+
+    def std(self):
+        if self.count < 2:
+            return np.nan
+        var = (self.total_sq - self.total ** 2 / self.count) / (self.count - 1)
+        return float(np.sqrt(max(var, 0.0)))
+
+
+def run_monte_carlo(dispersions=None, runs=10000, chunk=2000, workers=None, seed=None,
+                    dt=0.1, total_time=135, percentiles=DEFAULT_PERCENTILES):
+    """Монте-Карло по параметрам ракеты: пачки траекторий считаются в пуле процессов
+
+    Итоговые величины каждой пачки сразу сливаются в потоковые гистограммы,
+    сами траектории не сохраняются. Возвращает словарь по METRICS со статистикой.
+    """
+    if dispersions is None:
+        dispersions = DEFAULT_DISPERSIONS
+    workers = workers or os.cpu_count() or 1
+
+    seeds = np.random.SeedSequence(seed).spawn((runs + chunk - 1) // chunk)
+    tasks = []
+    remaining = runs
+    for child in seeds:
+        size = min(chunk, remaining)
+        tasks.append((dispersions, size, child, dt, total_time))
+        remaining -= size
+
+    histograms = {name: StreamingHistogram() for name in METRICS}
+
+    def consume(summaries):
+        for name in METRICS:
+            histograms[name].add(summaries[name])
+
+    if workers == 1:
+        for task in tasks:
+            consume(run_chunk(task))
+    else:
+        with Pool(workers) as pool:
+            for summaries in pool.imap_unordered(run_chunk, tasks):
+                consume(summaries)
+
+    report = {}
+    for name, hist in histograms.items():
+        report[name] = {
+            'count': hist.count,
+            'unbounded': hist.skipped,
+            'mean': hist.mean(),
+            'std': hist.std(),
+            'min': hist.min,
+            'max': hist.max,
+            'percentiles': dict(zip(percentiles, hist.percentiles(percentiles))),
+        }
+    return report
+
+
+def print_report(report):
+    """Печатает таблицу перцентилей по итоговым величинам"""
+    for name, stats in report.items():
+        print(f"\n{name}: прогонов {stats['count']}, среднее {stats['mean']:.1f}, СКО {stats['std']:.1f}")
+        if stats['unbounded']:
+            print(f"  незамкнутых орбит: {stats['unbounded']}")
+        print("  " + "  ".join(f"p{q}={v:.1f}" for q, v in stats['percentiles'].items()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Монте-Карло разброса параметров ракеты')
+    parser.add_argument('config', nargs='?', help='JSON с распределениями параметров')
+    parser.add_argument('--runs', type=int, default=10000)
+    parser.add_argument('--chunk', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--dt', type=float, default=0.1)
+    parser.add_argument('--output', help='сохранить отчет в JSON')
+    args = parser.parse_args()
+
+    dispersions = load_dispersions(args.config) if args.config else DEFAULT_DISPERSIONS
+    report = run_monte_carlo(dispersions, runs=args.runs, chunk=args.chunk,
+                             workers=args.workers, seed=args.seed, dt=args.dt)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
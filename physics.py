@@ -0,0 +1,146 @@
+import json
+import math
+import os
+
+import numpy as np
+
+# Файл с телами и ракетами (лежит рядом с модулем)
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'vehicles.json')
+
+# Параметры тела в файле -> имена параметров модели batchsim
+BODY_KEYS = {'g0': 'g0', 'R': 'R_k', 'rho0': 'rho0', 'H': 'H'}
+VEHICLE_KEYS = ('Cx', 'r', 'm0_1', 'mk_1', 't_work1', 'Isp_1',
+                'm0_2', 'mk_2', 't_work2', 'Isp_2', 'isp_sea_factor')
+
+_configs = {}
+
+
+def load_config(path=CONFIG_FILE):
+    """Тела и ракеты из файла конфигурации (каждый файл читается один раз)"""
+    key = os.path.abspath(path)
+    if key not in _configs:
+        with open(path, 'r', encoding='utf-8') as f:
+            _configs[key] = json.load(f)
+    return _configs[key]
+
+
+def model_params(vehicle=None, body=None, config=None):
+    """Параметры ракеты и тела в именах модели batchsim (g0, R_k, rho0, H, Cx, ...)"""
+    config = config or load_config()
+    vehicle = vehicle or config['default_vehicle']
+    body = body or config['default_body']
+    if body not in config['bodies']:
+        raise KeyError(f"Неизвестное тело: {body}")
+    if vehicle not in config['vehicles']:
+        raise KeyError(f"Неизвестная ракета: {vehicle}")
+
+    b, v = config['bodies'][body], config['vehicles'][vehicle]
+    params = {name: b[key] for key, name in BODY_KEYS.items()}
+    params.update({key: v[key] for key in VEHICLE_KEYS})
+    return params
+
+
+# --- Физика: числа (math) и массивы (NumPy) -----------------------------
+
+def atmosphere_factor(h, H):
+    """Доля плотности у поверхности на высоте h: exp(-h / H)
+
+    Один множитель дает и плотность, и удельный импульс, поэтому его считают
+    раз на шаг и передают в density и specific_impulse.
+    """
+    if isinstance(h, (int, float)) and isinstance(H, (int, float)):
+        return math.exp(-h / H)
+    return np.exp(-h / H)
+
+
+def density(h, rho0, H, factor=None):
+    """Плотность атмосферы, кг/м³"""
+    return rho0 * (atmosphere_factor(h, H) if factor is None else factor)
+
+
+def gravity(h, g0, R):
+    """Ускорение свободного падения на высоте h, м/с²"""
+    return g0 * (R / (R + h)) ** 2
+
+
+def specific_impulse(isp_vac, sea_factor, factor):
+    """Удельный импульс растет от земного (isp_vac * sea_factor) к пустотному по экспоненте атмосферы"""
+    isp_h = isp_vac * sea_factor
+    return isp_h + (isp_vac - isp_h) * (1 - factor)
+
+
+class AltitudeTable:
+    """Функция высоты, заранее посчитанная на равномерной сетке (линейная интерполяция)
+
+    Поиск отсчета — одно деление, без бинарного поиска. Принимает число или массив.
+    Ниже 0 и выше h_max таблица не продолжается: значение считается по самой функции.
+    """
+
+    def __init__(self, func, h_max=200000, step=10.0):
+        self.func = func
+        self.step = step
+        self._inv = 1.0 / step
+        self.heights = np.arange(0.0, h_max + step, step)
+        self.values = np.asarray(func(self.heights), dtype=float)
+        self._list = self.values.tolist()
+        self._last = len(self._list) - 2
+        self._u_max = float(len(self._list) - 1)
+
+    def __call__(self, h):
+        if isinstance(h, (int, float)):
+            u = h * self._inv
+            if not 0.0 <= u <= self._u_max:
+                return self.func(h)
+            i = min(int(u), self._last)
+            a = self._list[i]
+            return a + (self._list[i + 1] - a) * (u - i)
+        h = np.asarray(h, dtype=float)
+        u = h * self._inv
+        inside = (u >= 0.0) & (u <= self._u_max)
+        u = np.clip(u, 0.0, self._u_max)
+        i = np.minimum(u.astype(np.intp), self._last)
+        a = self.values[i]
+        result = a + (self.values[i + 1] - a) * (u - i)
+        if not inside.all():
+            result[~inside] = self.func(h[~inside])
+        return result
+
+
+class PhysicsModel:
+    """Физика одной ракеты над одним телом: плотность, гравитация и удельный импульс
+    для числа или массива высот
+
+    tables=True — значения берутся из таблиц AltitudeTable (шаг table_step до h_max,
+    выше — по формулам). factor — уже посчитанный atmosphere_factor(h), как у
+    функций модуля.
+    Для экспоненциальной атмосферы прямой расчет в NumPy не медленнее таблиц,
+    таблицы нужны там, где функцию высоты дорого считать заново.
+    """
+
+    def __init__(self, vehicle=None, body=None, config=None, params=None,
+                 tables=False, h_max=200000, table_step=10.0):
+        self.params = {**model_params(vehicle, body, config), **(params or {})}
+        p = self.params
+        self.mu = p['g0'] * p['R_k'] ** 2
+
+        factor = lambda h: atmosphere_factor(h, p['H'])
+        accel = lambda h: gravity(h, p['g0'], p['R_k'])
+        if tables:
+            factor = AltitudeTable(factor, h_max, table_step)
+            accel = AltitudeTable(accel, h_max, table_step)
+        self._factor = factor
+        self._gravity = accel
+
+    def atmosphere_factor(self, h):
+        return self._factor(h)
+
+    def density(self, h, factor=None):
+        return self.params['rho0'] * (self._factor(h) if factor is None else factor)
+
+    def gravity(self, h):
+        return self._gravity(h)
+
+    def isp(self, h, stage=1, factor=None):
+        isp_vac = self.params['Isp_1'] if stage == 1 else self.params['Isp_2']
+        factor = self._factor(h) if factor is None else factor
+        return specific_impulse(isp_vac, self.params['isp_sea_factor'], factor)
@@ -0,0 +1,261 @@
+import argparse
+import json
+import time
+
+import numpy as np
+from batchsim import broadcast_params, derived_params, simulate_batch, apsides
+from physics import model_params
+
+# Целевая орбита из main2.py
+TARGET_APOAPSIS = 3840000
+TARGET_PERIAPSIS = 655000
+
+# Оптимизируемые параметры, их границы и шаг сетки (для кэша вычислений)
+ALTITUDE_BOUNDS = {
+    'turn_start_alt': (3000, 25000, 1.0),
+    'turn_end_alt': (30000, 120000, 1.0),
+    'turn_exponent': (0.3, 3.0, 1e-3),
+    'theta_end': (0.0, 30.0, 1e-2),
+    'throttle_2': (0.3, 1.0, 1e-3),
+}
+TIME_BOUNDS = {
+    't_start_turn': (5, 55, 1e-2),
+    't_end_turn': (60, 140, 1e-2),
+    'theta_end': (0.0, 30.0, 1e-2),
+    'throttle_2': (0.3, 1.0, 1e-3),
+}
+
+# Программа разворота из main2.py — точка, с которой начинается поиск
+MAIN2_PROGRAM = {
+    'turn_start_alt': 12000,
+    'turn_end_alt': 45000,
+    'turn_exponent': 1.5,
+    'theta_end': 0.0,
+    'throttle_2': 1.0,
+}
+
+
+def simulate_candidates(base, names, X, dt, total_time, state0=None, start_step=0):
+    """Считает пачку программ разворота и возвращает апоцентр, перицентр и расход топлива"""
+    params = dict(base)
+    for j, name in enumerate(names):
+        params[name] = X[:, j]
+    n = X.shape[0]
+    result = simulate_batch(params, n=n, dt=dt, total_time=total_time, record=False,
+                            state0=state0, start_step=start_step)
+
+    p = broadcast_params(params, n)
+    d = derived_params(p)
+    state = result['state']
+    apo, peri = apsides(state[:, 1], state[:, 2], state[:, 3], p)
+
+    # Топливо второй ступени, сожженное до выключения двигателя
+    t_stop = np.minimum(total_time, result['t_cut'])
+    burn2 = np.clip(t_stop - p['t_work1'], 0.0, d['t_work2_eff'])
+    used = d['mu_2'] * p['throttle_2'] * burn2
+    available = p['m0_2'] - p['mk_2']
+    return apo, peri, used / available
+
+
+class PitchProgramOptimizer:
+    """Поиск программы разворота под целевую орбиту с минимальным расходом топлива
+
+    Все новые кандидаты поколения считаются одной пачкой в batchsim, в одном процессе:
+    векторный расчет пачки быстрее, чем пересылка ее частей в пул процессов.
+    Общий для всех кандидатов вертикальный участок считается один раз,
+    расчеты кэшируются по параметрам, округленным до шага сетки.
+    """
+
+    def __init__(self, mode='altitude', bounds=None, base_params=None,
+                 target_apoapsis=TARGET_APOAPSIS, target_periapsis=TARGET_PERIAPSIS,
+                 propellant_weight=0.1, apo_cutoff=True, dt=0.1, total_time=200):
+        if mode not in ('altitude', 'time'):
+            raise ValueError(f"Неизвестный режим разворота: {mode}")
+        self.bounds = bounds or (ALTITUDE_BOUNDS if mode == 'altitude' else TIME_BOUNDS)
+        self.names = list(self.bounds)
+        self.lo = np.array([b[0] for b in self.bounds.values()], dtype=float)
+        self.hi = np.array([b[1] for b in self.bounds.values()], dtype=float)
+        self.grid = np.array([b[2] for b in self.bounds.values()], dtype=float)
+        # Знаков после запятой у шага сетки: округленные значения пишутся без хвостов 0.959000...01
+        self.decimals = [next(k for k in range(16) if round(g, k) == g) for g in self.grid]
+
+        self.mode = mode
+        self.base = dict(base_params or {})
+        self.base['pitch_mode'] = 1 if mode == 'altitude' else 0
+        if apo_cutoff:
+            self.base['apo_cutoff'] = target_apoapsis
+        self.target_apoapsis = target_apoapsis
+        self.target_periapsis = target_periapsis
+        self.propellant_weight = propellant_weight
+        self.dt = dt
+        self.total_time = total_time
+
+        self.cache = {}
+        self.cache_hits = 0
+        self.n_simulated = 0
+        self._prefix = self._vertical_ascent()
+
+    def _vertical_ascent(self):
+        """Вертикальный участок первой ступени, общий для всех программ разворота"""
+        params = dict(self.base)
+        params.update({'pitch_mode': 0, 't_start_turn': 1e9, 't_end_turn': 2e9})
+        params.pop('apo_cutoff', None)
+        t_work1 = broadcast_params(params)['t_work1'][0]
+        return simulate_batch(params, dt=self.dt, total_time=t_work1)
+
+    def _common_steps(self, X):
+        """Номер последнего шага, одинакового для всех кандидатов пачки"""
+        y = self._prefix['y'][:, 0]
+        if self.mode == 'altitude':
+            start = X[:, self.names.index('turn_start_alt')].min() if 'turn_start_alt' in self.names else np.inf
+            # Шаг i считается по высоте после шага i - 1
+            above = np.flatnonzero(y > start)
+            return min(above[0], len(y) - 1) if above.size else len(y) - 1
+        start = X[:, self.names.index('t_start_turn')].min() if 't_start_turn' in self.names else np.inf
+        steps = np.flatnonzero(self._prefix['t'] <= start)
+        return steps[-1] if steps.size else -1
+
+    def normalize(self, X):
+        """Приводит кандидатов к границам и к сетке"""
+        X = np.clip(np.atleast_2d(np.asarray(X, dtype=float)), self.lo, self.hi)
+        X = np.round(X / self.grid) * self.grid
+        for j, k in enumerate(self.decimals):
+            X[:, j] = np.round(X[:, j], k)
+        return X
+
+    def cost(self, apo, peri, fuel):
+        """Целевая функция: относительный промах по апсидам плюс штраф за топливо"""
+        apo = np.where(np.isfinite(apo), apo, 10 * self.target_apoapsis)
+        apo_err = (apo - self.target_apoapsis) / self.target_apoapsis
+        peri_err = (peri - self.target_periapsis) / self.target_periapsis
+        return apo_err ** 2 + peri_err ** 2 + self.propellant_weight * fuel
+
+    def evaluate(self, X):
+        """Стоимость каждого кандидата; уже посчитанные берутся из кэша"""
+        X = self.normalize(X)
+        keys = [tuple(row) for row in X]
+        todo = []
+        for i, key in enumerate(keys):
+            if key in self.cache:
+                self.cache_hits += 1
+            elif key not in todo:
+                todo.append(key)
+
+        if todo:
+            Xn = np.array(todo)
+            k = self._common_steps(Xn)
+            if k >= 0:
+                state0 = np.array([self._prefix[c][k, 0] for c in ('x', 'y', 'vx', 'vy')])
+                start_step = k + 1
+            else:
+                state0, start_step = None, 0
+
+            apo, peri, fuel = simulate_candidates(self.base, self.names, Xn, self.dt, self.total_time,
+                                                  state0, start_step)
+            costs = self.cost(apo, peri, fuel)
+            for i, key in enumerate(todo):
+                self.cache[key] = {'cost': float(costs[i]), 'apoapsis': float(apo[i]),
+                                   'periapsis': float(peri[i]), 'fuel_fraction': float(fuel[i])}
+            self.n_simulated += len(todo)
+
+        return X, np.array([self.cache[key]['cost'] for key in keys])
+
+    def optimize(self, generations=60, popsize=40, seed=None, x0=None, tol=1e-6,
+                 patience=10, F=0.7, CR=0.9, verbose=False):
+        """Дифференциальная эволюция (DE/rand/1/bin), поколение считается одной пачкой
+
+        x0 — стартовые кандидаты (словари параметров или массив), например прошлый результат.
+        """
+        rng = np.random.default_rng(seed)
+        dim = len(self.names)
+        started = time.perf_counter()
+
+        population = self.lo + rng.random((popsize, dim)) * (self.hi - self.lo)
+        if x0 is not None:
+            seeds = np.array([[c[name] for name in self.names] if isinstance(c, dict) else c
+                              for c in x0], dtype=float)[:popsize]
+            population[:len(seeds)] = seeds
+
+        history = []
+        population, costs = self.evaluate(population)
+        for generation in range(generations):
+            idx = np.array([rng.choice(popsize - 1, 3, replace=False) for _ in range(popsize)])
+            idx += idx >= np.arange(popsize)[:, None]
+            a, b, c = population[idx[:, 0]], population[idx[:, 1]], population[idx[:, 2]]
+            mutant = a + F * (b - c)
+            cross = rng.random((popsize, dim)) < CR
+            cross[np.arange(popsize), rng.integers(dim, size=popsize)] = True
+            trial, trial_costs = self.evaluate(np.where(cross, mutant, population))
+
+            better = trial_costs <= costs
+            population[better] = trial[better]
+            costs[better] = trial_costs[better]
+            history.append(float(costs.min()))
+
+            if verbose:
+                print(f"поколение {generation + 1}: лучшая стоимость {history[-1]:.6f}")
+            if len(history) > patience and history[-patience - 1] - history[-1] < tol:
+                break
+
+        best = int(np.argmin(costs))
+        key = tuple(population[best])
+        return {
+            'program': dict(zip(self.names, map(float, population[best]))),
+            'mode': self.mode,
+            **self.cache[key],
+            'history': history,
+            'population': population.tolist(),
+            'simulated': self.n_simulated,
+            'cache_hits': self.cache_hits,
+            'elapsed': time.perf_counter() - started,
+        }
+
+
+def save_program(path, result):
+    """Сохраняет найденную программу разворота и последнюю популяцию в JSON"""
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+
+def load_warm_start(path):
+    """Кандидаты для повторного запуска из сохраненного результата"""
+    with open(path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    return [saved['program']] + saved.get('population', [])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Оптимизация программы разворота под целевую орбиту')
+    parser.add_argument('--mode', choices=('altitude', 'time'), default='altitude')
+    parser.add_argument('--generations', type=int, default=60)
+    parser.add_argument('--popsize', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--apoapsis', type=float, default=TARGET_APOAPSIS)
+    parser.add_argument('--periapsis', type=float, default=TARGET_PERIAPSIS)
+    parser.add_argument('--fuel-weight', type=float, default=0.1)
+    parser.add_argument('--warm-start', help='JSON с прошлым результатом')
+    parser.add_argument('--vehicle', help='ракета из vehicles.json')
+    parser.add_argument('--body', help='тело из vehicles.json')
+    parser.add_argument('--curved', action='store_true', help='модель вокруг центра тела (точные апсиды)')
+    parser.add_argument('--output', default='pitch_program.json')
+    args = parser.parse_args()
+
+    base_params = model_params(args.vehicle, args.body)
+    if args.curved:
+        base_params['curved'] = 1
+    optimizer = PitchProgramOptimizer(mode=args.mode, base_params=base_params,
+                                      target_apoapsis=args.apoapsis,
+                                      target_periapsis=args.periapsis,
+                                      propellant_weight=args.fuel_weight)
+    if args.warm_start:
+        x0 = load_warm_start(args.warm_start)
+    else:
+        x0 = [MAIN2_PROGRAM] if args.mode == 'altitude' else None
+    result = optimizer.optimize(generations=args.generations, popsize=args.popsize,
+                                seed=args.seed, x0=x0, verbose=True)
+    save_program(args.output, result)
+
+    print(f"\nПрограмма разворота: {result['program']}")
+    print(f"Апоцентр {result['apoapsis']:.0f} м, перицентр {result['periapsis']:.0f} м, "
+          f"израсходовано {result['fuel_fraction'] * 100:.1f}% топлива второй ступени")
+    print(f"Расчетов {result['simulated']}, из кэша {result['cache_hits']}, время {result['elapsed']:.1f} с")
@@ -0,0 +1,141 @@
+import json
+import os
+import queue
+import sys
+import threading
+from collections import deque
+
+# Округление каналов при записи (как было в main2.py)
+ROUNDING = {'mission_time': 3, 'altitude': 1, 'speed': 1, 'pitch': 1}
+
+# Каналы, которые печатаются в консоль
+ECHO_CHANNELS = ('mission_time', 'altitude', 'speed')
+
+
+class FlightRecorder:
+    """Запись телеметрии в фоновом потоке
+
+    Цикл управления только кладет отсчет в ограниченную очередь (без ожидания),
+    фоновый поток округляет отсчеты, дописывает их в файл JSON Lines, печатает
+    в консоль и складывает в кольцевой буфер последних отсчетов для живых графиков.
+    При аварии теряются только отсчеты, еще не записанные из очереди.
+    Ошибка записи останавливает поток; она сохраняется в error и выбрасывается из close().
+    """
+
+    def __init__(self, path, queue_size=4096, ring_size=2048, echo=True, fsync=False, close_timeout=5.0):
+        self.path = path
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.ring = deque(maxlen=ring_size)
+        self.echo = echo
+        self.fsync = fsync
+        self.written = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.error = None
+        self.close_timeout = close_timeout
+        self._file = open(path, 'w', encoding='utf-8')
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name='flight-recorder', daemon=True)
+        self._thread.start()
+
+    def record(self, sample):
+        """Передает отсчет (словарь каналов) на запись; при переполнении или после
+        ошибки записи отсчет отбрасывается"""
+        if self.error is not None:
+            self.dropped += 1
+            return
+        try:
+            self.queue.put_nowait(sample)
+        except queue.Full:
+            self.dropped += 1
+
+    def latest(self, n=None):
+        """Копия последних n отсчетов кольцевого буфера"""
+        items = list(self.ring)
+        return items if n is None else items[-n:]
+
+    def _run(self):
+        while True:
+            try:
+                batch = [self.queue.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.max_depth = max(self.max_depth, len(batch))
+
+            stop = batch[-1] is None
+            samples = [s for s in batch if s is not None]
+            if samples:
+                try:
+                    self._write(samples)
+                except Exception as error:
+                    self.error = error
+                    self.dropped += len(samples)
+                    return
+            if stop:
+                return
+
+    def _write(self, samples):
+        lines = []
+        echo = []
+        for sample in samples:
+            rounded = {k: round(v, ROUNDING[k]) if k in ROUNDING else v for k, v in sample.items()}
+            self.ring.append(rounded)
+            lines.append(json.dumps(rounded, ensure_ascii=False))
+            if self.echo:
+                echo.append(' '.join(str(rounded[k]) for k in ECHO_CHANNELS if k in rounded))
+
+        self._file.write('\n'.join(lines) + '\n')
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.written += len(samples)
+
+        if echo:
+            sys.stdout.write('\n'.join(echo) + '\n')
+
+    def close(self):
+        """Дописывает очередь и закрывает файл; выбрасывает ошибку фонового потока, если она была
+
+        Если поток не успевает дописать очередь за close_timeout, файл закрывается без него.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            try:
+                self.queue.put(None, timeout=self.close_timeout)
+            except queue.Full:
+                pass
+            self._thread.join(self.close_timeout)
+        if not self._thread.is_alive():
+            self._file.close()
+        if self.error is not None:
+            raise self.error
+
+    def samples(self):
+        """Все записанные отсчеты (читаются из файла)"""
+        return load_samples(self.path)
+
+    def stats(self):
+        return {
+            'written': self.written,
+            'dropped': self.dropped,
+            'max_queue_depth': self.max_depth,
+        }
+
+
+def load_samples(path):
+    """Читает отсчеты из файла JSON Lines; недописанная последняя строка пропускается"""
+    samples = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                samples.append(json.loads(line))
+            except json.JSONDecodeError:
+                break
+    return samples
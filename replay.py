@@ -0,0 +1,165 @@
+import argparse
+import importlib
+import json
+import os
+import time
+from multiprocessing import Pool
+
+from fakekrpc import FakeConnection, FakeSpaceCenter, FakeVessel, RecordedTelemetry
+from flightlog import load_flight
+from mission import MissionMachine
+from missionclock import SimClock
+from telemetry import TelemetryStreams
+
+# Частота цикла управления при повторе (как CONTROL_RATE в main2.py)
+REPLAY_RATE = 20
+
+# Логика полета по умолчанию: этапы автопилота main2.py
+DEFAULT_MISSION = 'main2:avangard_mission'
+
+
+def load_mission(spec=DEFAULT_MISSION):
+    """Функция этапов полета по строке 'модуль:функция' (как main2.avangard_mission)"""
+    if callable(spec):
+        return spec
+    module, _, name = spec.partition(':')
+    return getattr(importlib.import_module(module), name)
+
+
+def replay_flight(path, mission=DEFAULT_MISSION, rate=REPLAY_RATE, params=None, commands=False):
+    """Прогоняет логику автопилота по записанному полету в модельном времени
+
+    Ракета «летит» точно по записи, автопилот видит ее телеметрию на тактах цикла
+    и выдает команды, которые записываются вместо исполнения. Возвращает сводку:
+    этапы, команды ступеней (с высотой), первое снижение тяги, число команд тангажа
+    и сравнение времени отделения первой ступени с записанным.
+    """
+    flight = load_flight(path)
+    profile = RecordedTelemetry(flight, params)
+    clock = SimClock()
+    vessel = FakeVessel(profile, clock=clock.perf_counter)
+    conn = FakeConnection(FakeSpaceCenter(vessel))
+    telemetry = TelemetryStreams(conn, vessel)
+
+    state = {}
+    phases, global_transitions = load_mission(mission)(vessel, conn.space_center, telemetry, state)
+    machine = MissionMachine(phases, 'prelaunch', telemetry, clock, global_transitions)
+
+    period = 1.0 / rate
+    ticks = 0
+    machine.start(clock.time())
+    while not machine.phase.terminal and clock.time() < profile.duration:
+        ticks += 1
+        clock.now = ticks * period
+        machine.step(clock.now)
+    machine.close()
+
+    def altitude_at(t):
+        return round(profile(t)['altitude'], 1)
+
+    history = [{'phase': name, 'mission_time': round(t, 3)} for t, name in machine.history]
+    stage_commands = [{'mission_time': t, 'stage': stage, 'altitude': altitude_at(t)}
+                      for t, command, stage in vessel.commands if command == 'activate_next_stage']
+    throttle_cut = next(({'mission_time': t, 'throttle': round(value, 3), 'altitude': altitude_at(t)}
+                         for t, command, value in vessel.commands
+                         if command == 'throttle' and 0 < value < 1.0), None)
+
+    separation = next((h['mission_time'] for h in history if h['phase'] == 'stage_separation'), None)
+    t = flight.mission_time
+    a, b = flight.stages.get('second_stage', (len(t), len(t)))
+    recorded_separation = float(t[a]) if a < b else None
+
+    result = {
+        'path': path,
+        'duration': round(profile.duration, 3),
+        'ticks': ticks,
+        'final_phase': machine.phase.name,
+        'phases': history,
+        'stage_commands': stage_commands,
+        'throttle_cut': throttle_cut,
+        'pitch_commands': sum(1 for _, command, _ in vessel.commands if command == 'target_pitch_and_heading'),
+        'separation_time': separation,
+        'recorded_separation_time': recorded_separation,
+        'separation_delta': (round(separation - recorded_separation, 3)
+                             if separation is not None and recorded_separation is not None else None),
+    }
+    if commands:
+        result['commands'] = vessel.commands
+    return result
+
+
+def _replay_task(task):
+    path, options = task
+    try:
+        return replay_flight(path, **options)
+    except (OSError, ValueError, KeyError) as e:
+        return {'path': path, 'error': str(e)}
+
+
+def replay_flights(paths, mission=DEFAULT_MISSION, rate=REPLAY_RATE, params=None, commands=False,
+                   workers=None):
+    """Повтор логики автопилота по многим записанным полетам (в пуле процессов)
+
+    mission передается строкой 'модуль:функция', чтобы ее можно было отдать процессам.
+    """
+    options = {'mission': mission, 'rate': rate, 'params': params, 'commands': commands}
+    tasks = [(path, options) for path in paths]
+    workers = min(workers or os.cpu_count() or 1, max(len(paths), 1))
+    if workers == 1 or callable(mission):
+        return [_replay_task(task) for task in tasks]
+    with Pool(workers) as pool:
+        return pool.map(_replay_task, tasks)
+
+
+def print_replay(results):
+    for r in results:
+        name = os.path.basename(r['path'])
+        if r.get('error'):
+            print(f"{name}: ошибка {r['error']}")
+            continue
+        phases = ', '.join(f"{h['phase']} {h['mission_time']:.2f}" for h in r['phases'])
+        print(f"{name}: {r['duration']:.1f} с, этап в конце: {r['final_phase']}")
+        print(f"  Этапы: {phases}")
+        stages = ', '.join(f"{s['stage']} — {s['mission_time']:.2f} с, {s['altitude']:.0f} м"
+                           for s in r['stage_commands'])
+        print(f"  Ступени: {stages or 'нет'}")
+        if r['separation_delta'] is not None:
+            print(f"  Отделение первой ступени: {r['separation_time']:.2f} с "
+                  f"(в записи {r['recorded_separation_time']:.2f} с, разница {r['separation_delta']:+.2f} с)")
+        cut = r['throttle_cut']
+        if cut:
+            print(f"  Снижение тяги: {cut['mission_time']:.2f} с, высота {cut['altitude']:.0f} м, "
+                  f"тяга {cut['throttle']}")
+        print(f"  Команд тангажа: {r['pitch_commands']}")
+
+
+if __name__ == '__main__':
+    from archive import FlightArchive
+
+    parser = argparse.ArgumentParser(description='Повтор логики автопилота main2.py по записанным полетам')
+    parser.add_argument('files', nargs='*', help='файлы полетов (по умолчанию последний полет архива)')
+    parser.add_argument('--all', action='store_true', help='все полеты архива')
+    parser.add_argument('--directory', default='.')
+    parser.add_argument('--mission', default=DEFAULT_MISSION, help='этапы полета: модуль:функция')
+    parser.add_argument('--rate', type=float, default=REPLAY_RATE)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--commands', action='store_true', help='сохранить все команды')
+    parser.add_argument('--out', help='записать сводку в JSON')
+    args = parser.parse_args()
+
+    paths = args.files
+    if not paths:
+        archive = FlightArchive(args.directory)
+        entries = archive.select(kind=None) if args.all else [archive.latest()]
+        paths = [e['path'] for e in entries if e]
+
+    started = time.perf_counter()
+    results = replay_flights(paths, args.mission, args.rate, commands=args.commands, workers=args.workers)
+    elapsed = time.perf_counter() - started
+    print_replay(results)
+    flown = sum(r.get('duration', 0) for r in results)
+    print(f"Полетов: {len(results)}, {elapsed:.2f} с, ускорение {flown / max(elapsed, 1e-9):.0f}x")
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,174 @@
+import math
+import os
+
+import numpy as np
+
+# Скалярное ядро модели для одной траектории: тот же полунеявный метод Эйлера,
+# что в batchsim.simulate_batch, но шаг — обычная арифметика над числами, без
+# массивов NumPy и вызовов функций. С Numba ядро компилируется (njit), без нее
+# работает как есть на чистом Python. AVANGARD_NO_JIT=1 — не компилировать.
+try:
+    if os.environ.get('AVANGARD_NO_JIT'):
+        raise ImportError
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:
+    HAVE_NUMBA = False
+
+# Порядок параметров в кортеже, который получает ядро
+KERNEL_PARAMS = ('g0', 'R_k', 'rho0', 'H', 'Cx', 'S', 'm0_1', 'mu_1', 't_work1', 'Isp_1',
+                 'm0_2', 'mk_2', 'mu_2', 'Isp_2', 'isp_sea_factor', 'throttle_2', 't_work2_eff',
+                 't_end2', 'theta_start', 'theta_end', 't_start_turn', 't_end_turn', 'k_theta',
+                 'pitch_mode', 'turn_start_alt', 'turn_end_alt', 'turn_exponent', 'apo_cutoff', 'curved')
+
+# Каналы записи в порядке столбцов выходного массива
+CHANNELS = ('x', 'y', 'vx', 'vy', 'speed', 'theta')
+
+
+def euler_kernel(k, dt, start_step, n_steps, state, out):
+    """Шаги start_step..n_steps для одной траектории
+
+    k — параметры в порядке KERNEL_PARAMS, state — (x, y, vx, vy), меняется на месте,
+    out — заранее выделенный массив (шаги, 6) для каналов CHANNELS или массив
+    нулевой длины без записи. Возвращает (максимальный скоростной напор, t_cut).
+    """
+    (g0, R, rho0, H, Cx, S, m0_1, mu_1, t_work1, Isp_1,
+     m0_2, mk_2, mu_2, Isp_2, sea, throttle_2, t_work2_eff,
+     t_end2, theta_start, theta_end, t_start_turn, t_end_turn, k_theta,
+     pitch_mode, turn_start_alt, turn_end_alt, turn_exponent, apo_cutoff, curved) = k
+
+    x, y, vx, vy = state[0], state[1], state[2], state[3]
+    record = out.shape[0] > 0
+    cutoff = apo_cutoff < math.inf
+    mu = g0 * R ** 2
+    t_cut = math.inf
+    max_q = 0.0
+
+    for j in range(n_steps + 1 - start_step):
+        t = (start_step + j) * dt
+
+        # Программа тангажа (batchsim.pitch_program)
+        if t <= t_start_turn:
+            theta = theta_start
+        elif t <= t_end_turn:
+            theta = max(theta_start - k_theta * (t - t_start_turn), 0.0)
+        else:
+            theta = theta_end
+        if pitch_mode == 1.0:
+            progress = min(max((y - turn_start_alt) / (turn_end_alt - turn_start_alt), 0.0), 1.0)
+            theta = theta_start - (theta_start - theta_end) * progress ** turn_exponent
+        if record:
+            out[j, 5] = theta
+
+        # Масса и тяга (batchsim.mass_and_thrust)
+        factor = math.exp(-y / H)
+        stage1 = t <= t_work1
+        tm = min(t, t_cut)
+        if stage1:
+            m = m0_1 if tm < 0 else m0_1 - mu_1 * tm
+            isp_vac = Isp_1
+            flow = mu_1
+        else:
+            m = m0_2 - mu_2 * throttle_2 * (tm - t_work1) if t - t_work1 <= t_work2_eff else mk_2
+            isp_vac = Isp_2
+            flow = mu_2 * throttle_2 if t <= t_end2 else 0.0
+        isp_h = isp_vac * sea
+        isp = isp_h + (isp_vac - isp_h) * (1 - factor)
+        thrust = isp * flow * g0 if t < t_cut else 0.0
+
+        # Ускорение (batchsim.acceleration)
+        g = g0 * (R / (R + y)) ** 2
+        rho = rho0 * factor
+        v2 = vx ** 2 + vy ** 2
+        v = math.sqrt(v2)
+        drag = 0.5 * rho * v ** 2 * Cx * S
+        v_safe = v if v > 0 else 1.0
+        m_safe = m if m > 0 else math.inf
+        theta_rad = math.radians(theta)
+        ax = (thrust * math.cos(theta_rad) + -drag * (vx / v_safe)) / m_safe
+        ay = (thrust * math.sin(theta_rad) - m * g + -drag * (vy / v_safe)) / m_safe
+        if curved == 1.0:
+            kc = curved / (R + y)
+            ax = ax - kc * vx * vy
+            ay = ay + kc * vx ** 2
+        max_q = max(max_q, 0.5 * rho0 * factor * v2)
+
+        vx += ax * dt
+        vy += ay * dt
+        y += vy * dt
+        x += vx * dt
+
+        # Выключение двигателя по апоцентру (batchsim.apsides)
+        if cutoff and t_cut == math.inf:
+            r = R + y
+            energy = (vx ** 2 + vy ** 2) / 2 - mu / r
+            if energy < 0:
+                h = r * vx
+                e = math.sqrt(max(1 + 2 * energy * h ** 2 / mu ** 2, 0.0))
+                if -mu / (2 * energy) * (1 + e) - R >= apo_cutoff:
+                    t_cut = t + dt
+            else:
+                t_cut = t + dt
+
+        if record:
+            out[j, 0] = x
+            out[j, 1] = y
+            out[j, 2] = vx
+            out[j, 3] = vy
+            out[j, 4] = math.sqrt(vx ** 2 + vy ** 2)
+
+    state[0], state[1], state[2], state[3] = x, y, vx, vy
+    return max_q, t_cut
+
+
+_jit_kernel = njit(cache=True)(euler_kernel) if HAVE_NUMBA else None
+
+# Ядро по умолчанию: скомпилированное, если есть Numba
+BACKEND = 'numba' if HAVE_NUMBA else 'python'
+
+
+def kernel_params(p, d):
+    """Кортеж чисел для ядра из параметров batchsim (broadcast_params и derived_params, N = 1)"""
+    values = {**p, **d}
+    return tuple(float(np.asarray(values[name]).ravel()[0]) for name in KERNEL_PARAMS)
+
+
+def run_kernel(p, d, dt, n_steps, state0=None, start_step=0, record=True, backend=None):
+    """Шаги ядра по уже приведенным параметрам batchsim; результат как у simulate_batch с N = 1
+
+    backend — 'numba' или 'python' (по умолчанию BACKEND).
+    """
+    backend = backend or BACKEND
+    if backend == 'numba' and not HAVE_NUMBA:
+        raise ValueError("Numba не установлена")
+    if backend not in ('numba', 'python'):
+        raise ValueError(f"Неизвестное ядро: {backend}")
+    if p['g0'].shape[0] != 1:
+        raise ValueError("Скалярное ядро считает одну траекторию")
+
+    state = np.zeros(4)
+    if state0 is not None:
+        state[:] = np.asarray(state0, dtype=float).ravel()
+    times = np.arange(start_step, n_steps + 1) * dt
+    out = np.empty((len(times) if record else 0, len(CHANNELS)))
+
+    kernel = _jit_kernel if backend == 'numba' else euler_kernel
+    max_q, t_cut = kernel(kernel_params(p, d), float(dt), int(start_step), int(n_steps), state, out)
+
+    result = {'t': times}
+    if record:
+        for i, name in enumerate(CHANNELS):
+            result[name] = out[:, i:i + 1]
+    result['state'] = state[None, :]
+    result['max_q'] = np.array([max_q])
+    result['t_cut'] = np.array([t_cut])
+    return result
+
+
+def simulate_single(params=None, dt=0.1, total_time=135, record=True, state0=None, start_step=0,
+                    backend=None):
+    """Одна траектория скалярным ядром (аргументы как у batchsim.simulate_batch)"""
+    from batchsim import broadcast_params, derived_params
+
+    p = broadcast_params(params)
+    return run_kernel(p, derived_params(p), dt, int(total_time / dt), state0, start_step, record, backend)
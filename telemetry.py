@@ -0,0 +1,254 @@
+import json
+import math
+import queue
+import socket
+import time
+
+from looptiming import LatencyHistogram
+
+# Адрес, на который автопилот рассылает телеметрию для живых графиков (dashboard.py)
+DASHBOARD_ADDRESS = ('127.0.0.1', 47017)
+
+
+class TelemetryStreams:
+    """Подписки kRPC на телеметрию ракеты вместо отдельных запросов в каждом цикле
+
+    Значения обновляются сервером в фоне, чтение потока не ждет ответа по сети.
+    sources — откуда берется каждый канал: (объект, свойство, тип значения в kRPC),
+    по ним условия на каналы можно проверять на сервере (см. mission.Trigger).
+    """
+
+    def __init__(self, conn, vessel, rate=None):
+        self.conn = conn
+        self.vessel = vessel
+        self.streams = []
+        self.sources = {}
+
+        flight = vessel.flight()
+        orbit = vessel.orbit
+        self.altitude = self._channel('altitude', flight, 'mean_altitude')
+        self.pitch = self._channel('pitch', flight, 'pitch', 'float')
+        self.apoapsis = self._channel('apoapsis', orbit, 'apoapsis_altitude')
+        self.periapsis = self._channel('periapsis', orbit, 'periapsis_altitude')
+        self.available_thrust = self._channel('available_thrust', vessel, 'available_thrust', 'float')
+        self.speed = self._speed_stream()
+
+        if rate:
+            self.set_rate(rate)
+
+    def _add(self, func, *args):
+        stream = self.conn.add_stream(func, *args)
+        self.streams.append(stream)
+        return stream
+
+    def _channel(self, name, obj, attr, kind='double'):
+        stream = self._add(getattr, obj, attr)
+        self.sources[name] = (obj, attr, kind)
+        return stream
+
+    def _speed_stream(self):
+        """Поток скорости с теми же приоритетами, что были в get_correct_speed"""
+        vessel = self.vessel
+        candidates = (
+            # ПЕРВЫЙ ПРИОРИТЕТ: истинная орбитальная скорость
+            lambda: self._channel('speed', vessel.orbit, 'speed'),
+            # ВТОРОЙ ПРИОРИТЕТ: скорость в невращающейся системе отсчета
+            lambda: self._channel('speed', vessel.flight(vessel.orbit.body.non_rotating_reference_frame), 'speed'),
+            # ТРЕТИЙ ПРИОРИТЕТ: обычная скорость (относительно поверхности)
+            lambda: self._channel('speed', vessel.flight(), 'speed'),
+        )
+        for make in candidates:
+            try:
+                return make()
+            except Exception:
+                continue
+        return lambda: 0.0
+
+    def set_rate(self, rate):
+        """Частота обновления потоков на сервере (если версия kRPC это поддерживает)"""
+        for stream in self.streams:
+            try:
+                stream.rate = rate
+            except AttributeError:
+                pass
+
+    def close(self):
+        for stream in self.streams:
+            try:
+                stream.remove()
+            except Exception:
+                pass
+        self.streams = []
+
+
+class RateScheduler:
+    """Цикл с фиксированной частотой: ждет следующего такта и считает джиттер и перегрузки
+
+    Если работа заняла больше периода, такт считается перегрузкой, пропущенные
+    такты не догоняются, следующий запуск идет сразу.
+    Для каждого такта считаются работа (от начала такта до следующего wait),
+    ожидание и полная длительность такта (гистограммы looptiming.LatencyHistogram).
+    """
+
+    def __init__(self, rate, clock=time.perf_counter, sleep=time.sleep):
+        if rate <= 0:
+            raise ValueError("Частота цикла должна быть положительной")
+        self.rate = rate
+        self.period = 1.0 / rate
+        self.clock = clock
+        self.sleep = sleep
+        self.deadline = None
+        self.ticks = 0
+        self.overruns = 0
+        self.missed = 0
+        self.jitter_sum = 0.0
+        self.jitter_sq = 0.0
+        self.jitter_max = 0.0
+        self.overrun_max = 0.0
+        self.slept = 0.0
+        self.started = None
+        self.work = LatencyHistogram()
+        self.iteration = LatencyHistogram()
+
+    def wait(self):
+        """Ждет начала следующего такта и возвращает его плановое время"""
+        now = self.clock()
+        if self.started is not None:
+            self.work.add(now - self.started)
+        if self.deadline is None:
+            self.deadline = now
+        else:
+            self.deadline += self.period
+            if now > self.deadline:
+                self.overruns += 1
+                self.overrun_max = max(self.overrun_max, now - self.deadline)
+                skipped = int((now - self.deadline) // self.period)
+                self.missed += skipped
+                self.deadline += skipped * self.period
+            else:
+                self.sleep(self.deadline - now)
+                woke = self.clock()
+                self.slept += woke - now
+                now = woke
+
+        if self.started is not None:
+            self.iteration.add(now - self.started)
+        self.started = now
+
+        jitter = max(now - self.deadline, 0.0)
+        self.ticks += 1
+        self.jitter_sum += jitter
+        self.jitter_sq += jitter ** 2
+        self.jitter_max = max(self.jitter_max, jitter)
+        return self.deadline
+
+    def summary(self):
+        """Статистика цикла: такты, перегрузки, пропуски, джиттер в миллисекундах,
+        время работы и ожидания и гистограммы работы и длительности тактов"""
+        n = max(self.ticks, 1)
+        mean = self.jitter_sum / n
+        std = math.sqrt(max(self.jitter_sq / n - mean ** 2, 0.0))
+        busy = self.work.total + self.slept
+        return {
+            'rate': self.rate,
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'missed_ticks': self.missed,
+            'overrun_max_ms': round(self.overrun_max * 1000, 3),
+            'jitter_mean_ms': round(mean * 1000, 3),
+            'jitter_std_ms': round(std * 1000, 3),
+            'jitter_max_ms': round(self.jitter_max * 1000, 3),
+            'work_s': round(self.work.total, 3),
+            'sleep_s': round(self.slept, 3),
+            'work_fraction': round(self.work.total / busy, 4) if busy > 0 else 0.0,
+            'work': self.work.summary(),
+            'iteration': self.iteration.summary(),
+        }
+
+
+class TelemetryPublisher:
+    """Рассылка отсчетов телеметрии живым графикам без ожидания
+
+    Отсчет уходит UDP-датаграммой на локальный адрес (графики в отдельном процессе)
+    и в очереди подписчиков того же процесса. Если никто не слушает или очередь
+    полна, отсчет просто теряется — цикл управления никогда не ждет.
+    """
+
+    def __init__(self, address=DASHBOARD_ADDRESS):
+        self.address = address
+        self.sent = 0
+        self.dropped = 0
+        self._queues = []
+        self._socket = None
+        if address is not None:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._socket.setblocking(False)
+
+    def subscribe(self, maxsize=4096):
+        """Подписчик в том же процессе"""
+        q = queue.Queue(maxsize=maxsize)
+        self._queues.append(q)
+        return QueueSubscriber(q)
+
+    def publish(self, sample):
+        if self._socket is not None:
+            try:
+                self._socket.sendto(json.dumps(sample).encode('utf-8'), self.address)
+                self.sent += 1
+            except OSError:
+                self.dropped += 1
+        for q in self._queues:
+            try:
+                q.put_nowait(sample)
+            except queue.Full:
+                self.dropped += 1
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class TelemetrySubscriber:
+    """Прием отсчетов телеметрии по UDP (сторона живых графиков)"""
+
+    def __init__(self, address=DASHBOARD_ADDRESS, bufsize=65536):
+        self.bufsize = bufsize
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind(address)
+        self._socket.setblocking(False)
+
+    def poll(self):
+        """Все пришедшие с прошлого вызова отсчеты (без ожидания)"""
+        samples = []
+        while True:
+            try:
+                data = self._socket.recv(self.bufsize)
+            except OSError:
+                # Нет данных (или ошибка сокета) — отдаем то, что успели принять
+                return samples
+            try:
+                samples.append(json.loads(data))
+            except ValueError:
+                continue
+
+    def close(self):
+        self._socket.close()
+
+
+class QueueSubscriber:
+    """Прием отсчетов из очереди TelemetryPublisher в том же процессе"""
+
+    def __init__(self, q):
+        self.queue = q
+
+    def poll(self):
+        samples = []
+        while True:
+            try:
+                samples.append(self.queue.get_nowait())
+            except queue.Empty:
+                return samples
+
+    def close(self):
+        pass
@@ -0,0 +1,290 @@
+import hashlib
+import inspect
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+# Каталог кэша траекторий на диске
+CACHE_DIR = '.trajcache'
+
+# Пределы размера: в памяти и на диске, байт
+MAX_MEMORY = 64 * 2 ** 20
+MAX_DISK = 512 * 2 ** 20
+
+# Файлы модели: при их изменении ключи меняются и старые расчеты не используются
+MODEL_SOURCES = ('batchsim.py', 'integrators.py', 'scalarsim.py', 'physics.py', 'vehicles.json')
+
+# Расчет по simulate_batch (без точного попадания на события, в отличие от integrate('euler'))
+BATCH = 'batch'
+
+_model_version = None
+
+
+def model_version():
+    """Отпечаток исходников модели (считается один раз на процесс)"""
+    global _model_version
+    if _model_version is None:
+        digest = hashlib.blake2b(digest_size=8)
+        here = os.path.dirname(os.path.abspath(__file__))
+        for name in MODEL_SOURCES:
+            path = os.path.join(here, name)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    digest.update(name.encode() + f.read())
+        _model_version = digest.hexdigest()
+    return _model_version
+
+
+def trajectory_key(method, params=None, n=None, **options):
+    """Ключ расчета: хэш полного набора параметров (с учетом значений по умолчанию),
+    метода, шага и остальных аргументов расчета, а также версии модели"""
+    from batchsim import broadcast_params
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{model_version()}|{method}'.encode())
+    for name, value in sorted(broadcast_params(params, n).items()):
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(value, dtype=float).tobytes())
+    for name, value in sorted(options.items()):
+        digest.update(name.encode())
+        if isinstance(value, np.ndarray) or isinstance(value, (list, tuple)):
+            digest.update(np.ascontiguousarray(value, dtype=float).tobytes())
+        else:
+            digest.update(repr(value).encode())
+    return digest.hexdigest()
+
+
+def _nbytes(result):
+    return sum(v.nbytes for v in result.values() if isinstance(v, np.ndarray))
+
+
+def _freeze(result):
+    """Массивы кэша только для чтения: случайная запись в них не испортит следующие ответы"""
+    for value in result.values():
+        if isinstance(value, np.ndarray):
+            value.setflags(write=False)
+    for event in result.get('events', ()):
+        if isinstance(event.get('state'), np.ndarray):
+            event['state'].setflags(write=False)
+    return result
+
+
+def _to_arrays(result):
+    """Результат расчета -> массивы для .npz (события integrate — отдельными столбцами)"""
+    arrays = {}
+    meta = {}
+    for name, value in result.items():
+        if isinstance(value, np.ndarray):
+            arrays[name] = value
+        elif name == 'events':
+            arrays['events.name'] = np.array([e['name'] for e in value], dtype=str)
+            arrays['events.t'] = np.array([e['t'] for e in value], dtype=float)
+            arrays['events.index'] = np.array([e['index'] for e in value], dtype=int)
+            arrays['events.state'] = np.array([e['state'] for e in value], dtype=float).reshape(len(value), 4)
+        else:
+            meta[name] = value
+    arrays['meta'] = np.array(json.dumps(meta))
+    return arrays
+
+
+def _from_arrays(data):
+    result = {}
+    for name in data.files:
+        if name == 'meta':
+            result.update(json.loads(str(data['meta'])))
+        elif not name.startswith('events.'):
+            result[name] = data[name]
+    if 'events.name' in data.files:
+        result['events'] = [{'name': str(name), 't': float(t), 'index': int(i), 'state': state}
+                            for name, t, i, state in zip(data['events.name'], data['events.t'],
+                                                         data['events.index'], data['events.state'])]
+    return result
+
+
+class TrajectoryCache:
+    """Кэш рассчитанных траекторий: в памяти (LRU) и на диске (.npz в CACHE_DIR)
+
+    Ключ — хэш параметров, метода и шага (trajectory_key), поэтому одинаковые
+    расчеты из разных скриптов и запусков берутся из кэша. Размер каждого уровня
+    ограничен: при переполнении удаляются давно не использованные записи.
+    Возвращаемые массивы только для чтения.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_memory=MAX_MEMORY, max_disk=MAX_DISK, disk=True):
+        self.directory = directory
+        self.max_memory = max_memory
+        self.max_disk = max_disk
+        self.disk = disk
+        self.memory = OrderedDict()
+        self.memory_bytes = 0
+        self.hits_memory = 0
+        self.hits_disk = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.npz')
+
+    def get(self, key):
+        """Результат из кэша или None"""
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits_memory += 1
+            return self._copy(self.memory[key])
+
+        if self.disk:
+            path = self._path(key)
+            try:
+                with np.load(path) as data:
+                    result = _from_arrays(data)
+                os.utime(path)
+            except (OSError, ValueError, KeyError):
+                result = None
+            if result is not None:
+                self.hits_disk += 1
+                self._remember(key, _freeze(result))
+                return self._copy(result)
+
+        self.misses += 1
+        return None
+
+    def put(self, key, result):
+        result = _freeze(self._copy(result))
+        self._remember(key, result)
+        if self.disk:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            tmp = f'{path}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                np.savez(f, **_to_arrays(result))
+            os.replace(tmp, path)
+            self._trim_disk()
+        return self._copy(result)
+
+    def compute(self, func, method, params=None, n=None, **options):
+        """func(params, n=n, **options) с кэшированием по ключу trajectory_key"""
+        key = trajectory_key(method, params, n, **options)
+        result = self.get(key)
+        if result is None:
+            result = self.put(key, func(params, n=n, **options))
+        return result
+
+    @staticmethod
+    def _copy(result):
+        # Словарь и список событий свои у каждого ответа, массивы общие
+        copy = dict(result)
+        if 'events' in copy:
+            copy['events'] = [dict(e) for e in copy['events']]
+        return copy
+
+    def _remember(self, key, result):
+        size = _nbytes(result)
+        if size > self.max_memory:
+            return
+        if key in self.memory:
+            self.memory_bytes -= _nbytes(self.memory.pop(key))
+        self.memory[key] = result
+        self.memory_bytes += size
+        while self.memory_bytes > self.max_memory:
+            _, old = self.memory.popitem(last=False)
+            self.memory_bytes -= _nbytes(old)
+            self.evictions += 1
+
+    def _files(self):
+        if not os.path.isdir(self.directory):
+            return []
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.npz'):
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def _trim_disk(self):
+        files = self._files()
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_disk:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        self.memory.clear()
+        self.memory_bytes = 0
+        for _, _, path in self._files():
+            os.remove(path)
+
+    def stats(self):
+        """Попадания (в памяти и на диске), промахи, вытеснения и занятый объем"""
+        lookups = self.hits_memory + self.hits_disk + self.misses
+        files = self._files() if self.disk else []
+        return {
+            'hits_memory': self.hits_memory,
+            'hits_disk': self.hits_disk,
+            'misses': self.misses,
+            'hit_rate': round((self.hits_memory + self.hits_disk) / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'memory_entries': len(self.memory),
+            'memory_bytes': self.memory_bytes,
+            'disk_entries': len(files),
+            'disk_bytes': sum(size for _, size, _ in files),
+        }
+
+
+_default_cache = None
+
+
+def _with_defaults(func, options, skip=('method', 'params', 'n')):
+    """Аргументы расчета вместе со значениями по умолчанию: один и тот же расчет —
+    один ключ, передан ли dt=0.1 явно или нет"""
+    defaults = {name: p.default for name, p in inspect.signature(func).parameters.items()
+                if p.default is not inspect.Parameter.empty and name not in skip}
+    return {**defaults, **options}
+
+
+def default_cache():
+    """Общий кэш процесса (каталог CACHE_DIR рядом с запуском); AVANGARD_NO_CACHE=1 — только в памяти"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = TrajectoryCache(disk=not os.environ.get('AVANGARD_NO_CACHE'))
+    return _default_cache
+
+
+def cached_integrate(method='rk45', params=None, n=None, cache=None, **options):
+    """integrators.integrate с кэшированием"""
+    from integrators import integrate
+    return (cache or default_cache()).compute(lambda p, **kw: integrate(method, p, **kw),
+                                              method, params, n, **_with_defaults(integrate, options))
+
+
+def cached_simulate_batch(params=None, n=None, cache=None, **options):
+    """batchsim.simulate_batch с кэшированием"""
+    from batchsim import simulate_batch
+    return (cache or default_cache()).compute(simulate_batch, BATCH, params, n,
+                                              **_with_defaults(simulate_batch, options))
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Кэш рассчитанных траекторий')
+    parser.add_argument('--directory', default=CACHE_DIR)
+    parser.add_argument('--clear', action='store_true', help='удалить все записи')
+    args = parser.parse_args()
+
+    cache = TrajectoryCache(args.directory)
+    if args.clear:
+        cache.clear()
+    s = cache.stats()
+    print(f"{args.directory}: записей {s['disk_entries']}, {s['disk_bytes'] / 2 ** 20:.1f} МБ")